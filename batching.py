@@ -0,0 +1,137 @@
+"""
+Micro-batching and coalescing of concurrent chain calls.
+
+With many active sessions, every turn is a separate `chain.ainvoke`. A
+BatchDispatcher collects the calls arriving within BATCH_MAX_WAIT_MS (or until
+BATCH_MAX_SIZE are waiting) and sends them through one `chain.abatch`, with at
+most BATCH_MAX_CONCURRENCY batches in flight. Identical inputs submitted while
+an equal call is pending or running are coalesced: they wait for that call
+instead of sending their own, and each gets its own copy of the reply.
+
+How much a batch saves depends on the model behind the chain. A backend that
+serves a batch in one pass (e.g. a self-hosted model server) answers it in
+about the time of one call. For the OpenAI chat API `abatch` still makes one
+request per input, so the gain there is the coalescing and the bounded
+concurrency: with `max_calls` set, each batch passes its share of it to
+`abatch` as max_concurrency.
+
+Set MICRO_BATCHING=1 to route the engine's non-streaming model calls through
+a dispatcher per chain. Dispatchers belong to the engine, since their futures
+are bound to its event loop.
+"""
+import asyncio
+import copy
+import json
+import os
+
+ENABLED = os.getenv("MICRO_BATCHING", "0") == "1"
+MAX_BATCH_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+
+
+def request_key(input_data):
+    """Key of a chain input; equal inputs give the same reply and are coalesced."""
+    return json.dumps(input_data, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class BatchDispatcher:
+    """
+    Collects concurrent calls of one chain into `abatch` calls.
+
+    Must be used from a single event loop.
+
+    Args:
+        chain: The runnable to call.
+        max_batch_size (int): A batch is sent as soon as this many calls wait.
+        max_wait_ms (float): Longest time a call waits for others to join its batch.
+        max_concurrency (int): Batches in flight at once.
+        max_calls (int): Calls in flight at once across all batches, for
+            backends that send one request per input. None for no limit.
+    """
+
+    def __init__(self, chain, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 max_concurrency=MAX_CONCURRENCY, max_calls=None):
+        self.chain = chain
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.calls_per_batch = None if max_calls is None else max(1, max_calls // max_concurrency)
+        # key -> (input, config, future), in arrival order
+        self._pending = {}
+        self._inflight = {}
+        self._timer = None
+        self._tasks = set()
+        self.submitted = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    def coalesces(self, input_data):
+        """True if `submit(input_data)` would share a call already pending or running."""
+        return request_key(input_data) in self._inflight
+
+    async def submit(self, input_data, config=None):
+        """Return the chain's reply for `input_data`, sharing a call with equal inputs."""
+        self.submitted += 1
+        key = request_key(input_data)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._pending[key] = (input_data, config, future)
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        # a cancelled caller must not cancel the call others are waiting for
+        return copy.deepcopy(await asyncio.shield(future))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        keys = list(batch)
+        inputs = [batch[key][0] for key in keys]
+        configs = [batch[key][1] or {} for key in keys]
+        if self.calls_per_batch is not None:
+            configs = [{**config, "max_concurrency": self.calls_per_batch} for config in configs]
+        try:
+            async with self._semaphore:
+                self.batches += 1
+                results = await self.chain.abatch(inputs, configs, return_exceptions=True)
+        except asyncio.CancelledError:
+            # the callers would otherwise wait forever
+            for key in keys:
+                del self._inflight[key]
+                batch[key][2].cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(keys)
+        for key, result in zip(keys, results):
+            future = batch[key][2]
+            del self._inflight[key]
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "mean_batch_size": (self.submitted - self.coalesced) / self.batches if self.batches else 0.0,
+        }
+
@@ -0,0 +1,128 @@
+"""
+Throughput vs added latency of micro-batching and request coalescing.
+
+Drives many concurrent web2 sessions (pre-extractor off, so every turn reaches
+the model) against a fake backend that:
+- accepts at most --capacity requests at once, like a provider rate limit;
+- answers a single call in --latency seconds;
+- answers a batch in one pass, in --latency plus --per-item seconds for every
+  extra input, like a self-hosted model server.
+
+Each session opens with one of a few common greetings, which are coalesced
+while in flight, and then sends messages of its own. The unbatched engine is
+compared with dispatchers at several --waits (BATCH_MAX_WAIT_MS).
+
+Run from the repository root:
+    python benchmarks/bench_batching.py --sessions 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage
+
+from fake_llm import ScriptedFakeChatModel
+from replay_conversations import percentile
+
+import batching
+import chain_registry
+import response_cache
+import session_store
+import web2
+from engine import ChatbotSpec, ConversationEngine
+
+GREETINGS = ("hi", "hello", "i want to plan a holiday")
+
+
+class BatchingFakeChatModel(ScriptedFakeChatModel):
+    """Scripted model behind a capacity limit that serves a batch in one pass."""
+
+    per_item: float = 0.0
+    capacity: asyncio.Semaphore
+    requests: list
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async with self.capacity:
+            self.requests.append(1)
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+    async def abatch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        async with self.capacity:
+            self.requests.append(len(inputs))
+            await asyncio.sleep(self.latency + self.per_item * (len(inputs) - 1))
+            return [AIMessage(content=self._reply(self._convert_input(i).to_messages())) for i in inputs]
+
+
+def make_engine(wait_ms, args):
+    spec = ChatbotSpec(
+        name="bench.batching", template=web2.PROMPT4_TEMPLATE, response_model=web2.ResponseStructure,
+        api_key=None, temperature=0, form_template=web2.json_template, intro=web2.spec.intro,
+        build_input=web2.build_chain_input,
+    )
+    model = BatchingFakeChatModel(
+        replies={greeting: [] for greeting in GREETINGS}, latency=args.latency, per_item=args.per_item,
+        capacity=asyncio.Semaphore(args.capacity), requests=[],
+    )
+    prompt = chain_registry.get_prompt(spec.name, spec.template, spec.response_model)
+    engine = ConversationEngine(
+        spec, chain=prompt | model | chain_registry.get_parser(spec.response_model),
+        cache=response_cache.ResponseCache(max_entries=0), store=session_store.MemorySessionStore(),
+        max_concurrency=args.capacity, batching=wait_ms is not None,
+    )
+    if wait_ms is not None:
+        engine._dispatchers[id(engine.chain)] = batching.BatchDispatcher(
+            engine.chain, max_batch_size=args.batch_size, max_wait_ms=wait_ms, max_concurrency=args.capacity,
+        )
+    return engine, model
+
+
+async def run_session(engine, index, turns, latencies):
+    state = engine.new_session()
+    for turn in range(turns):
+        message = GREETINGS[index % len(GREETINGS)] if turn == 0 else f"session {index} says {turn}"
+        start = time.perf_counter()
+        await engine.handle_turn(state, message)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(wait_ms, args):
+    engine, model = make_engine(wait_ms, args)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(engine, i, args.turns, latencies) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    dispatcher = engine._dispatchers.get(id(engine.chain))
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "requests": len(model.requests),
+        "coalesced": dispatcher.coalesced if dispatcher else 0,
+        "mean_batch": sum(model.requests) / len(model.requests),
+    }
+
+
+def main(args):
+    print(f"{'mode':<12} {'turns/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'requests':>9} {'coalesced':>10} {'batch':>6}")
+    for wait_ms in [None] + args.waits:
+        result = asyncio.run(run(wait_ms, args))
+        mode = "unbatched" if wait_ms is None else f"wait {wait_ms:g} ms"
+        print(f"{mode:<12} {result['throughput']:>8.1f} {result['p50_ms']:>7.0f} {result['p95_ms']:>7.0f} "
+              f"{result['requests']:>9} {result['coalesced']:>10} {result['mean_batch']:>6.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--capacity", type=int, default=8, help="requests the backend serves at once")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--per-item", type=float, default=0.01, help="extra seconds per batched input")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--waits", type=float, nargs="+", default=[0, 2, 5, 10, 20])
+    main(parser.parse_args())
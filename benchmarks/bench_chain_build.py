@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of the per-turn chain setup cost in call_openai_api.
+
+"before" rebuilds the ChatOpenAI client, the JsonOutputParser and every
+PromptTemplate on each turn, the way call_openai_api used to. "after" fetches
+the chain from chain_registry. No request is sent to OpenAI.
+
+Run from the repository root:
+    python benchmarks/bench_chain_build.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_openai import ChatOpenAI
+
+import chain_registry
+import web
+import web2
+import web3
+
+API_KEY = "sk-benchmark"
+TURNS = 200
+
+# (name, templates built per turn, template used by the chain, response model, temperature)
+APPS = [
+    ("web", [web.PROMPT_TEMPLATE, web.PROMPT1_TEMPLATE, web.PROMPT2_TEMPLATE,
+             web.PROMPT3_TEMPLATE, web.PROMPT4_TEMPLATE],
+     web.PROMPT4_TEMPLATE, web.ResponseStructure, 1),
+    ("web2", [web2.PROMPT4_TEMPLATE], web2.PROMPT4_TEMPLATE, web2.ResponseStructure, 0),
+    ("web3", [web3.PROMPT_TEMPLATE], web3.PROMPT_TEMPLATE, web3.ResponseStructure, 0),
+]
+
+
+def build_per_turn(templates, chain_template, response_model, temperature):
+    model = ChatOpenAI(api_key=API_KEY, temperature=temperature)
+    parser = JsonOutputParser(pydantic_object=response_model)
+    prompts = {}
+    for template in templates:
+        prompts[template] = PromptTemplate.from_template(
+            template,
+            partial_variables={"format_instructions": parser.get_format_instructions()},
+        )
+    return prompts[chain_template] | model | parser
+
+
+def time_turns(fn):
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        fn()
+    return (time.perf_counter() - start) / TURNS * 1e6
+
+
+def main():
+    print(f"{'app':<6} {'before (us/turn)':>18} {'after (us/turn)':>17} {'speedup':>9}")
+    for name, templates, chain_template, response_model, temperature in APPS:
+        before = time_turns(
+            lambda: build_per_turn(templates, chain_template, response_model, temperature)
+        )
+        chain_registry.clear()
+        after = time_turns(
+            lambda: chain_registry.get_chain(
+                f"{name}.bench", chain_template, response_model,
+                api_key=API_KEY, temperature=temperature,
+            )
+        )
+        print(f"{name:<6} {before:>18.1f} {after:>17.2f} {before / after:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Applying slot deltas and sending only open and changed slots.
+
+For questions forms of --questions questions filled over a conversation
+(--per-turn answers per turn) it reports:
+- the time to apply a turn's inferences, with the nested loop over
+  `current_json["questions"]` the apps used to run for every inference vs
+  FormState.apply, which looks each answer up by question number;
+- the JSON sent in the prompt, the whole form vs FormState.prompt_view (open
+  questions and those the previous turn answered);
+- the sections the form panel serializes, all of them vs those in the diff.
+The same comparison is made for the web3 trip form, over the conversation of
+bench_schema_prompt.py.
+
+Run from the repository root:
+    python benchmarks/bench_form_diff.py
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_schema_prompt import CONVERSATION
+
+import form_state
+import web3
+
+TRIP_TURNS = [
+    [{"field_name": field, "answer": answer} for field, answer in answers.items()]
+    for _, answers in CONVERSATION
+]
+
+
+def questions_template(count):
+    return {"questions": [
+        {"question_number": n, "question": f"Question {n}?", "instructions": "free text", "answer": ""}
+        for n in range(1, count + 1)
+    ]}
+
+
+def apply_nested(current_json, inferences):
+    for update in inferences:
+        for question in current_json["questions"]:
+            if question["question_number"] == update["question_number"]:
+                question["answer"] = update["answer"]
+
+
+def turns_of(count, per_turn):
+    return [
+        [{"question_number": n, "answer": f"answer {n}"} for n in range(start, min(start + per_turn, count + 1))]
+        for start in range(1, count + 1, per_turn)
+    ]
+
+
+def per_turn_us(statement, number=200):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def replay(form, turns):
+    """(full JSON bytes, prompt view bytes, sections serialized) summed over the turns."""
+    full = view = serialized = 0
+    for inferences in turns:
+        full += len(json.dumps(form.to_dict()))
+        view += len(json.dumps(form.prompt_view()))
+        if form.apply(inferences):
+            serialized += len(form.changed)
+    return full, view, serialized
+
+
+def main(args):
+    print(f"{'form':<14} {'turns':>5} {'nested us':>10} {'apply us':>9} "
+          f"{'full JSON B':>12} {'prompt view B':>14} {'sections':>9} {'in diff':>8}")
+    for count in args.questions:
+        template = questions_template(count)
+        schema = form_state.schema_for(f"bench.diff.{count}", template)
+        turns = turns_of(count, args.per_turn)
+        last = turns[-1]
+        current_json = copy.deepcopy(template)
+        form = form_state.FormState(schema)
+        nested = per_turn_us(lambda: apply_nested(current_json, last))
+        applied = per_turn_us(lambda: form.apply(last))
+        full, view, serialized = replay(form_state.FormState(schema), turns)
+        print(f"{f'{count} questions':<14} {len(turns):>5} {nested:>10.1f} {applied:>9.1f} "
+              f"{full:>12} {view:>14} {len(schema.sections) * len(turns):>9} {serialized:>8}")
+
+    schema = form_state.schema_for(web3.spec.name, web3.tripplan_json)
+    full, view, serialized = replay(form_state.FormState(schema), TRIP_TURNS)
+    print(f"{'web3 trip':<14} {len(TRIP_TURNS):>5} {'':>10} {'':>9} "
+          f"{full:>12} {view:>14} {len(schema.sections) * len(TRIP_TURNS):>9} {serialized:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--questions", type=int, nargs="+", default=[5, 50, 200])
+    parser.add_argument("--per-turn", type=int, default=2, help="questions answered per turn")
+    main(parser.parse_args())
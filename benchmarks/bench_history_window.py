@@ -0,0 +1,72 @@
+"""
+Prompt history size over a scripted 200-turn conversation.
+
+Compares the full chat_history list the apps used to send with the bounded
+window from history.ChatHistory, and checks the window never exceeds its
+token budget (HISTORY_TOKEN_BUDGET).
+
+Run from the repository root:
+    python benchmarks/bench_history_window.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import TOKEN_BUDGET, ChatHistory, estimate_tokens
+
+TURNS = 200
+
+# (user message, question numbers it answers)
+SCRIPT = [
+    ("i am planning a trip to goa, baga beach", {1}),
+    ("we want to go from 01/06/2024 to 10/06/2024", {2}),
+    ("hmm not sure, what do you suggest for a relaxed holiday near the sea?", set()),
+    ("3 of us, me my wife and my son", {3}),
+    ("something close to the beach, a 5 star hotel would be nice", {4}),
+    ("is the monsoon a problem in june? we do not like heavy rain", set()),
+    ("around 10000 - 15000", {5}),
+    ("also my son loves water sports and we are vegetarian", set()),
+]
+
+
+def window_sizes(turns=TURNS):
+    """Yield (turn, full history tokens, windowed history tokens) for every turn."""
+    history = ChatHistory(token_budget=TOKEN_BUDGET)
+    full = ["Bot: Hello! Where are you looking to travel to?"]
+    history.append(full[0])
+    filled = set()
+    for turn in range(1, turns + 1):
+        message, answers = SCRIPT[(turn - 1) % len(SCRIPT)]
+        line = f"You: {message}"
+        full.append(line)
+        history.append(line)
+        yield turn, estimate_tokens(str(full)), estimate_tokens(str(history.prompt_lines(filled)))
+
+        # Answers are re-stated every cycle, so alternate clearing them to keep
+        # some summary notes alive
+        history.mark_answered(answers)
+        if turn % 16 < 8:
+            filled |= answers
+        else:
+            filled -= answers
+
+        reply = f"Bot: Thanks! Could you tell me a bit more? (turn {turn})"
+        full.append(reply)
+        history.append(reply)
+
+
+def main():
+    print(f"{'turn':>5} {'full history tokens':>20} {'windowed tokens':>16}")
+    worst = 0
+    for turn, full_tokens, window_tokens in window_sizes():
+        worst = max(worst, window_tokens)
+        if turn in (1, 10, 50, 100, 200):
+            print(f"{turn:>5} {full_tokens:>20} {window_tokens:>16}")
+
+    # list repr adds a few characters per line on top of the budgeted text
+    assert worst <= TOKEN_BUDGET * 1.1, worst
+    print(f"max windowed prompt history: {worst} tokens (budget {TOKEN_BUDGET})")
+
+if __name__ == "__main__":
+    main()
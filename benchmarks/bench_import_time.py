@@ -0,0 +1,106 @@
+"""
+Cold-start import time of the three Streamlit apps.
+
+Each app is imported --runs times in a fresh interpreter with
+`python -X importtime`; the median cumulative time is reported with the
+slowest modules of the last run.
+
+Import times are noisy, so the deterministic check is which modules get
+loaded: LangChain's prompts, output parsers and tracing, the OpenAI client
+and the legacy `langchain` package must stay out of an app's import (they
+are loaded by chain_registry on first use or by its warm-up thread). The
+script exits non-zero when one of them is imported, or when an app's median
+grows by more than --tolerance over the baseline:
+
+    python benchmarks/bench_import_time.py --save-baseline benchmarks/import_time_baseline.json
+    python benchmarks/bench_import_time.py --baseline benchmarks/import_time_baseline.json
+
+Run from the repository root.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ("web", "web2", "web3")
+# Top-level packages an app import must not load
+DEFERRED = (
+    "langchain",
+    "langchain_openai",
+    "openai",
+    "langsmith",
+    "langchain_core.prompts",
+    "langchain_core.output_parsers",
+    "langchain_core.tracers",
+)
+
+
+def import_profile(module):
+    """Return {module: cumulative microseconds} of one cold import of `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def deferred_imports(profile):
+    return sorted(name for name in profile
+                  if any(name == root or name.startswith(root + ".") for root in DEFERRED))
+
+
+def measure(app, runs, top):
+    totals = []
+    for _ in range(runs):
+        profile = import_profile(app)
+        totals.append(profile[app])
+    slowest = sorted(((us, name) for name, us in profile.items() if name != app), reverse=True)[:top]
+    return {"median_ms": statistics.median(totals) / 1000, "deferred": deferred_imports(profile)}, slowest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--apps", nargs="+", default=list(APPS), choices=list(APPS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest modules to list per app")
+    parser.add_argument("--baseline", help="JSON results to check against")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    results = {}
+    regressions = []
+    for app in args.apps:
+        results[app], slowest = measure(app, args.runs, args.top)
+        print(f"{app}: median {results[app]['median_ms']:.0f} ms over {args.runs} runs")
+        for us, name in slowest:
+            print(f"  {us / 1000:>8.1f} ms  {name}")
+        for name in results[app]["deferred"]:
+            regressions.append(f"{app} imports {name}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({app: {"median_ms": round(r["median_ms"], 1)} for app, r in results.items()}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for app, metrics in results.items():
+            before = baseline.get(app, {}).get("median_ms")
+            if before is not None and metrics["median_ms"] > before * (1 + args.tolerance):
+                regressions.append(f"{app} median_ms: {before:.1f} -> {metrics['median_ms']:.1f}")
+    for regression in regressions:
+        print("REGRESSION", regression)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Latency and cost of model tiering vs sending every turn to the strong model.
+
+Replays the web3 conversations of replay_conversations.py with two scripted
+fake models: a slow strong tier that always answers correctly, and a fast tier
+that returns an unknown slot on --fast-error-rate of its replies, which
+the validator rejects and the engine escalates.
+
+Run from the repository root:
+    python benchmarks/bench_model_tiers.py --sessions 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import ScriptedFakeChatModel
+from replay_conversations import FIELD_CONVERSATIONS, percentile
+
+import chain_registry
+import model_tiers
+import response_cache
+import session_store
+import web3
+from engine import ChatbotSpec, ConversationEngine
+
+
+class UnreliableFakeChatModel(ScriptedFakeChatModel):
+    """A scripted model whose first inference is sometimes invalid."""
+
+    error_rate: float = 0.0
+    rng: random.Random
+
+    def _reply(self, messages):
+        reply = json.loads(super()._reply(messages))
+        if reply["inferences"] and self.rng.random() < self.error_rate:
+            # an unknown sub-field, which slot validation rejects
+            reply["inferences"][0]["answer"] = {"not_a_field": "?"}
+        return json.dumps(reply)
+
+
+def make_engine(args):
+    replies = {message: inferences for conversation in FIELD_CONVERSATIONS for message, inferences in conversation}
+    spec = ChatbotSpec(
+        name="bench.tiers", template=web3.PROMPT_TEMPLATE, response_model=web3.ResponseStructure,
+        api_key=None, temperature=0, form_template=web3.tripplan_json, intro=web3.spec.intro,
+        build_input=web3.build_chain_input, extractor=web3.spec.extractor, validator=web3.spec.validator,
+        is_complete=web3.spec.is_complete, tiering=True,
+    )
+    prompt = chain_registry.get_prompt(spec.name, spec.template, spec.response_model)
+    parser = chain_registry.get_parser(spec.response_model)
+    strong = prompt | ScriptedFakeChatModel(replies=replies, latency=args.strong_latency) | parser
+    fast = prompt | UnreliableFakeChatModel(
+        replies=replies, latency=args.fast_latency, error_rate=args.fast_error_rate, rng=random.Random(args.seed),
+    ) | parser
+    return ConversationEngine(
+        spec, chain=strong, tier_chains={model_tiers.FAST: fast, model_tiers.STRONG: strong},
+        cache=response_cache.ResponseCache(max_entries=0), store=session_store.MemorySessionStore(),
+        max_concurrency=64,
+    )
+
+
+async def replay(engine, conversation, latencies):
+    state = engine.new_session()
+    for message, _ in conversation:
+        start = time.perf_counter()
+        await engine.handle_turn(state, message)
+        latencies.append(time.perf_counter() - start)
+    return state.completed
+
+
+async def main(args):
+    fast_max_words = model_tiers.FAST_MAX_WORDS
+    for tiering in (False, True):
+        # the baseline classifies every turn as strong
+        model_tiers.FAST_MAX_WORDS = fast_max_words if tiering else -1
+        model_tiers.stats = model_tiers.TierStats()
+        engine = make_engine(args)
+        latencies = []
+        completed = await asyncio.gather(*(
+            replay(engine, FIELD_CONVERSATIONS[i % len(FIELD_CONVERSATIONS)], latencies)
+            for i in range(args.sessions)
+        ))
+        name = "tiered" if tiering else "strong only"
+        print(f"{name:>11}: turns={len(latencies)} completed={sum(completed)}/{args.sessions} "
+              f"p50={percentile(latencies, 0.5) * 1000:.0f} ms p95={percentile(latencies, 0.95) * 1000:.0f} ms")
+        for tier, counts in model_tiers.stats.report().items():
+            if counts["calls"]:
+                print(f"  {tier:>6}: calls={counts['calls']} escalation rate={counts['escalation_rate']:.0%} "
+                      f"mean latency={counts['mean_latency_ms']:.0f} ms cost=${counts['cost_usd']:.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--fast-latency", type=float, default=0.15, help="seconds per fast-tier call")
+    parser.add_argument("--strong-latency", type=float, default=0.6, help="seconds per strong-tier call")
+    parser.add_argument("--fast-error-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,129 @@
+"""
+Parse-failure, local-repair and retry rates of the "json" and "tool" output modes.
+
+Fake chat models replay a fixed mix of well-formed and malformed replies (prose
+around the JSON, trailing commas, Python dict reprs, truncated arguments,
+inferences without a field name, plain refusals) through the ConversationEngine, and the per-mode statistics of
+structured_output are printed. The mix is synthetic; it shows what the repair
+step recovers locally and what still costs a retry.
+
+Run from the repository root:
+    python benchmarks/bench_output_modes.py --turns 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import PromptTemplate
+
+import repair_parsers
+import response_cache
+import session_store
+import structured_output
+import web3
+from engine import ChatbotSpec, ConversationEngine
+
+TURN = {
+    "inferences": [{"field_name": "trip_direction", "answer": "return"}],
+    "next_question": "Lovely! Where will you be travelling from?",
+}
+VALID = json.dumps(TURN)
+# parses, but the inferences can not be applied to the form
+BAD_ITEMS = {"inferences": ["return"], "next_question": TURN["next_question"]}
+
+# 20 replies per cycle for each mode
+JSON_REPLIES = (
+    [VALID] * 12
+    + [json.dumps(BAD_ITEMS)]
+    + [f"```json\n{VALID}\n```"]
+    + [f"Sure! Here is the JSON you asked for:\n{VALID}\nLet me know if you need more."] * 2
+    + [VALID[:-1] + ",}"]
+    + [repr(TURN)]
+    + [VALID[:-3]]
+    + ["I'm sorry, I can not help with that."]
+)
+TOOL_REPLIES = (
+    [("call", TURN)] * 16
+    + [("call", BAD_ITEMS)]
+    + [("invalid", VALID[:-2])]
+    + [("text", VALID)]
+    + [("text", "I'm sorry, I can not help with that.")]
+)
+
+
+class ReplayChatModel(BaseChatModel):
+    """Returns the next reply of a fixed cycle, as text or as a tool call."""
+
+    replies: list
+    position: int = 0
+
+    @property
+    def _llm_type(self):
+        return "replay"
+
+    def _message(self):
+        reply = self.replies[self.position % len(self.replies)]
+        self.position += 1
+        if isinstance(reply, str):
+            return AIMessage(content=reply)
+        kind, payload = reply
+        if kind == "call":
+            return AIMessage(content="", tool_calls=[{"name": structured_output.TOOL_NAME, "args": payload, "id": "1"}])
+        if kind == "invalid":
+            return AIMessage(content="", invalid_tool_calls=[
+                {"name": structured_output.TOOL_NAME, "args": payload, "id": "1", "error": "bad json"}
+            ])
+        return AIMessage(content=payload)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self._message())])
+
+
+async def run(mode, turns):
+    replies = JSON_REPLIES if mode == "json" else TOOL_REPLIES
+    if mode == "json":
+        parser = repair_parsers.RepairingJsonOutputParser()
+    else:
+        parser = repair_parsers.RepairingToolsParser(key_name=structured_output.TOOL_NAME, first_tool_only=True)
+    chain = PromptTemplate.from_template(web3.PROMPT_TEMPLATE) | ReplayChatModel(replies=replies) | parser
+    spec = ChatbotSpec(
+        name=f"bench.{mode}", template=web3.PROMPT_TEMPLATE, response_model=web3.ResponseStructure,
+        api_key=None, temperature=0, form_template=web3.tripplan_json, intro="Hello!",
+        build_input=web3.build_chain_input, output_mode=mode,
+    )
+    engine = ConversationEngine(
+        spec, chain=chain, cache=response_cache.ResponseCache(max_entries=0),
+        store=session_store.MemorySessionStore(),
+    )
+    lost = 0
+    for turn in range(turns):
+        state = engine.new_session()
+        try:
+            await engine.handle_turn(state, f"we would like a return trip, turn {turn}")
+        except Exception:
+            lost += 1
+    return lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    lost = {mode: asyncio.run(run(mode, args.turns)) for mode in ("json", "tool")}
+    for mode, counts in structured_output.stats.report().items():
+        print(f"{mode:>4}: calls={counts['calls']} malformed={counts['raw_failure_rate']:.1%} "
+              f"repaired locally={counts['repaired']} still unusable={counts['parse_failures']} "
+              f"({counts['failure_rate']:.1%}) retries={counts['retries']} ({counts['retry_rate']:.1%}) "
+              f"turns lost={lost[mode]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Streamlit rerun time of the apps by conversation length.
+
+Each app script is run with streamlit.testing's AppTest on a session that
+already holds --turns turns and a partly filled form, and plain reruns are
+timed (no new message, so no model call). For comparison the same app also
+runs with the previous rendering patched into chat_ui: every line with
+`st.write`, plus `st.json` and a `json.dumps` of the whole form. The element count is the number of elements
+sent to the browser on each rerun.
+
+Run from the repository root:
+    python benchmarks/bench_rerun.py --turns 10 100 500
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st
+import streamlit.logger
+from streamlit.testing.v1 import AppTest
+
+import chat_ui
+import engine
+import web
+import web2
+import web3
+
+APPS = {"web": web, "web2": web2, "web3": web3}
+
+
+
+def previous_transcript(chat_history):
+    with st.container():
+        for chat in chat_history:
+            st.write(chat)
+
+
+def previous_form(form):
+    data = form.to_dict()
+    st.json(data)
+    st.write(json.dumps(data, indent=4))
+
+
+def make_session(module, turns):
+    session = engine.get_engine(module.spec).new_session()
+    for turn in range(turns):
+        session.chat_history.append(f"You: message {turn} about the trip, with a few more words in it")
+        session.chat_history.append(f"Bot: question {turn}, asking about the next part of the trip?")
+    keys = sorted(session.json_data.schema.keys, key=str)
+    for key in keys[:len(keys) // 2]:
+        session.json_data.set(key, f"answer {key}")
+    return session
+
+
+def time_reruns(app, session, runs):
+    at = AppTest.from_file(os.path.join(ROOT, f"{app}.py"))
+    # streamlit warns about session state set outside of a script run; AppTest
+    # resets the log level when it loads its config
+    streamlit.logger.set_log_level("error")
+    at.session_state["session"] = session
+    at.session_state["chat_history"] = session.chat_history
+    at.session_state["json_data"] = session.json_data.to_dict()
+    at.session_state["next_question"] = session.next_question
+    at.session_state["function_count"] = session.function_count
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    # at.main iterates over every nested element
+    return statistics.median(times) * 1000, sum(1 for _ in at.main)
+
+
+def main(args):
+    print(f"{'app':<5} {'turns':>5} {'previous ms':>12} {'elements':>9} {'now ms':>8} {'elements':>9}")
+    for name in args.apps:
+        for turns in args.turns:
+            session = make_session(APPS[name], turns)
+            after = time_reruns(name, session, args.runs)
+            # the app modules are shared with AppTest's script runs
+            render_transcript, render_form = chat_ui.render_transcript, chat_ui.render_form
+            chat_ui.render_transcript, chat_ui.render_form = previous_transcript, previous_form
+            try:
+                before = time_reruns(name, session, args.runs)
+            finally:
+                chat_ui.render_transcript, chat_ui.render_form = render_transcript, render_form
+            print(f"{name:<5} {turns:>5} {before[0]:>12.1f} {before[1]:>9} {after[0]:>8.1f} {after[1]:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--apps", nargs="+", default=list(APPS), choices=list(APPS))
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--runs", type=int, default=20)
+    main(parser.parse_args())
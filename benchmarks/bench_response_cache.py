@@ -0,0 +1,92 @@
+"""
+Response cache check against a counting fake chat model.
+
+Replays common opening lines, each in a new session, through
+ConversationEngine.handle_turn and verifies that cache hits never reach the
+model, including hits served from the SQLite layer by a fresh cache instance.
+
+Run from the repository root:
+    python benchmarks/bench_response_cache.py
+"""
+import asyncio
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import PromptTemplate
+
+import response_cache
+import session_store
+import telemetry
+import web2
+from engine import ConversationEngine
+
+RESPONSE = json.dumps({
+    "inferences": [{"question_number": 1, "answer": "India, Goa"}],
+    "next_question": "Lovely! When are you planning to travel?",
+})
+
+OPENERS = ["hi", "Hi!", "goa trip with family", "Goa trip with family.", "hello", "  HI  "]
+
+# every session runs the same prompt, and no opener is answered locally
+SPEC = copy.copy(web2.spec)
+SPEC.variants = None
+SPEC.extractor = None
+
+
+class CountingChatModel(FakeListChatModel):
+    """Fake chat model that counts how often it is actually called."""
+
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        return super()._call(*args, **kwargs)
+
+
+async def run(cache, model, rounds=50):
+    chain = PromptTemplate.from_template(SPEC.template) | model | JsonOutputParser()
+    engine = ConversationEngine(
+        SPEC, chain=chain, cache=cache, store=session_store.MemorySessionStore(),
+        telemetry=telemetry.Telemetry(trace_file=""), batching=False,
+    )
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for opener in OPENERS:
+            await engine.handle_turn(engine.new_session(), opener)
+    return (time.perf_counter() - start) / (rounds * len(OPENERS)) * 1e6
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "cache.sqlite")
+
+        model = CountingChatModel(responses=[RESPONSE])
+        cache = response_cache.ResponseCache(max_entries=128, ttl=60, sqlite_path=db)
+        per_turn = asyncio.run(run(cache, model))
+        # "hi", "Hi!" and "  HI  " normalize to the same key, as do the two goa lines
+        assert model.calls == 3, model.calls
+        print(f"memory+sqlite: {cache.stats()} model calls={model.calls} {per_turn:.1f} us/turn")
+
+        # A new process (fresh memory layer) is served from SQLite without the model
+        model = CountingChatModel(responses=[RESPONSE])
+        cache = response_cache.ResponseCache(max_entries=128, ttl=60, sqlite_path=db)
+        per_turn = asyncio.run(run(cache, model))
+        assert model.calls == 0, model.calls
+        print(f"sqlite warm:   {cache.stats()} model calls={model.calls} {per_turn:.1f} us/turn")
+
+        # Without a cache every turn reaches the model
+        model = CountingChatModel(responses=[RESPONSE])
+        per_turn = asyncio.run(run(response_cache.ResponseCache(max_entries=0), model))
+        print(f"no cache:      model calls={model.calls} {per_turn:.1f} us/turn")
+
+
+if __name__ == "__main__":
+    main()
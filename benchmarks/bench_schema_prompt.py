@@ -0,0 +1,86 @@
+"""
+Prompt size of web3.py per turn: pretty-printed abc.json vs the compiled fragment.
+
+Replays a sample conversation that fills the trip form one field at a time and
+renders the full web3 prompt each turn, once with the old input
+(`json.dumps(abc_json, indent=4)` and an indented current JSON) and once with
+build_chain_input (compiled fragment of the open fields, minified JSON of the
+open and just changed fields).
+Tokens are counted with tiktoken when available, otherwise estimated.
+
+Run from the repository root:
+    python benchmarks/bench_schema_prompt.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chain_registry
+import form_state
+import schema_file
+import schema_prompt
+import web3
+from history import estimate_tokens
+
+# (user message, answers it gives)
+CONVERSATION = [
+    ("i want to plan a trip to goa and kerala", {"destination": ["Goa", "Kerala"]}),
+    ("start with goa please", {"firstDestination": "Goa"}),
+    ("mostly beaches and relaxing", {"trip_theme": "beach"}),
+    ("me, my wife and our two kids", {"traveller_type": "family-with kids"}),
+    ("we are flying from mumbai", {"Origin_city": "Mumbai"}),
+    ("comfortable spending", {"budget": "comfortable spending"}),
+    ("we are vegetarian", {"food": "vegetarian"}),
+    ("return", {"trip_direction": "return"}),
+]
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return "tiktoken cl100k_base", lambda text: len(encoding.encode(text))
+    except Exception:
+        return "estimate (4 chars/token)", estimate_tokens
+
+
+def main():
+    counter_name, count = token_counter()
+    prompt = chain_registry.get_prompt(web3.spec.name, web3.PROMPT_TEMPLATE, web3.ResponseStructure)
+    form = form_state.FormState(form_state.schema_for(web3.spec.name, web3.tripplan_json))
+    history = [f"Bot: {web3.spec.intro}"]
+
+    start = time.perf_counter()
+    abc_json = schema_file.load_schema("abc.json")
+    schema_prompt.SchemaPrompt(abc_json)
+    print(f"compile abc.json: {(time.perf_counter() - start) * 1000:.2f} ms (once per process)")
+    print(f"tokens counted with {counter_name}")
+    print(f"{'turn':>4} {'before':>8} {'after':>8} {'saved':>6}")
+
+    total_before = total_after = 0
+    for turn, (message, answers) in enumerate(CONVERSATION, 1):
+        history.append(f"You: {message}")
+        current_json = form.to_dict()
+        before_input = {
+            "chat_history": history,
+            "current_json": json.dumps(current_json, indent=4),
+            "latest_user_input": history[-1],
+            "details": json.dumps(abc_json, indent=4),
+        }
+        before = count(prompt.format(**before_input))
+        after = count(prompt.format(**web3.build_chain_input(history, form)))
+        total_before += before
+        total_after += after
+        print(f"{turn:>4} {before:>8} {after:>8} {1 - after / before:>6.0%}")
+
+        form.apply([{"field_name": field, "answer": answer} for field, answer in answers.items()])
+        history.append("Bot: Thanks! What next?")
+
+    print(f"total {total_before} -> {total_after} tokens ({1 - total_after / total_before:.0%} fewer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Cost and effect of validating web3 inferences against the compiled abc.json slots.
+
+Checks a batch of model-style inferences (clean, coercible, invalid and
+ambiguous values), prints what each one became and times the check per
+inference.
+
+Run from the repository root:
+    python benchmarks/bench_slot_validation.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import slot_schema
+
+SAMPLE = [
+    {"field_name": "trip_direction", "answer": "return"},
+    {"field_name": "trip_direction", "answer": "One way"},
+    {"field_name": "budget", "answer": "tight budget"},
+    {"field_name": "food", "answer": "Vegetarian and Indian"},
+    {"field_name": "destination", "answer": "Goa, Kerala"},
+    {"field_name": "traveller_type.adults", "answer": "two"},
+    {"field_name": "time_schedule.onward_trip.date", "answer": {"day_of_month": "5", "month": 6, "year": "{next_year}"}},
+    {"field_name": "time_schedule.return_trip.date.day_of_month", "answer": 35},
+    {"field_name": "optimizeType", "answer": "whatever"},
+    {"field_name": "hotel", "answer": "5 star"},
+    {"field_name": "traveller_type", "answer": "family"},
+]
+ROUNDS = 2000
+
+
+def main():
+    with open("abc.json") as f:
+        schema = json.load(f)
+    start = time.perf_counter()
+    validator = slot_schema.SlotValidator.from_schema(schema)
+    compile_ms = (time.perf_counter() - start) * 1000
+    print(f"compiled {len(validator.slots)} slots in {compile_ms:.2f} ms")
+
+    for update in SAMPLE:
+        valid, clarification = validator.check([update])
+        result = clarification or valid or "dropped"
+        print(f"  {update['field_name']}={update['answer']!r} -> {result}")
+
+    # fresh stats for the timed rounds
+    timed = slot_schema.SlotValidator(validator.slots)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        timed.check(SAMPLE)
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed / (ROUNDS * len(SAMPLE)) * 1e6:.1f} us per inference; {timed.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+User-visible turn latency: one sequential call vs speculative parallel calls.
+
+Runs the web2 chatbot (pre-extractor off, so every turn reaches the model)
+against fake chat models that sleep a random, log-normally jittered latency:
+
+- sequential: one full call (extraction + next question);
+- speculative: a fast extraction call and a question-drafting call at once,
+  plus a redraft when the extraction leads to a different next slot.
+
+The simulated user answers the question that was just asked with probability
+--answer-rate, otherwise says something unrelated.
+
+Run from the repository root:
+    python benchmarks/bench_speculative.py --sessions 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import PromptTemplate
+
+import response_cache
+import session_store
+import speculative
+import web2
+from engine import ChatbotSpec, ConversationEngine
+
+_ANSWER_RE = re.compile(r"my answer to question (\d)")
+
+
+class LatencyFakeChatModel(BaseChatModel):
+    """
+    Answers after a jittered latency. The reply depends on `kind`: the full
+    turn JSON, the extraction JSON or the next-question JSON, with inferences
+    read from the scripted user message in the prompt.
+    """
+
+    kind: str
+    latency: float
+    rng: random.Random
+
+    @property
+    def _llm_type(self):
+        return "latency-fake"
+
+    def _reply(self, messages):
+        prompt = messages[-1].content
+        latest = prompt.split("You: ")[-1]
+        match = _ANSWER_RE.search(latest)
+        inferences = [{"question_number": int(match.group(1)), "answer": "an answer"}] if match else []
+        if self.kind == "extract":
+            return json.dumps({"inferences": inferences})
+        if self.kind == "question":
+            return json.dumps({"next_question": "Could you tell me a bit more about your trip?"})
+        return json.dumps({"inferences": inferences, "next_question": "Could you tell me a bit more?"})
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency * self.rng.lognormvariate(0, 0.3))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency * self.rng.lognormvariate(0, 0.3))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+
+def make_engine(speculative_mode, args, rng):
+    def chain(template, kind, latency):
+        model = LatencyFakeChatModel(kind=kind, latency=latency, rng=rng)
+        return PromptTemplate.from_template(template) | model | JsonOutputParser()
+
+    spec = ChatbotSpec(
+        name=f"bench.speculative.{speculative_mode}", template=web2.PROMPT4_TEMPLATE,
+        response_model=web2.ResponseStructure, api_key=None, temperature=0,
+        form_template=web2.json_template, intro="Hello! Where would you like to go?",
+        build_input=web2.build_chain_input, speculative=speculative_mode,
+    )
+    return ConversationEngine(
+        spec,
+        chain=chain(web2.PROMPT4_TEMPLATE, "full", args.full_latency),
+        speculative_chains=(
+            chain(speculative.EXTRACTION_TEMPLATE, "extract", args.extract_latency),
+            chain(speculative.QUESTION_TEMPLATE, "question", args.question_latency),
+        ),
+        cache=response_cache.ResponseCache(max_entries=0),
+        store=session_store.MemorySessionStore(),
+        max_concurrency=256,
+    )
+
+
+async def run_session(engine, rng, answer_rate, latencies):
+    state = engine.new_session()
+    for turn in range(12):
+        open_questions = [q["question_number"] for q in state.json_data.to_dict()["questions"] if not q["answer"]]
+        if not open_questions:
+            return
+        if rng.random() < answer_rate:
+            message = f"my answer to question {open_questions[0]}"
+        else:
+            message = f"hmm, let me think about it (turn {turn})"
+        start = time.perf_counter()
+        await engine.handle_turn(state, message)
+        latencies.append(time.perf_counter() - start)
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def main(args):
+    for mode in (False, True):
+        rng = random.Random(args.seed)
+        engine = make_engine(mode, args, rng)
+        latencies = []
+        await asyncio.gather(*(
+            run_session(engine, random.Random(args.seed + i), args.answer_rate, latencies)
+            for i in range(args.sessions)
+        ))
+        name = "speculative" if mode else "sequential"
+        print(f"{name:>11}: turns={len(latencies)} p50={percentile(latencies, 0.5) * 1000:.0f} ms "
+              f"p95={percentile(latencies, 0.95) * 1000:.0f} ms")
+    print(f"drafted question used as is: {speculative.stats.hit_rate():.0%} of speculative turns")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--answer-rate", type=float, default=0.8)
+    parser.add_argument("--full-latency", type=float, default=0.8, help="seconds, one full call")
+    parser.add_argument("--extract-latency", type=float, default=0.3, help="seconds, extraction-only call")
+    parser.add_argument("--question-latency", type=float, default=0.45, help="seconds, question-only call")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
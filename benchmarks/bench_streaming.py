@@ -0,0 +1,100 @@
+"""
+Time to first visible token with streaming against a local fake streaming model.
+
+The fake model emits the response JSON one character at a time with a fixed
+delay per chunk. Blocking mode has to wait for the whole JSON before anything
+can be shown; streaming mode shows next_question as soon as its first
+characters are parsed. The streamed turn runs through
+ConversationEngine.run_turn, the way the apps call it, and checks that:
+- the inferences are applied before the first character of the question;
+- a reply that fails its check and is asked again is drawn from the start,
+  not appended to the rejected one.
+
+Run from the repository root:
+    python benchmarks/bench_streaming.py
+"""
+import copy
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import PromptTemplate
+
+import response_cache
+import session_store
+import telemetry
+import web2
+from engine import ConversationEngine
+
+RESPONSE = json.dumps({
+    "inferences": [{"question_number": 1, "answer": "India, Goa, Baga Beach"}],
+    "next_question": "Baga beach is lovely! When are you planning to travel, and for how many days?",
+})
+# parses, but its inferences can not be applied, so it is asked again
+REJECTED = json.dumps({"inferences": ["Goa"], "next_question": "Goa it is!"})
+MESSAGE = "i am planning to go to goa baga beach"
+CHUNK_DELAY = 0.002
+
+SPEC = copy.copy(web2.spec)
+SPEC.variants = None
+SPEC.extractor = None
+
+
+def make_engine(responses):
+    model = FakeListChatModel(responses=responses, sleep=CHUNK_DELAY)
+    chain = PromptTemplate.from_template(SPEC.template) | model | JsonOutputParser()
+    return ConversationEngine(
+        SPEC, chain=chain, cache=response_cache.ResponseCache(max_entries=0),
+        store=session_store.MemorySessionStore(), telemetry=telemetry.Telemetry(trace_file=""),
+    )
+
+
+def stream_turn(responses):
+    """Run one streamed turn; (reply, text of each drawn attempt, ms to first text, answers then)."""
+    engine = make_engine(responses)
+    state = engine.new_session()
+    drawn, first = [], {}
+
+    def render(deltas):
+        shown = []
+        for delta in deltas:
+            if not first:
+                first["at"] = time.perf_counter()
+                first["answers"] = dict(state.json_data.answers)
+            shown.append(delta)
+        drawn.append("".join(shown))
+
+    start = time.perf_counter()
+    reply = engine.run_turn(state, MESSAGE, render_stream=render)
+    return reply, drawn, (first["at"] - start) * 1000, first["answers"]
+
+
+def main():
+    # FakeListChatModel only sleeps while streaming, so blocking mode is timed as
+    # "consume the whole stream, then show the reply"
+    chain = PromptTemplate.from_template("{latest_user_input}") | FakeListChatModel(
+        responses=[RESPONSE], sleep=CHUNK_DELAY
+    ) | JsonOutputParser()
+    start = time.perf_counter()
+    for blocking in chain.stream({"latest_user_input": MESSAGE}):
+        pass
+    blocking_ms = (time.perf_counter() - start) * 1000
+
+    reply, drawn, ttft_ms, answers = stream_turn([RESPONSE])
+    assert drawn == [reply] == [blocking["next_question"]], drawn
+    assert answers == {1: "India, Goa, Baga Beach"}, answers
+    print(f"blocking: first visible text after {blocking_ms:.0f} ms")
+    print(f"streaming: first visible text after {ttft_ms:.0f} ms, inferences already applied")
+
+    reply, drawn, _, _ = stream_turn([REJECTED, RESPONSE])
+    assert drawn == ["Goa it is!", reply], drawn
+    print(f"retried reply: drawn {len(drawn)} times, the last one alone")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Memory, prompt assembly and serialization of transcript.Transcript vs the
+list of "You: ..." / "Bot: ..." strings it replaces.
+
+For conversations of --turns turns it reports:
+- memory per session, measured with tracemalloc over --sessions sessions;
+- time to build the prompt history from the last --window lines, as the
+  previous list repr and as the newline-joined text sent now;
+- size and time of serializing the whole transcript and loading it back
+  (JSON list of lines vs Transcript.to_bytes/from_bytes).
+
+Run from the repository root:
+    python benchmarks/bench_transcript.py --turns 10 100 500
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript import Role, Transcript
+
+USER = "we are {n} adults travelling from Mumbai in the first week of June, on a budget of about {n}000"
+BOT = "Thanks! Do you already have a destination in mind for turn {n}, or should I suggest a few?"
+
+
+def as_list(turns):
+    lines = [f"Bot: {BOT.format(n=0)}"]
+    for n in range(1, turns + 1):
+        lines.append(f"You: {USER.format(n=n)}")
+        lines.append(f"Bot: {BOT.format(n=n)}")
+    return lines
+
+
+def as_transcript(turns):
+    transcript = Transcript()
+    transcript.add(Role.BOT, BOT.format(n=0))
+    for n in range(1, turns + 1):
+        transcript.add(Role.USER, USER.format(n=n))
+        transcript.add(Role.BOT, BOT.format(n=n))
+    return transcript
+
+
+def per_session_bytes(make, turns, sessions):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [make(turns) for _ in range(sessions)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size / sessions
+
+
+def per_call_us(statement, number):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main(args):
+    window, number = args.window, args.number
+    print(f"{'turns':>5} {'':<10} {'bytes/session':>14} {'prompt repr us':>15} {'prompt join us':>15} "
+          f"{'stored bytes':>13} {'dump us':>8} {'load us':>8}")
+    for turns in args.turns:
+        lines, transcript = as_list(turns), as_transcript(turns)
+        assert transcript == lines
+        dumped, packed = json.dumps(lines), transcript.to_bytes()
+        rows = {
+            "list": (
+                per_session_bytes(as_list, turns, args.sessions),
+                per_call_us(lambda: str(lines[-window:]), number),
+                per_call_us(lambda: "\n".join(lines[-window:]), number),
+                len(dumped.encode("utf-8")),
+                per_call_us(lambda: json.dumps(lines), number),
+                per_call_us(lambda: json.loads(dumped), number),
+            ),
+            "transcript": (
+                per_session_bytes(as_transcript, turns, args.sessions),
+                per_call_us(lambda: str(transcript.last(window)), number),
+                per_call_us(lambda: "\n".join(transcript.last(window)), number),
+                len(packed),
+                per_call_us(transcript.to_bytes, number),
+                per_call_us(lambda: Transcript.from_bytes(packed), number),
+            ),
+        }
+        for name, (memory, prompt_repr, prompt_join, stored, dump, load) in rows.items():
+            print(f"{turns:>5} {name:<10} {memory:>14.0f} {prompt_repr:>15.2f} {prompt_join:>15.2f} "
+                  f"{stored:>13} {dump:>8.1f} {load:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--window", type=int, default=8, help="history lines in the prompt")
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing")
+    main(parser.parse_args())
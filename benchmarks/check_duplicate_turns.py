@@ -0,0 +1,189 @@
+"""
+Duplicate submissions of a turn never reach the model twice.
+
+Runs web3 turns against fake_llm.ScriptedFakeChatModel and checks that:
+- a turn id submitted again after its turn finished gets the stored reply;
+- the same turn id submitted concurrently shares one model call;
+- a session reloaded from the session store still knows its last turn id;
+- in the Streamlit app (run with AppTest), the message box is cleared on
+  submit, later reruns do not send the message again, and a turn handed over
+  again after an interrupted rerun is suppressed.
+Every suppressed call must show up in the duplicate_turns counter.
+A turn whose model call or save fails must leave the session as it was and,
+in the app, not be run again by later reruns until the user retries it.
+
+Run from the repository root:
+    python benchmarks/check_duplicate_turns.py
+"""
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import streamlit.logger
+from streamlit.testing.v1 import AppTest
+
+from fake_llm import ScriptedFakeChatModel
+
+import chain_registry
+import engine
+import response_cache
+import session_store
+import telemetry
+import web3
+
+MESSAGE = "we are a family of four travelling from Paris"
+
+
+class FailingChatModel(ScriptedFakeChatModel):
+    """Counts its calls like ScriptedFakeChatModel and fails every one."""
+
+    fail: bool = True
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not self.fail:
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        self.prompt_bytes.append(0)
+        raise RuntimeError("model unavailable")
+
+
+class FailingSessionStore(session_store.MemorySessionStore):
+    """Memory store whose next `failures` saves fail."""
+
+    failures = 0
+
+    def save(self, state):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("store unavailable")
+        super().save(state)
+
+
+def make_engine(model, store=None):
+    spec = web3.spec
+    prompt = chain_registry.get_prompt(spec.name, spec.template, spec.response_model)
+    return engine.ConversationEngine(
+        spec, chain=prompt | model | chain_registry.get_parser(spec.response_model),
+        cache=response_cache.ResponseCache(max_entries=0), store=store or session_store.MemorySessionStore(),
+        telemetry=telemetry.Telemetry(trace_file=""),
+    )
+
+
+def duplicates(chatbot):
+    return sum(counters["duplicate_turns"] for counters in chatbot.telemetry._counters.values())
+
+
+async def check_engine():
+    model = ScriptedFakeChatModel(replies={MESSAGE: []}, latency=0.05)
+    chatbot = make_engine(model)
+    state = chatbot.new_session()
+
+    first = await chatbot.handle_turn(state, MESSAGE, turn_id="a")
+    again = await chatbot.handle_turn(state, MESSAGE, turn_id="a")
+    assert again == first and len(model.prompt_bytes) == 1 and len(state.chat_history) == 3
+    print("resubmitted after the turn: 1 model call, reply repeated")
+
+    replies = await asyncio.gather(*(chatbot.handle_turn(state, MESSAGE, turn_id="b") for _ in range(5)))
+    assert len(set(replies)) == 1 and len(model.prompt_bytes) == 2 and len(state.chat_history) == 5
+    print("5 concurrent submissions: 1 model call, same reply")
+
+    reloaded = chatbot.load_session(state.session_id)
+    await chatbot.handle_turn(reloaded, MESSAGE, turn_id="b")
+    assert len(model.prompt_bytes) == 2, "a reloaded session ran its last turn again"
+    print("reloaded session: last turn id kept")
+
+    await chatbot.handle_turn(state, MESSAGE, turn_id="c")
+    assert len(model.prompt_bytes) == 3, "a new turn id was suppressed"
+    assert duplicates(chatbot) == 6, duplicates(chatbot)
+    print(f"duplicate_turns counter: {duplicates(chatbot)}")
+
+
+def check_app():
+    model = ScriptedFakeChatModel(replies={MESSAGE: []})
+    chatbot = make_engine(model)
+    # the app runs turns on the process-wide engine of its spec
+    engine._engines[web3.spec.name] = chatbot
+    at = AppTest.from_file(os.path.join(ROOT, "web3.py"))
+    streamlit.logger.set_log_level("error")
+    at.run()
+    at.text_input(key="user_input").input(MESSAGE).run()
+    assert at.text_input(key="user_input").value == "", "message box not cleared"
+    assert len(model.prompt_bytes) == 1
+    for _ in range(3):
+        at.run()
+    assert not at.exception, at.exception
+    assert len(model.prompt_bytes) == 1, "a rerun sent the message again"
+    assert len(at.session_state["chat_history"]) == 3
+    print("streamlit: message box cleared, 3 reruns after the turn: 1 model call")
+
+    # the script was stopped after the turn ran, before finish_turn dropped it
+    at.session_state["pending_turn"] = (at.session_state["session"].last_turn_id, MESSAGE)
+    at.run()
+    assert len(model.prompt_bytes) == 1 and len(at.session_state["chat_history"]) == 3
+    assert duplicates(chatbot) == 1, duplicates(chatbot)
+    print("streamlit: interrupted turn handed over again: suppressed")
+
+
+async def check_failed_engine():
+    model = FailingChatModel(replies={MESSAGE: []})
+    chatbot = make_engine(model)
+    state = chatbot.new_session()
+    for _ in range(2):
+        try:
+            await chatbot.handle_turn(state, MESSAGE, turn_id="a")
+        except RuntimeError:
+            pass
+    assert len(model.prompt_bytes) == 2
+    assert len(state.chat_history) == 1 and state.turns == 0, state.chat_history
+    assert state.history.prompt_lines() == [f"Bot: {web3.spec.intro}"]
+    print("failed turn submitted twice: session unchanged")
+
+
+async def check_failed_save():
+    model = ScriptedFakeChatModel(replies={MESSAGE: []})
+    store = FailingSessionStore()
+    chatbot = make_engine(model, store)
+    state = chatbot.new_session()
+    store.failures = 1
+    try:
+        await chatbot.handle_turn(state, MESSAGE, turn_id="a")
+    except OSError:
+        pass
+    assert len(state.chat_history) == 1 and state.turns == 0 and state.last_turn_id is None
+    await chatbot.handle_turn(state, MESSAGE, turn_id="a")
+    assert len(model.prompt_bytes) == 2, "the retry was suppressed as a duplicate"
+    assert len(state.chat_history) == 3 and state.turns == 1
+    assert chatbot.load_session(state.session_id).chat_history == state.chat_history
+    print("failed save, then retried: one user line, saved")
+
+
+def check_failed_app():
+    model = FailingChatModel(replies={MESSAGE: []})
+    engine._engines[web3.spec.name] = make_engine(model)
+    at = AppTest.from_file(os.path.join(ROOT, "web3.py"))
+    streamlit.logger.set_log_level("error")
+    at.run()
+    at.text_input(key="user_input").input(MESSAGE).run()
+    for _ in range(3):
+        at.run()
+    assert not at.exception, at.exception
+    assert len(model.prompt_bytes) == 1, "a rerun ran the failed turn again"
+    assert len(at.session_state["chat_history"]) == 1 and at.error
+    print("streamlit: failed turn, 3 reruns: 1 model call, error shown")
+
+    model.fail = False
+    at.button(key="retry_turn").click().run()
+    assert len(model.prompt_bytes) == 2 and len(at.session_state["chat_history"]) == 3
+    assert not at.error
+    print("streamlit: retried: 1 more model call, one user line")
+
+
+if __name__ == "__main__":
+    asyncio.run(check_engine())
+    check_app()
+    asyncio.run(check_failed_engine())
+    asyncio.run(check_failed_save())
+    check_failed_app()
@@ -0,0 +1,85 @@
+"""
+Form-state isolation across 1,000 concurrent sessions and memory per session.
+
+Every session answers the budget question with its own value through the
+ConversationEngine (answered by the pre-extractor, so no model is needed), all
+turns running concurrently. The check fails if any session sees another
+session's answer or if the shared template is modified.
+
+Memory per session compares deep-copying the template (the obvious fix) with
+form_state.FormState, for the questions form and the full abc.json shape.
+
+Run from the repository root:
+    python benchmarks/check_form_isolation.py
+"""
+import asyncio
+import copy
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import form_state
+import response_cache
+import session_store
+import web2
+from engine import ConversationEngine
+
+SESSIONS = 1000
+
+
+async def check_isolation():
+    template_before = json.dumps(web2.json_template)
+    engine = ConversationEngine(
+        web2.spec, cache=response_cache.ResponseCache(max_entries=0),
+        store=session_store.MemorySessionStore(),
+    )
+    states = [engine.new_session() for _ in range(SESSIONS)]
+    await asyncio.gather(*(
+        engine.handle_turn(state, f"{1000 + i} - {2000 + i}") for i, state in enumerate(states)
+    ))
+    for i, state in enumerate(states):
+        answers = {q["question_number"]: q["answer"] for q in state.json_data.to_dict()["questions"]}
+        assert answers == {1: "", 2: "", 3: "", 4: "", 5: f"{1000 + i} - {2000 + i}"}, answers
+    assert json.dumps(web2.json_template) == template_before, "shared template was modified"
+    print(f"isolation: {SESSIONS} concurrent sessions ok, template untouched")
+
+
+def per_session_bytes(make):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    forms = [make(i) for i in range(SESSIONS)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del forms
+    return size / SESSIONS
+
+
+def main():
+    asyncio.run(check_isolation())
+
+    with open("abc.json") as f:
+        abc_template = json.load(f)
+    for name, template, key, value in [
+        ("questions form", web2.json_template, 3, "2"),
+        ("abc.json form", abc_template, "traveller_type", "family-with kids"),
+    ]:
+        schema = form_state.schema_for(f"bench.{name}", template)
+
+        def deep(i):
+            return copy.deepcopy(template)
+
+        def overlay(i):
+            form = form_state.FormState(schema)
+            form.set(key, value)
+            return form
+
+        print(f"{name}: deepcopy {per_session_bytes(deep):,.0f} B/session, "
+              f"FormState {per_session_bytes(overlay):,.0f} B/session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Round-trip and write-volume check of the session store backends.
+
+Runs the same scripted conversation through the memory, SQLite and Redis
+backends (the Redis one against an in-process fake speaking the redis-py
+client API), checks that a reloaded session matches the live one, that idle
+sessions are evicted, and reports the bytes written per turn compared with
+rewriting the full state. tests/test_session_store.py runs the same checks
+under pytest.
+
+Run from the repository root:
+    python benchmarks/check_session_store.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import form_state
+import session_store
+from engine import SessionState
+
+TURNS = 50
+
+
+class FakeRedis:
+    """The subset of redis-py used by RedisSessionStore, with key expiry."""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.bytes_written = 0
+
+    def _alive(self, key):
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def get(self, key):
+        return self.data[key].encode() if self._alive(key) else None
+
+    def set(self, key, value, ex=None):
+        self.bytes_written += len(value)
+        self.data[key] = value
+        if ex is not None:
+            self.expires[key] = time.time() + ex
+
+    def rpush(self, key, *values):
+        self.bytes_written += sum(len(v) for v in values)
+        if not self._alive(key):
+            self.data[key] = []
+        self.data[key].extend(values)
+
+    def expire(self, key, seconds):
+        if self._alive(key):
+            self.expires[key] = time.time() + seconds
+
+    def lrange(self, key, start, end):
+        if not self._alive(key):
+            return []
+        values = self.data[key]
+        return [v.encode() for v in values[start:None if end == -1 else end + 1]]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+
+def play(store):
+    schema = form_state.schema_for("check", {"questions": [{"question_number": 1, "answer": ""}]})
+    state = SessionState("s1", form_state.FormState(schema), "Hello!")
+    store.save(state)
+    for turn in range(TURNS):
+        state.chat_history.append(f"You: message number {turn}")
+        state.history.append(f"You: message number {turn}")
+        state.json_data.set(1, f"answer {turn}")
+        state.chat_history.append(f"Bot: question number {turn}?")
+        state.history.append(f"Bot: question number {turn}?")
+        state.function_count += 1
+        store.save(state)
+    loaded = store.load("s1")
+    assert loaded.chat_history == state.chat_history
+    assert loaded.json_data.to_dict() == state.json_data.to_dict()
+    assert loaded.history.prompt_lines() == state.history.prompt_lines()
+    assert loaded.function_count == state.function_count
+    return state
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        redis = FakeRedis()
+        stores = {
+            "memory": session_store.MemorySessionStore(ttl=1),
+            "sqlite": session_store.SQLiteSessionStore(os.path.join(tmp, "sessions.db"), ttl=1),
+            "redis": session_store.RedisSessionStore(redis, ttl=1),
+        }
+        for name, store in stores.items():
+            play(store)
+            print(f"{name}: round trip ok")
+
+        state = play(session_store.MemorySessionStore())
+        full_state = len(json.dumps(state.to_meta())) + len(json.dumps(state.chat_history[:]))
+        print(f"redis bytes written per turn: {redis.bytes_written / (TURNS + 1):.0f} "
+              f"(full-state rewrite at turn {TURNS}: {full_state})")
+
+        time.sleep(1.1)
+        for name, store in stores.items():
+            store.evict_idle()
+            assert store.load("s1") is None, name
+        print("idle sessions evicted")
+
+
+if __name__ == "__main__":
+    main()
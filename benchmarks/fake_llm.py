@@ -0,0 +1,105 @@
+"""
+Deterministic local chat model for offline benchmarks.
+
+ScriptedFakeChatModel answers from a table of user message -> inferences: it
+finds the latest scripted "You: ..." line in the prompt and replies with the
+turn JSON for it, so the same conversation always produces the same replies.
+Latency and completion size are configurable, and every prompt it receives is
+measured, so benchmarks can report prompt bytes without an OpenAI key.
+
+Replies carry usage metadata like the OpenAI API's, including a simulated
+prompt cache: a prompt prefix seen before is reported as cached tokens, in
+128-token steps from 1024 tokens on (about 4 bytes per token).
+"""
+import asyncio
+import hashlib
+import json
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+FILLER = "please"
+BYTES_PER_TOKEN = 4
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+
+class ScriptedFakeChatModel(BaseChatModel):
+    """
+    Replies with the scripted inferences for the latest user message in the prompt.
+
+    Args:
+        replies (dict): user message -> list of inferences.
+        latency (float): Seconds before every reply.
+        token_latency (float): Extra seconds per completion token.
+        completion_tokens (int): Approximate size of next_question in words.
+    """
+
+    replies: dict
+    latency: float = 0.0
+    token_latency: float = 0.0
+    completion_tokens: int = 20
+    prompt_bytes: list = Field(default_factory=list)
+    cached_bytes: list = Field(default_factory=list)
+    seen_prefixes: set = Field(default_factory=set)
+
+    @property
+    def _llm_type(self):
+        return "scripted-fake"
+
+    def _cached(self, data):
+        """Bytes of the longest cacheable prefix seen before; remembers this prompt's prefixes."""
+        step = CACHE_STEP_TOKENS * BYTES_PER_TOKEN
+        cached = 0
+        for end in range(CACHE_MIN_TOKENS * BYTES_PER_TOKEN, len(data) + 1, step):
+            digest = hashlib.blake2b(data[:end], digest_size=16).digest()
+            if digest in self.seen_prefixes:
+                cached = end
+            else:
+                self.seen_prefixes.add(digest)
+        return cached
+
+    def _message(self, messages):
+        content = self._reply(messages)
+        prompt = self.prompt_bytes[-1]
+        cached = self.cached_bytes[-1]
+        completion = len(content) // BYTES_PER_TOKEN
+        usage = {
+            "input_tokens": prompt // BYTES_PER_TOKEN,
+            "output_tokens": completion,
+            "total_tokens": prompt // BYTES_PER_TOKEN + completion,
+            "input_token_details": {"cache_read": cached // BYTES_PER_TOKEN},
+        }
+        return AIMessage(content=content, usage_metadata=usage)
+
+    def _reply(self, messages):
+        prompt = "".join(str(m.content) for m in messages)
+        data = prompt.encode("utf-8")
+        self.prompt_bytes.append(len(data))
+        self.cached_bytes.append(self._cached(data))
+        # the scripted user line appearing last in the prompt is the latest one;
+        # matching "You: ..." skips example values in the template itself
+        latest, position = None, -1
+        for message in self.replies:
+            found = prompt.rfind(f"You: {message}")
+            if found > position:
+                latest, position = message, found
+        inferences = self.replies.get(latest, [])
+        words = max(1, self.completion_tokens - 8)
+        question = "Thanks! Could you tell me a little more about your trip, " + " ".join([FILLER] * words) + "?"
+        return json.dumps({"inferences": inferences, "next_question": question})
+
+    def _delay(self):
+        return self.latency + self.token_latency * self.completion_tokens
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
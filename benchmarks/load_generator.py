@@ -0,0 +1,94 @@
+"""
+HTTP load generator for server.py.
+
+By default it starts the server in-process on a free port with a stubbed model
+(fixed latency, no OpenAI key needed) and drives it with N concurrent clients
+over keep-alive connections. Pass --url to load an already running server.
+
+Run from the repository root:
+    python benchmarks/load_generator.py --clients 100 --turns 6
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from load_test_engine import SCRIPT, SlowFakeChatModel
+
+
+def start_stub_server(latency):
+    """Serve web2's chatbot with a fake model on a free local port."""
+    import uvicorn
+    from langchain_core.output_parsers import JsonOutputParser
+    from langchain_core.prompts import PromptTemplate
+
+    import response_cache
+    import server
+    import web2
+    from engine import ConversationEngine
+
+    chain = PromptTemplate.from_template(web2.PROMPT4_TEMPLATE) | SlowFakeChatModel(latency=latency) | JsonOutputParser()
+    conversation_engine = ConversationEngine(
+        web2.spec, chain=chain, cache=response_cache.ResponseCache(max_entries=0), max_concurrency=64,
+    )
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    config = uvicorn.Config(
+        server.create_app(conversation_engine), host="127.0.0.1", port=port,
+        log_level="warning", timeout_keep_alive=75,
+    )
+    uvicorn_server = uvicorn.Server(config)
+    threading.Thread(target=uvicorn_server.run, daemon=True).start()
+    while not uvicorn_server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run_client(client, turns, latencies, errors):
+    session_id = None
+    for i in range(turns):
+        payload = {"message": SCRIPT[i % len(SCRIPT)]}
+        if session_id:
+            payload["session_id"] = session_id
+        start = time.perf_counter()
+        response = await client.post("/turn", json=payload)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+            continue
+        session_id = response.json()["session_id"]
+
+
+async def main(url, clients, turns):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_client(client, turns, latencies, errors) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"clients={clients} turns/client={turns} requests={len(latencies)} errors={len(errors)}")
+    print(f"elapsed={elapsed:.2f} s throughput={len(latencies) / elapsed:.1f} req/s")
+    print(f"latency p50={latencies[len(latencies) // 2] * 1000:.0f} ms "
+          f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.0f} ms "
+          f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="server to load; default starts a stubbed server in-process")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub model latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.url or start_stub_server(args.latency), args.clients, args.turns))
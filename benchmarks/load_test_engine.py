@@ -0,0 +1,100 @@
+"""
+Load test of the async ConversationEngine with N concurrent simulated sessions.
+
+Each session plays a short scripted conversation against a fake chat model that
+sleeps for a fixed latency per call, so the numbers show how well the engine
+overlaps model calls within one process.
+
+Run from the repository root:
+    python benchmarks/load_test_engine.py --sessions 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import PromptTemplate
+
+import response_cache
+import web2
+from engine import ConversationEngine
+
+SCRIPT = [
+    "hi, i am planning a holiday",
+    "i want to go to goa, baga beach",
+    "01/06/2024 - 10/06/2024",
+    "3",
+    "a 5 star hotel near the beach",
+    "10000 - 15000",
+]
+
+RESPONSE = json.dumps({
+    "inferences": [{"question_number": 1, "answer": "India, Goa, Baga Beach"}],
+    "next_question": "Great choice! When are you planning to travel?",
+})
+
+
+class SlowFakeChatModel(BaseChatModel):
+    """Fake chat model that answers with a fixed response after a fixed latency."""
+
+    latency: float = 0.2
+
+    @property
+    def _llm_type(self):
+        return "slow-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=RESPONSE))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=RESPONSE))])
+
+
+async def run_session(engine, latencies):
+    state = engine.new_session()
+    for message in SCRIPT:
+        start = time.perf_counter()
+        await engine.handle_turn(state, message)
+        latencies.append(time.perf_counter() - start)
+    return state
+
+
+async def main(sessions, concurrency, latency):
+    chain = PromptTemplate.from_template(web2.PROMPT4_TEMPLATE) | SlowFakeChatModel(latency=latency) | JsonOutputParser()
+    engine = ConversationEngine(
+        web2.spec, chain=chain, cache=response_cache.ResponseCache(max_entries=0),
+        max_concurrency=concurrency,
+    )
+    latencies = []
+    start = time.perf_counter()
+    states = await asyncio.gather(*(run_session(engine, latencies) for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    model_calls = sum(state.function_count for state in states)
+    print(f"sessions={sessions} concurrency={concurrency} model latency={latency * 1000:.0f} ms")
+    print(f"turns={len(latencies)} model calls={model_calls} elapsed={elapsed:.2f} s "
+          f"throughput={len(latencies) / elapsed:.1f} turns/s")
+    print(f"turn latency p50={latencies[len(latencies) // 2] * 1000:.0f} ms "
+          f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.0f} ms")
+    # sessions must not share form state
+    assert len({id(state.json_data.answers) for state in states}) == sessions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions, args.concurrency, args.latency))
@@ -0,0 +1,237 @@
+"""
+Offline replay of scripted travel conversations through all three chatbots.
+
+Every app's real pipeline runs: its ChatbotSpec, prompt template, pre-extractor,
+validator and the engine's call_openai_api path. Only the model is replaced by
+fake_llm.ScriptedFakeChatModel, which is deterministic and needs no OpenAI key.
+For each app it reports:
+- throughput and turn latency p50/p95/p99;
+- prompt bytes per model call, and the share served from the fake model's
+  simulated prompt cache;
+- model calls and turns to a completed form.
+
+The prompt bytes, model calls and turns are deterministic, so they can be
+saved as a baseline and checked on every change. The script exits non-zero
+when one of them grows by more than --tolerance:
+
+    python benchmarks/replay_conversations.py --save-baseline benchmarks/replay_baseline.json
+    python benchmarks/replay_conversations.py --baseline benchmarks/replay_baseline.json
+
+tests/test_replay.py runs the same check under pytest. Run from the repository root.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import ScriptedFakeChatModel
+
+import chain_registry
+import question_scheduler
+import response_cache
+import session_store
+import web3
+from engine import ConversationEngine
+
+# (user message, inferences the fake model returns for it)
+QUESTION_CONVERSATIONS = [
+    [
+        ("hi, i am planning a holiday", []),
+        ("i want to go to goa, baga beach", [{"question_number": 1, "answer": "India, Goa, Baga Beach"}]),
+        ("01/06/2024 - 10/06/2024", [{"question_number": 2, "answer": "01/06/2024 - 10/06/2024"}]),
+        ("we are 3 people", [{"question_number": 3, "answer": "3"}]),
+        ("a 5 star hotel near the beach", [{"question_number": 4, "answer": "5 star hotel near the beach"}]),
+        ("10000 - 15000", [{"question_number": 5, "answer": "10000 - 15000"}]),
+    ],
+    [
+        ("me and my wife want to visit paris from 10/07/2024 to 20/07/2024", [
+            {"question_number": 1, "answer": "France, Paris"},
+            {"question_number": 2, "answer": "10/07/2024 - 20/07/2024"},
+            {"question_number": 3, "answer": "2"},
+        ]),
+        ("what is the weather like in july?", []),
+        ("an airbnb in the city centre", [{"question_number": 4, "answer": "airbnb in the city centre"}]),
+        ("not sure yet about the money", []),
+        ("around 2000 to 3000 euros", [{"question_number": 5, "answer": "2000 - 3000 euros"}]),
+    ],
+]
+
+FIELD_CONVERSATIONS = [
+    [
+        ("i want to plan a trip to goa and kerala", [{"field_name": "destination", "answer": ["Goa", "Kerala"]}]),
+        ("please sequence the cities automatically", [{"field_name": "optimizeType", "answer": "auto"}]),
+        ("start with goa", [{"field_name": "firstDestination", "answer": "Goa"}]),
+        ("a return trip, leaving on 5 june", [
+            {"field_name": "trip_direction", "answer": "return"},
+            {"field_name": "time_schedule.onward_trip.date", "answer": {"day_of_month": 5, "month": 6}},
+        ]),
+        ("coming back on 12 june", [
+            {"field_name": "time_schedule.return_trip.date", "answer": {"day_of_month": 12, "month": 6}},
+        ]),
+        ("adventure! we are a couple from mumbai", [
+            {"field_name": "trip_theme", "answer": "adventure"},
+            {"field_name": "traveller_type", "answer": "couple"},
+            {"field_name": "Origin_city", "answer": "Mumbai"},
+        ]),
+        ("comfortable spending, and we eat vegetarian", [
+            {"field_name": "budget", "answer": "comfortable spending"},
+            {"field_name": "food", "answer": "vegetarian"},
+        ]),
+    ],
+    [
+        ("hello! we are four friends from delhi", [
+            {"field_name": "traveller_type", "answer": "friends"},
+            {"field_name": "traveller_type.adults", "answer": 4},
+            {"field_name": "Origin_city", "answer": "Delhi"},
+        ]),
+        ("we want to party in goa", [
+            {"field_name": "destination", "answer": ["Goa"]},
+            {"field_name": "trip_theme", "answer": "party"},
+        ]),
+        ("manual is fine", [{"field_name": "optimizeType", "answer": "manual"}]),
+        ("oneway", [{"field_name": "trip_direction", "answer": "oneway"}]),
+        ("on 20 december", [{"field_name": "time_schedule.onward_trip.date", "answer": {"day_of_month": 20, "month": 12}}]),
+        ("on a tight budget, any food", [
+            {"field_name": "budget", "answer": "on a tight budget"},
+            {"field_name": "food", "answer": "any"},
+        ]),
+    ],
+]
+
+APPS = {
+    "web": QUESTION_CONVERSATIONS,
+    "web2": QUESTION_CONVERSATIONS,
+    "web3": FIELD_CONVERSATIONS,
+}
+
+
+def is_complete(form):
+    if "questions" in form:
+        return all(q["answer"] for q in form["questions"])
+    scheduler = question_scheduler.schema_scheduler("abc.json", tuple(web3.tripplan_json))
+    return not scheduler.remaining(question_scheduler.answered_values(form))
+
+
+def session_tag(index):
+    """A word unique to a replayed session, so sessions only share what real users would."""
+    letters = ""
+    index += 26 * 26
+    while index:
+        index, letter = divmod(index, 26)
+        letters += chr(ord("a") + letter)
+    return letters
+
+
+async def replay(engine, conversation, index, latencies):
+    """Play one conversation; return the number of turns to a complete form, or None."""
+    state = engine.new_session()
+    for turn, (message, _) in enumerate(conversation, 1):
+        if turn == 1:
+            # still matches the scripted message, the fake model looks for it as a substring
+            message = f"{message} - {session_tag(index)}"
+        start = time.perf_counter()
+        await engine.handle_turn(state, message)
+        latencies.append(time.perf_counter() - start)
+        if is_complete(state.json_data.to_dict()):
+            return turn
+    return None
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_app(name, args):
+    app = __import__(name)
+    conversations = APPS[name]
+    replies = {message: inferences for conversation in conversations for message, inferences in conversation}
+    model = ScriptedFakeChatModel(
+        replies=replies, latency=args.latency, token_latency=args.token_latency,
+        completion_tokens=args.completion_tokens,
+    )
+    prompt = chain_registry.get_prompt(app.spec.name, app.spec.template, app.spec.response_model)
+    engine = ConversationEngine(
+        app.spec, chain=prompt | model | chain_registry.get_parser(app.spec.response_model),
+        cache=response_cache.ResponseCache(max_entries=0), store=session_store.MemorySessionStore(),
+        max_concurrency=args.concurrency,
+    )
+    latencies = []
+    plays = [conversations[i % len(conversations)] for i in range(args.sessions)]
+    start = time.perf_counter()
+    turns = await asyncio.gather(*(
+        replay(engine, conversation, index, latencies) for index, conversation in enumerate(plays)
+    ))
+    elapsed = time.perf_counter() - start
+    completed = [t for t in turns if t is not None]
+    return {
+        "turns": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "model_calls": len(model.prompt_bytes),
+        "prompt_bytes": statistics.mean(model.prompt_bytes) if model.prompt_bytes else 0,
+        "cached": sum(model.cached_bytes) / sum(model.prompt_bytes) if model.prompt_bytes else 0,
+        "completed": len(completed),
+        "turns_to_completion": statistics.mean(completed) if completed else None,
+    }
+
+
+# Deterministic metrics compared with the baseline; larger is worse
+CHECKED = ("prompt_bytes", "model_calls", "turns_to_completion")
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for app, metrics in results.items():
+        for metric in CHECKED:
+            before = baseline.get(app, {}).get(metric)
+            after = metrics[metric]
+            if before is not None and after is not None and after > before * (1 + tolerance):
+                regressions.append(f"{app} {metric}: {before:.1f} -> {after:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--apps", nargs="+", default=list(APPS), choices=list(APPS))
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per model call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per completion token")
+    parser.add_argument("--completion-tokens", type=int, default=30)
+    parser.add_argument("--baseline", help="JSON results to check against")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = {name: asyncio.run(run_app(name, args)) for name in args.apps}
+
+    print(f"{'app':<5} {'turns':>6} {'turns/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'calls':>6} {'prompt B':>9} {'cached':>7} {'done':>5} {'turns to done':>14}")
+    for name, r in results.items():
+        to_done = f"{r['turns_to_completion']:.2f}" if r["turns_to_completion"] is not None else "-"
+        print(f"{name:<5} {r['turns']:>6} {r['throughput']:>8.1f} {r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f} "
+              f"{r['p99_ms']:>7.1f} {r['model_calls']:>6} {r['prompt_bytes']:>9.0f} {r['cached']:>7.0%} "
+              f"{r['completed']:>5} {to_done:>14}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Average turns to complete the abc.json form: free question order vs the scheduler.
+
+A simulated traveller with a random profile answers each field it is asked
+about with probability --answer-rate. Two question policies are compared:
+
+- one-by-one: one empty field per turn in schema order, with no notion of
+  dependencies, which is roughly what the model does on its own;
+- scheduler: question_scheduler.QuestionScheduler, with dependency pruning and
+  bundled questions.
+
+A form is complete when the scheduler has no needed field left.
+
+Run from the repository root:
+    python benchmarks/simulate_scheduler.py --runs 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import question_scheduler
+
+MAX_TURNS = 60
+
+
+def random_profile(rng):
+    return {
+        "optimizeType": rng.choice(["manual", "auto"]),
+        "firstDestination": "Goa",
+        "trip_theme": "adventure",
+        "destination": ["Goa", "Kerala"],
+        "traveller_type": rng.choice(["solo", "couple", "friends"]),
+        "Origin_city": "Mumbai",
+        "budget": "comfortable spending",
+        "food": "vegetarian",
+        "trip_direction": rng.choice(["return", "oneway"]),
+        "time_schedule.onward_trip": {"date": {"day_of_month": 5, "month": 6}},
+        "time_schedule.return_trip": {"date": {"day_of_month": 12, "month": 6}},
+        "time_schedule.duration": 7,
+    }
+
+
+def one_by_one(scheduler, values):
+    return [next(p for p in scheduler.fields if p not in values)]
+
+
+def scheduled(scheduler, values):
+    return scheduler.next_fields(values)
+
+
+def simulate(policy, scheduler, rng, answer_rate):
+    profile = random_profile(rng)
+    values = {}
+    for turn in range(1, MAX_TURNS + 1):
+        for path in policy(scheduler, values):
+            if rng.random() < answer_rate:
+                values[path] = profile[path]
+        if not scheduler.remaining(values):
+            return turn
+    return MAX_TURNS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--answer-rate", type=float, default=0.85)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scheduler = question_scheduler.schema_scheduler("abc.json")
+    for name, policy in [("one-by-one", one_by_one), ("scheduler", scheduled)]:
+        rng = random.Random(args.seed)
+        turns = [simulate(policy, scheduler, rng, args.answer_rate) for _ in range(args.runs)]
+        print(f"{name:>10}: {statistics.mean(turns):.2f} turns to completion on average "
+              f"(max {max(turns)}, {args.runs} runs, answer rate {args.answer_rate:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Process-wide registry of prompts, parsers, models and chains.
+
+Streamlit re-executes the app script on every interaction, so anything built
+inside `call_openai_api` used to be rebuilt on every user message. Modules that
+the app imports stay in `sys.modules` across reruns, so the objects kept here
+are built once per process and shared by every session. Reusing one
+`ChatOpenAI` instance also reuses its underlying HTTP connection pool.
+
+Prompts are built as a static system message followed by a human message
+holding the per-turn values (see prompt_layout), so the provider can cache
+the shared prefix.
+
+LangChain's prompts, parsers and the OpenAI client are imported by the
+builders on first use rather than at module import: together they are most of
+an app's cold start, and the page can render before the first chain exists.
+"""
+import threading
+
+import prompt_layout
+import structured_output
+
+_lock = threading.Lock()
+_models = {}
+_parsers = {}
+_prompts = {}
+_chains = {}
+
+
+def get_model(api_key, temperature=0, model_name=None):
+    """Return the shared ChatOpenAI client for this api key, temperature and model."""
+    key = (api_key, temperature, model_name)
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                from langchain_openai import ChatOpenAI
+
+                options = {"model": model_name} if model_name else {}
+                model = ChatOpenAI(api_key=api_key, temperature=temperature, **options)
+                _models[key] = model
+    return model
+
+
+def get_parser(pydantic_object):
+    """Return the shared JSON parser (with local repair) for a response model."""
+    parser = _parsers.get(pydantic_object)
+    if parser is None:
+        with _lock:
+            parser = _parsers.get(pydantic_object)
+            if parser is None:
+                import repair_parsers
+
+                parser = repair_parsers.RepairingJsonOutputParser(pydantic_object=pydantic_object)
+                _parsers[pydantic_object] = parser
+    return parser
+
+
+def get_prompt(name, template, pydantic_object):
+    """
+    Return the compiled prompt registered under `name`: the template's static
+    prefix as the system message, its variable suffix as the human message.
+
+    Raises:
+        prompt_layout.PromptLayoutError: If the template interleaves per-turn
+            values with its instructions.
+    """
+    prompt = _prompts.get(name)
+    if prompt is None:
+        parser = get_parser(pydantic_object)
+        with _lock:
+            prompt = _prompts.get(name)
+            if prompt is None:
+                from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+                variables = PromptTemplate.from_template(template).input_variables
+                partials = {"format_instructions": parser.get_format_instructions()}
+                partials = {key: value for key, value in partials.items() if key in variables}
+                prefix, suffix = prompt_layout.split_template(template, partials, name)
+                prompt = ChatPromptTemplate.from_messages([("system", prefix), ("human", suffix)])
+                if partials:
+                    prompt = prompt.partial(**partials)
+                _prompts[name] = prompt
+    return prompt
+
+
+def get_chain(name, template, pydantic_object, api_key, temperature=0, mode="json", field_names=None,
+              model_name=None):
+    """
+    Return the `prompt | model | parser` chain registered under `name`.
+
+    The chain is built on first use and reused for the rest of the process.
+
+    Args:
+        name (str): Unique name of the prompt, e.g. "web.prompt4".
+        template (str): The prompt template text.
+        pydantic_object: Pydantic model describing the expected JSON response.
+        api_key (str): OpenAI api key.
+        temperature (float): Sampling temperature for the model.
+        mode (str): "json" to parse the reply text, "tool" to force a function
+            call whose schema is generated from `pydantic_object`.
+        field_names (tuple): Allowed inference field names for "tool" mode.
+        model_name (str): OpenAI model, the ChatOpenAI default if not given.
+    """
+    key = (name, api_key, temperature, mode, field_names, model_name)
+    chain = _chains.get(key)
+    if chain is None:
+        prompt = get_prompt(name, template, pydantic_object)
+        model = get_model(api_key, temperature, model_name)
+        if mode == "tool":
+            tool = structured_output.tool_schema(pydantic_object, field_names)
+            model = model.bind_tools([tool], tool_choice=structured_output.TOOL_NAME)
+            import repair_parsers
+
+            parser = repair_parsers.RepairingToolsParser(
+                key_name=structured_output.TOOL_NAME, first_tool_only=True
+            )
+        else:
+            parser = get_parser(pydantic_object)
+        with _lock:
+            chain = _chains.setdefault(key, prompt | model | parser)
+    return chain
+
+
+def _import_builders():
+    try:
+        import langchain_core.prompts  # noqa: F401
+        import langchain_openai  # noqa: F401
+        import repair_parsers  # noqa: F401
+    except Exception as e:
+        print(f"Chain registry warm-up failed: {e}")
+
+
+def warm_up():
+    """
+    Import the chain builders' dependencies in a background thread, so that
+    they are loaded while the app renders instead of on the first turn.
+    """
+    threading.Thread(target=_import_builders, name="chain-registry-warm-up", daemon=True).start()
+
+
+def discard(name):
+    """Drop the prompt and chains registered under `name`, e.g. after its template changed."""
+    with _lock:
+        _prompts.pop(name, None)
+        for key in [key for key in _chains if key[0] == name]:
+            del _chains[key]
+
+
+def clear():
+    """Drop every cached object. Mainly useful for benchmarks."""
+    with _lock:
+        _models.clear()
+        _parsers.clear()
+        _prompts.clear()
+        _chains.clear()
@@ -0,0 +1,139 @@
+"""
+Message input, and incremental rendering of the transcript and the form panel
+of the apps.
+
+Streamlit re-executes the whole script on every interaction. Writing every
+transcript line with `st.write` and dumping the whole form on each rerun made
+the page slower the longer the conversation got, and a `st.text_input` keeps
+its value, so every rerun sent the same message to the model again. Instead:
+- the message box is cleared on submit. Its message is handed over once with
+  a new turn id and stays pending until the turn's reply is in the session.
+  A rerun that interrupted the turn passes the same id again, and the engine
+  answers it without another model call (see ConversationEngine.handle_turn).
+  A turn whose model call failed is dropped too, so reruns do not pay for it
+  again, and a Retry button submits its message once more;
+- the last TRANSCRIPT_WINDOW lines are drawn as `st.chat_message` bubbles.
+  Earlier lines sit behind a toggle in a fragment, so they cost nothing until
+  they are opened, and opening them reruns only the fragment. Their markdown
+  is extended with the new lines only and kept in the session state;
+- the form panel draws one `st.json` per section (a field, or a question).
+  A section is serialized again only when the form's diff says it changed
+  (see form_state), and the unchanged sections send identical elements,
+  which the browser does not redraw.
+
+See benchmarks/bench_rerun.py for rerun times by conversation length.
+"""
+import json
+import os
+import uuid
+
+import streamlit as st
+
+from transcript import Role
+
+WINDOW = int(os.getenv("TRANSCRIPT_WINDOW", "20"))
+# transcript role -> chat_message name
+ROLES = {Role.USER: "user", Role.BOT: "assistant"}
+
+
+def _take_input():
+    text = st.session_state["user_input"].strip()
+    if text:
+        st.session_state["pending_turn"] = (uuid.uuid4().hex, text)
+        st.session_state.pop("failed_turn", None)
+    st.session_state["user_input"] = ""
+
+
+def _retry():
+    message, _ = st.session_state.pop("failed_turn")
+    st.session_state["pending_turn"] = (uuid.uuid4().hex, message)
+
+
+def _show_failed():
+    message, error = st.session_state["failed_turn"]
+    st.error(f"No reply to \"{message}\": {error}")
+    st.button("Retry", key="retry_turn", on_click=_retry)
+
+
+def submitted_turn(label="You:"):
+    """
+    Draw the message box and return the pending turn.
+
+    Returns:
+        tuple: (turn_id, message), or None if no message is waiting.
+    """
+    st.text_input(label, key="user_input", on_change=_take_input)
+    if "failed_turn" in st.session_state:
+        _show_failed()
+    return st.session_state.get("pending_turn")
+
+
+def finish_turn(turn_id):
+    """Drop the pending turn once its reply is in the session."""
+    if st.session_state.get("pending_turn", (None,))[0] == turn_id:
+        del st.session_state["pending_turn"]
+
+
+def fail_turn(turn_id, error):
+    """Drop the pending turn after it failed, and offer to retry it."""
+    pending = st.session_state.get("pending_turn")
+    if pending is not None and pending[0] == turn_id:
+        del st.session_state["pending_turn"]
+        st.session_state["failed_turn"] = (pending[1], str(error))
+        _show_failed()
+
+
+def _earlier_markdown(chat_history, count):
+    """Markdown of the first `count` lines, extended from the previous rerun's."""
+    owner, done, text = st.session_state.get("_transcript_earlier", (None, 0, ""))
+    if owner != id(chat_history) or done > count:
+        done, text = 0, ""
+    if done < count:
+        text += "".join(f"{line}  \n" for line in chat_history[done:count])
+        st.session_state["_transcript_earlier"] = (id(chat_history), count, text)
+    return text
+
+
+@st.fragment
+def _earlier_messages(chat_history, count):
+    if st.toggle(f"Show {count} earlier messages", key="show_earlier_messages"):
+        st.markdown(_earlier_markdown(chat_history, count))
+
+
+def render_transcript(chat_history, window=WINDOW):
+    """
+    Draw the transcript, oldest line first.
+
+    Args:
+        chat_history (transcript.Transcript): The session's transcript.
+        window (int): Lines drawn as chat bubbles; earlier ones are folded.
+    """
+    earlier = max(len(chat_history) - window, 0)
+    if earlier:
+        _earlier_messages(chat_history, earlier)
+    for i in range(earlier, len(chat_history)):
+        with st.chat_message(ROLES[chat_history.role(i)]):
+            st.markdown(chat_history.text(i))
+
+
+def render_form(form):
+    """
+    Draw the form one section at a time. Only the sections in the form's last
+    diff are serialized again, and only once per change.
+
+    Args:
+        form (form_state.FormState): The session's form.
+    """
+    owner, revision, cached = st.session_state.get("_form_sections", (None, None, {}))
+    if owner == id(form) and revision == form.revision:
+        stale = ()
+    elif owner == id(form) and revision == form.revision - 1:
+        stale = form.changed
+    else:
+        cached, stale = {}, form.schema.sections
+    for name, value in form.sections(stale).items():
+        # a field is shown under its name, a question holds its own text
+        cached[name] = json.dumps(value if form.schema.is_questions else {name: value})
+    st.session_state["_form_sections"] = (id(form), form.revision, cached)
+    for name in form.schema.sections:
+        st.json(cached[name])
@@ -0,0 +1,647 @@
+"""
+Async slot-filling conversation engine, independent of Streamlit.
+
+All per-user data lives in an explicit SessionState object instead of
+`st.session_state`, and model calls go through `chain.ainvoke` behind a bounded
+semaphore, so one process can drive hundreds of sessions while only a fixed
+number of LLM requests are in flight.
+
+The Streamlit apps are thin clients: each describes its prompt, form and
+helpers in a ChatbotSpec and runs turns with `engine.run_turn`, which executes
+on the engine's own event loop thread.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from langchain_core.exceptions import OutputParserException
+
+import batching as batching_module
+import chain_registry
+import form_state
+import model_tiers
+import response_cache
+import session_store
+import speculative as speculative_turns
+import streaming
+import structured_output
+import telemetry
+from history import TOKEN_BUDGET, ChatHistory
+from transcript import Role, Transcript
+from telemetry import default_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class ChatbotSpec:
+    """
+    Everything that differs between the chatbot apps.
+
+    Args:
+        name (str): Prompt name, also used for the chain registry and cache keys.
+        template (str): Prompt template text.
+        response_model: Pydantic model of the response JSON.
+        api_key (str): OpenAI api key.
+        temperature (float): Sampling temperature.
+        form_template (dict): Empty form every session starts from. It is
+            compiled once into a shared form_state.FormSchema and never mutated.
+        intro (str): First bot message.
+        build_input (callable): `build_input(chat_history, form)` -> chain input dict,
+            with `form` the session's form_state.FormState.
+        extractor: Optional pre_extractor.PreExtractor run before the model.
+        validator: Optional slot_schema.SlotValidator checking inferences
+            before they are applied.
+        output_mode (str): "json" or "tool" (see structured_output),
+            OUTPUT_MODE by default.
+        tool_fields (tuple): Allowed inference field names in "tool" mode.
+        speculative (bool): Run turns as parallel extraction and question
+            calls (see speculative), SPECULATIVE_TURNS by default.
+        next_slot (callable): `next_slot(form)` -> slots the next question
+            should ask about, used to decide whether a drafted question is
+            still valid.
+        variants (prompt_variants.PromptRouter): Prompt variants sessions are
+            assigned to. Without it every session runs `template` as `name`.
+        is_complete (callable): `is_complete(form)` -> True once the form has
+            everything the app needs, for turns-to-completion accounting. By
+            default every slot of the template must be filled.
+        tiering (bool): Route turns between a fast and a strong model (see
+            model_tiers), MODEL_TIERING by default.
+        history_token_budget (int): Tokens of chat history sent with each
+            prompt (see history), HISTORY_TOKEN_BUDGET by default.
+    """
+
+    def __init__(self, name, template, response_model, api_key, temperature,
+                 form_template, intro, build_input, extractor=None, validator=None,
+                 output_mode=None, tool_fields=None, speculative=None, next_slot=None, variants=None,
+                 is_complete=None, tiering=None, history_token_budget=None):
+        self.name = name
+        self.template = template
+        self.response_model = response_model
+        self.api_key = api_key
+        self.temperature = temperature
+        self.form_template = form_template
+        self.intro = intro
+        self.build_input = build_input
+        self.extractor = extractor
+        self.validator = validator
+        self.output_mode = output_mode or structured_output.OUTPUT_MODE
+        self.tool_fields = tool_fields
+        self.speculative = speculative_turns.ENABLED if speculative is None else speculative
+        self.next_slot = next_slot or speculative_turns.next_slot
+        self.variants = variants
+        self.is_complete = is_complete
+        self.tiering = model_tiers.ENABLED if tiering is None else tiering
+        self.history_token_budget = history_token_budget or TOKEN_BUDGET
+
+
+class SessionState:
+    """State of one conversation."""
+
+    def __init__(self, session_id, form, intro, variant=None, token_budget=TOKEN_BUDGET):
+        """
+        Args:
+            session_id (str): Id of the conversation.
+            form (form_state.FormState): The session's answers.
+            intro (str): First bot message.
+            variant (str): Name of the prompt variant the session runs.
+            token_budget (int): Token budget of the prompt history.
+        """
+        self.session_id = session_id
+        self.variant = variant
+        self.turns = 0
+        self.completed = False
+        # the previous turn had to be escalated to the strong model tier
+        self.needs_strong = False
+        self.chat_history = Transcript()
+        self.chat_history.add(Role.BOT, intro)
+        self.history = ChatHistory(token_budget=token_budget)
+        self.history.append(f"Bot: {intro}")
+        self.json_data = form
+        self.next_question = ""
+        self.function_count = 0
+        # number of chat_history lines already written to the session store
+        self.saved_lines = 0
+        # id of the last processed turn, whose reply is next_question
+        self.last_turn_id = None
+
+    def to_meta(self):
+        """Everything except the transcript, as a compact dict for the session store."""
+        return {
+            "form": {
+                "schema": self.json_data.schema.name,
+                "answers": self.json_data.to_compact(),
+                "changed": sorted(self.json_data.changed, key=str),
+                "revision": self.json_data.revision,
+            },
+            "next_question": self.next_question,
+            "function_count": self.function_count,
+            "history": self.history.to_dict(),
+            "variant": self.variant,
+            "turns": self.turns,
+            "completed": self.completed,
+            "needs_strong": self.needs_strong,
+            "last_turn_id": self.last_turn_id,
+        }
+
+    @classmethod
+    def from_meta(cls, session_id, meta, chat_history):
+        """
+        Args:
+            chat_history: The stored transcript, a Transcript the state may
+                own or a list of lines.
+        """
+        state = cls.__new__(cls)
+        state.session_id = session_id
+        state.chat_history = chat_history if isinstance(chat_history, Transcript) else Transcript(chat_history)
+        state.history = ChatHistory.from_dict(meta["history"])
+        form = meta["form"]
+        state.json_data = form_state.FormState.from_compact(
+            form_state.get_schema(form["schema"]), form["answers"], form.get("changed", ()), form.get("revision", 0)
+        )
+        state.next_question = meta["next_question"]
+        state.function_count = meta["function_count"]
+        state.variant = meta.get("variant")
+        state.turns = meta.get("turns", 0)
+        state.completed = meta.get("completed", False)
+        state.needs_strong = meta.get("needs_strong", False)
+        state.last_turn_id = meta.get("last_turn_id")
+        state.saved_lines = len(state.chat_history)
+        return state
+
+
+class ConversationEngine:
+    """
+    Runs slot-filling turns for many sessions concurrently.
+
+    Args:
+        spec (ChatbotSpec): The chatbot to run.
+        chain: Runnable to use instead of the registry chain (e.g. a fake model).
+        cache (response_cache.ResponseCache): Response cache, the shared one by default.
+        max_concurrency (int): Maximum number of model calls in flight.
+        store (session_store.SessionStore): Where sessions are persisted,
+            SESSION_STORE_URL by default.
+        speculative_chains (tuple): (extraction, question) runnables to use
+            instead of the registry chains in speculative mode.
+        telemetry (telemetry.Telemetry): Where turn traces are recorded, the
+            process-wide collector by default.
+        tier_chains (dict): model tier -> runnable, to use instead of the
+            registry chains when tiering is on.
+        batching (bool): Send concurrent non-streaming model calls through
+            micro-batching dispatchers (see batching), MICRO_BATCHING by default.
+    """
+
+    def __init__(self, spec, chain=None, cache=None, max_concurrency=16, store=None, speculative_chains=None,
+                 telemetry=None, tier_chains=None, batching=None):
+        self.spec = spec
+        self.telemetry = telemetry or default_telemetry
+        self.schema = form_state.schema_for(spec.name, spec.form_template)
+        self.chain = chain
+        self.speculative_chains = speculative_chains
+        self.tier_chains = tier_chains
+        self.cache = cache or response_cache.default_cache
+        self.store = store or session_store.open_store()
+        self.max_concurrency = max_concurrency
+        self.batching = batching_module.ENABLED if batching is None else batching
+        self._dispatchers = {}
+        # (session_id, turn_id) -> future of the turn's reply, while it runs
+        self._turns = {}
+        self._semaphore = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def get_chain(self, state=None, tier=None):
+        """
+        The chain for the session's prompt variant and the model tier (the
+        injected chain, if any, for all).
+        """
+        if tier is not None and self.tier_chains is not None:
+            return self.tier_chains[tier]
+        if self.chain is not None:
+            return self.chain
+        spec = self.spec
+        name, template = spec.name, spec.template
+        if spec.variants is not None and state is not None:
+            variant = spec.variants.get(state.variant, state.session_id)
+            name, template = variant.name, variant.template
+        return chain_registry.get_chain(
+            name, template, spec.response_model,
+            api_key=spec.api_key, temperature=spec.temperature,
+            mode=spec.output_mode, field_names=spec.tool_fields,
+            model_name=model_tiers.model_name(tier) if tier is not None else None,
+        )
+
+    def get_speculative_chains(self):
+        if self.speculative_chains is None:
+            spec = self.spec
+            extraction = chain_registry.get_chain(
+                f"{spec.name}.extract", speculative_turns.EXTRACTION_TEMPLATE, None,
+                api_key=spec.api_key, temperature=0, model_name=speculative_turns.EXTRACTION_MODEL,
+            )
+            question = chain_registry.get_chain(
+                f"{spec.name}.question", speculative_turns.QUESTION_TEMPLATE, None,
+                api_key=spec.api_key, temperature=spec.temperature,
+            )
+            self.speculative_chains = (extraction, question)
+        return self.speculative_chains
+
+    def get_dispatcher(self, chain):
+        """
+        The micro-batching dispatcher of a chain, created on first use. It keeps
+        the calls of its batches within the engine's max_concurrency.
+        """
+        dispatcher = self._dispatchers.get(id(chain))
+        if dispatcher is None:
+            dispatcher = batching_module.BatchDispatcher(chain, max_calls=self.max_concurrency)
+            self._dispatchers[id(chain)] = dispatcher
+        return dispatcher
+
+    def new_session(self, session_id=None):
+        """Create and store the state of a new conversation."""
+        # Sessions only hold their own answers over the shared, immutable schema
+        session_id = session_id or uuid.uuid4().hex
+        variants = self.spec.variants
+        state = SessionState(
+            session_id,
+            form_state.FormState(self.schema),
+            self.spec.intro,
+            variant=variants.assign(session_id) if variants is not None else self.spec.name,
+            token_budget=self.spec.history_token_budget,
+        )
+        self.store.save(state)
+        return state
+
+    def load_session(self, session_id):
+        """Return a stored conversation, or None if it is unknown or expired."""
+        return self.store.load(session_id)
+
+    async def handle_turn(self, state, user_input, on_delta=None, turn_id=None):
+        """
+        Process one user message and return the bot's reply.
+
+        Args:
+            state (SessionState): The conversation to update.
+            user_input (str): The user message.
+            on_delta (callable): Receives next_question text while it streams,
+                and streaming.RESTART when a retry starts it over.
+            turn_id (str): Id of this submission of the message. A turn id the
+                session already processed, or is processing, is not run again:
+                its reply is returned and the duplicate counted.
+        """
+        trace = telemetry.TurnTrace(state.variant or self.spec.name, state.session_id)
+        key = (state.session_id, turn_id)
+        if turn_id is not None and (turn_id == state.last_turn_id or key in self._turns):
+            trace.duplicate = True
+            self.telemetry.record(trace)
+            print(f"Duplicate turn {turn_id} of session {state.session_id} suppressed")
+            if turn_id == state.last_turn_id:
+                return state.next_question
+            # a cancelled duplicate must not cancel the turn it waits for
+            return await asyncio.shield(self._turns[key])
+
+        token = telemetry.current_trace.set(trace)
+        future = None
+        if turn_id is not None:
+            future = self._turns[key] = asyncio.get_running_loop().create_future()
+        try:
+            next_question = await self._handle_turn(state, user_input, on_delta, turn_id)
+            if future is not None:
+                future.set_result(next_question)
+            return next_question
+        except BaseException as e:
+            if future is not None:
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                    # retrieved here, so a future nobody waits for does not log it
+                    future.exception()
+                else:
+                    future.cancel()
+            raise
+        finally:
+            self._turns.pop(key, None)
+            telemetry.current_trace.reset(token)
+            self.telemetry.record(trace)
+
+    async def _handle_turn(self, state, user_input, on_delta, turn_id=None):
+        # A turn that fails, or can not be saved, leaves no trace in the session,
+        # so submitting the message again does not repeat it in the transcript
+        # or the prompt
+        lines, turns, history = len(state.chat_history), state.turns, state.history.to_dict()
+        reply = state.next_question, state.last_turn_id, state.completed
+        form = state.json_data
+        answers, changed, revision = dict(form.answers), form.changed, form.revision
+        try:
+            next_question = await self._run_turn(state, user_input, on_delta, turn_id)
+            # Only the small meta record and the two new transcript lines are written
+            await asyncio.to_thread(self.store.save, state)
+        except BaseException:
+            state.chat_history.truncate(lines)
+            state.turns, state.history = turns, ChatHistory.from_dict(history)
+            state.next_question, state.last_turn_id, state.completed = reply
+            # a streamed reply may have applied its inferences before failing
+            form.answers, form.changed, form.revision = answers, changed, revision
+            raise
+        return next_question
+
+    async def _run_turn(self, state, user_input, on_delta, turn_id):
+        asked = state.chat_history.text(-1)
+        state.turns += 1
+        state.chat_history.add(Role.USER, user_input)
+        state.history.append(f"You: {user_input}")
+        filled_before = state.json_data.filled()
+
+        # Trivially parseable answers are filled locally without an LLM call
+        response = None
+        extractor = self.spec.extractor
+        if extractor is not None:
+            response = extractor.extract(user_input, state.json_data.to_dict(), asked)
+            telemetry.current_trace.get().pre_extracted = response is not None
+        diff, clarifications, applied = [], [], []
+
+        def apply_inferences(inferences):
+            # Values are type-checked and coerced locally; only an ambiguous one
+            # costs the user a clarification question
+            validator = self.spec.validator
+            if validator is not None:
+                inferences, clarification = validator.check(inferences)
+                if clarification is not None:
+                    clarifications.append(clarification)
+            diff.extend(state.json_data.apply(inferences))
+            applied.append(True)
+
+        def apply_streamed(inferences):
+            # A streamed reply's inferences are applied as soon as they are
+            # complete; malformed ones are left to the check of the whole reply
+            if structured_output.has_inferences({"inferences": inferences}, self.schema.key_field):
+                apply_inferences(inferences)
+
+        if response is None:
+            response = await self.call_openai_api(
+                state, filled_before, on_delta, on_inferences=apply_streamed if on_delta is not None else None
+            )
+        if not applied:
+            apply_inferences(response.get("inferences"))
+        next_question = clarifications[-1] if clarifications else response.get("next_question", "")
+        telemetry.current_trace.get().changed_slots = [key for key, _ in diff]
+        state.history.mark_answered(state.json_data.filled() - filled_before)
+        if not state.completed and self._is_complete(state.json_data):
+            state.completed = True
+            telemetry.current_trace.get().completed_turns = state.turns
+
+        state.next_question = next_question
+        state.last_turn_id = turn_id
+        state.chat_history.add(Role.BOT, next_question)
+        state.history.append(f"Bot: {next_question}")
+        return next_question
+
+    def _is_complete(self, form):
+        if self.spec.is_complete is not None:
+            return self.spec.is_complete(form.to_dict())
+        return form.filled() >= form.schema.keys
+
+    async def call_openai_api(self, state, filled_before, on_delta=None, on_inferences=None):
+        """
+        Ask the model for inferences and the next question, or reuse a cached answer.
+
+        Args:
+            on_delta (callable): Receives next_question text while it streams.
+            on_inferences (callable): Receives the inferences of a streamed
+                reply once they are complete.
+        """
+        trace = telemetry.current_trace.get() or telemetry.TurnTrace(state.variant or self.spec.name, state.session_id)
+        start = time.perf_counter()
+        # Only the recent turns and a summary of older ones are sent
+        chat_history = state.history.prompt_lines(filled_before)
+        input_data = self.spec.build_input(chat_history, state.json_data)
+        trace.prompt_build_ms = (time.perf_counter() - start) * 1000
+
+        # Skip the model if the same form state and message were answered before
+        cache_key = response_cache.make_key(
+            state.variant or self.spec.name, state.json_data.to_compact(), chat_history[-1]
+        )
+        response = await self._cache_call(self.cache.get, cache_key)
+        trace.cache_hit = response is not None
+        if response is None:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            if self.spec.speculative:
+                response = await self._speculative_turn(state, input_data)
+                if on_delta is not None:
+                    on_delta(response["next_question"])
+            elif self.spec.tiering:
+                response = await self._tiered_turn(state, input_data)
+                if on_delta is not None:
+                    on_delta(response["next_question"])
+            else:
+                response = await self._invoke_model(state, input_data, on_delta, on_inferences=on_inferences)
+            await self._cache_call(self.cache.set, cache_key, response)
+        return response
+
+    async def _cache_call(self, method, *args):
+        # The SQLite layer blocks, so it runs off the event loop like store.save
+        if self.cache.sqlite_path:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _speculative_turn(self, state, input_data):
+        """
+        Extract the answers and draft the next question concurrently.
+
+        The draft bets that the message answers the slot that was just asked
+        about, and asks about the slot after it. It is redrafted only if the
+        extraction leads to a different slot.
+        """
+        form = state.json_data
+        before = form.to_dict()
+        predicted = form_state.FormState(form.schema, form.answers)
+        for slot in self.spec.next_slot(before):
+            predicted.set(slot, "(answered in the latest message)")
+        slots = self.spec.next_slot(predicted.to_dict())
+        base = {"details": "", **input_data, "key_field": form.schema.key_field}
+        extraction_chain, question_chain = self.get_speculative_chains()
+
+        def question_input(form_dict, slots):
+            return dict(
+                base,
+                current_json=json.dumps(form_dict, separators=(",", ":")),
+                ask_about=speculative_turns.describe_slots(form_dict, slots),
+            )
+
+        extraction, draft = await asyncio.gather(
+            self._invoke_model(state, base, chain=extraction_chain, check=speculative_turns.check_extraction),
+            self._invoke_model(state, question_input(before, slots), chain=question_chain),
+        )
+        after = form_state.FormState(form.schema, form.answers)
+        after.apply(extraction.get("inferences"))
+        after_dict = after.to_dict()
+        new_slots = self.spec.next_slot(after_dict)
+        speculative_turns.stats.add(redrafted=new_slots != slots)
+        if new_slots != slots:
+            draft = await self._invoke_model(state, question_input(after_dict, new_slots), chain=question_chain)
+        return {"inferences": extraction.get("inferences") or [], "next_question": draft["next_question"]}
+
+    async def _tiered_turn(self, state, input_data):
+        """
+        Run the turn on the model tier picked for it. A fast-tier reply that
+        does not parse or does not validate is asked again on the strong tier.
+        """
+        user_input = state.chat_history.text(-1)
+        tier = model_tiers.classify(user_input, len(state.json_data.open_sections()), state.needs_strong)
+        response = await self._call_tier(state, input_data, tier)
+        validator = self.spec.validator
+        escalate = tier == model_tiers.FAST and (
+            response is None or (validator is not None and validator.rejects(response.get("inferences")))
+        )
+        if escalate:
+            model_tiers.stats.escalate(tier)
+            # counted in model_tiers.stats, served on /metrics
+            logger.debug("escalated a turn of session %s to the strong model tier", state.session_id)
+            tier = model_tiers.STRONG
+            response = await self._call_tier(state, input_data, tier)
+        state.needs_strong = escalate
+        trace = telemetry.current_trace.get()
+        if trace is not None:
+            trace.tier = tier
+        return response
+
+    async def _call_tier(self, state, input_data, tier):
+        """Call one model tier; None if a fast-tier reply can not be parsed."""
+        trace = telemetry.current_trace.get()
+        tokens = (trace.prompt_tokens, trace.completion_tokens) if trace is not None else (0, 0)
+        start = time.perf_counter()
+        try:
+            # a fast-tier failure is escalated instead of retried
+            return await self._invoke_model(
+                state, input_data, chain=self.get_chain(state, tier),
+                retries=0 if tier == model_tiers.FAST else structured_output.PARSE_RETRIES,
+            )
+        except OutputParserException:
+            if tier == model_tiers.STRONG:
+                raise
+            return None
+        finally:
+            if trace is not None:
+                tokens = (trace.prompt_tokens - tokens[0], trace.completion_tokens - tokens[1])
+            model_tiers.stats.add(tier, (time.perf_counter() - start) * 1000, *tokens)
+
+    async def _invoke_model(self, state, input_data, on_delta=None, chain=None,
+                            check=structured_output.check_response, retries=structured_output.PARSE_RETRIES,
+                            on_inferences=None):
+        """
+        Call the model, retrying up to `retries` times when the reply can not
+        be parsed even after local repair, or does not pass
+        `check(response, key_field)`. A streamed reply that is retried sends
+        streaming.RESTART to `on_delta`, so the partial text can be dropped.
+        """
+        mode = self.spec.output_mode
+        chain = chain or self.get_chain(state)
+        trace = telemetry.current_trace.get()
+        dispatcher = self.get_dispatcher(chain) if self.batching and on_delta is None else None
+        for attempt in range(retries + 1):
+            # batched calls are bounded by their dispatcher, see get_dispatcher
+            async with contextlib.nullcontext() if dispatcher is not None else self._semaphore:
+                # a call coalesced with an equal one in flight costs no model call
+                shared = dispatcher is not None and dispatcher.coalesces(input_data)
+                if shared:
+                    if trace is not None:
+                        trace.coalesced_calls += 1
+                else:
+                    state.function_count += 1
+                    structured_output.stats.add(mode, "calls")
+                timer = telemetry.ModelCallTimer()
+                config = {"callbacks": [timer]}
+                try:
+                    if on_delta is not None:
+                        response = await streaming.astream_invoke(
+                            chain, input_data, on_delta, on_inferences=on_inferences, config=config
+                        )
+                    elif dispatcher is not None:
+                        response = await dispatcher.submit(input_data, config)
+                    else:
+                        response = await chain.ainvoke(input_data, config)
+                    return check(response, self.schema.key_field)
+                except OutputParserException as e:
+                    structured_output.stats.add(mode, "parse_failures")
+                    if trace is not None:
+                        trace.parse_failures += 1
+                    # counted in the trace and structured_output.stats
+                    logger.debug("unparseable response: %s", e)
+                    if attempt == retries:
+                        raise
+                    structured_output.stats.add(mode, "retries")
+                    if trace is not None:
+                        trace.retries += 1
+                    if on_delta is not None:
+                        on_delta(streaming.RESTART)
+                finally:
+                    if trace is not None and not shared:
+                        timer.finish(trace)
+
+    def _get_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name=f"engine-{self.spec.name}", daemon=True
+                ).start()
+        return self._loop
+
+    def run_turn(self, state, user_input, render_stream=None, turn_id=None):
+        """
+        Run handle_turn from synchronous code, e.g. a Streamlit script.
+
+        The turn executes on the engine's event loop thread, so every session of
+        the process shares one semaphore. With `render_stream` (e.g.
+        `st.write_stream`) the reply is rendered in the calling thread while it
+        streams. It is called again for every retried model call, and should
+        replace what the previous call drew.
+        """
+        loop = self._get_loop()
+        if render_stream is None:
+            return asyncio.run_coroutine_threadsafe(
+                self.handle_turn(state, user_input, turn_id=turn_id), loop
+            ).result()
+
+        deltas = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self.handle_turn(state, user_input, on_delta=deltas.put, turn_id=turn_id), loop
+        )
+        future.add_done_callback(lambda _: deltas.put(None))
+
+        finished = False
+
+        def generate():
+            nonlocal finished
+            while True:
+                delta = deltas.get()
+                if delta is None:
+                    finished = True
+                    return
+                if delta is streaming.RESTART:
+                    return
+                yield delta
+
+        while not finished:
+            render_stream(generate())
+        return future.result()
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(spec, **kwargs):
+    """Return the process-wide engine for `spec.name`, creating it on first use."""
+    with _engines_lock:
+        engine = _engines.get(spec.name)
+        if engine is None:
+            engine = ConversationEngine(spec, **kwargs)
+            _engines[spec.name] = engine
+            chain_registry.warm_up()
+    # The Streamlit apps expose metrics on METRICS_PORT, if set
+    telemetry.start_metrics_server()
+    return engine
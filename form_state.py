@@ -0,0 +1,177 @@
+"""
+Copy-on-write per-session form state over a shared, immutable schema.
+
+The apps used to put the module-level `json_template` / `tripplan_json` dict
+straight into session state, so every session of a process wrote into the same
+object. Deep-copying the (possibly abc.json-sized) template per session fixes
+that but costs memory and time at scale. Instead, the template is compiled once
+into a FormSchema, and each session only keeps a FormState holding the answers
+it has actually given. The full JSON is materialized on demand, as a fresh
+object, when a prompt or the UI needs it.
+
+Answers are indexed by question number / field name, so a turn's inferences
+are applied in O(1) each. apply returns the turn's diff, the [key, value]
+pairs that actually changed, and bumps the form's revision. The diff is
+what the rest of a turn works from:
+- the prompt carries only the open sections and those changed by the
+  previous turn (prompt_view), not the whole form;
+- the UI re-serializes only the changed sections (chat_ui.render_form);
+- the turn trace logs the changed keys, and the session meta keeps the
+  changed set and revision, so a reloaded session builds the same prompt.
+"""
+import json
+import threading
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+class FormSchema:
+    """
+    Immutable description of a form, shared by every session.
+
+    Two shapes are supported: the `{"questions": [...]}` list used by web.py and
+    web2.py, keyed by question_number, and the field dict used by web3.py, keyed
+    by field name (dotted names address nested fields).
+    """
+
+    def __init__(self, name, template):
+        self.name = name
+        self.is_questions = "questions" in template
+        self.key_field = "question_number" if self.is_questions else "field_name"
+        # Kept only as JSON text so nobody can mutate the shared template
+        if self.is_questions:
+            self._items = tuple(
+                (q["question_number"], json.dumps(q)) for q in template["questions"]
+            )
+        else:
+            self._items = tuple((name, json.dumps(value)) for name, value in template.items())
+        self.keys = frozenset(key for key, _ in self._items)
+        # top-level entries in template order
+        self.sections = tuple(key for key, _ in self._items)
+
+    def section_of(self, key):
+        """The top-level entry an answer key belongs to."""
+        return key if self.is_questions else key.split(".")[0]
+
+    def materialize(self, answers, sections=None):
+        """
+        Build a fresh template-shaped dict with the given answers filled in.
+
+        Args:
+            answers (dict): answer key -> value.
+            sections: Top-level entries to include, all by default.
+        """
+        if self.is_questions:
+            questions = []
+            for number, text in self._items:
+                if sections is not None and number not in sections:
+                    continue
+                question = json.loads(text)
+                if number in answers:
+                    question["answer"] = answers[number]
+                questions.append(question)
+            return {"questions": questions}
+
+        form = {name: json.loads(text) for name, text in self._items if sections is None or name in sections}
+        for key, value in answers.items():
+            *parents, name = key.split(".")
+            if sections is not None and (parents[0] if parents else name) not in sections:
+                continue
+            target = form
+            for parent in parents:
+                current = target.get(parent)
+                if not isinstance(current, dict):
+                    # a scalar answer with sub-fields keeps the abc.json shape
+                    target[parent] = {} if _is_empty(current) else {"value": current}
+                target = target[parent]
+            if isinstance(target.get(name), dict) and target[name] and not isinstance(value, dict):
+                target[name]["value"] = value
+            else:
+                target[name] = value
+        return form
+
+
+def schema_for(name, template):
+    """Return the process-wide FormSchema registered under `name`."""
+    schema = _schemas.get(name)
+    if schema is None:
+        with _schemas_lock:
+            schema = _schemas.setdefault(name, FormSchema(name, template))
+    return schema
+
+
+def get_schema(name):
+    return _schemas[name]
+
+
+def _is_empty(value):
+    return value in ({}, [], "", None)
+
+
+class FormState:
+    """The answers of one session, laid over a shared FormSchema."""
+
+    __slots__ = ("schema", "answers", "changed", "revision")
+
+    def __init__(self, schema, answers=None, changed=(), revision=0):
+        self.schema = schema
+        self.answers = dict(answers or {})
+        # sections changed by the last apply that changed anything
+        self.changed = frozenset(changed)
+        self.revision = revision
+
+    def set(self, key, value):
+        # The questions form only has the template's question numbers
+        if self.schema.is_questions and key not in self.schema.keys:
+            return False
+        self.answers[key] = value
+        return True
+
+    def apply(self, inferences):
+        """
+        Write the answers from a list of model/pre-extractor inferences.
+
+        Returns:
+            list: The diff, [key, value] pairs of the answers that changed.
+        """
+        diff = []
+        for update in inferences or ():
+            key, value = update[self.schema.key_field], update["answer"]
+            if self.answers.get(key, "") != value and self.set(key, value):
+                diff.append([key, value])
+        if diff:
+            self.changed = frozenset(self.schema.section_of(key) for key, _ in diff)
+            self.revision += 1
+        return diff
+
+    def filled(self):
+        """Keys of the slots that already have an answer."""
+        return {key for key, value in self.answers.items() if not _is_empty(value)}
+
+    def open_sections(self):
+        """Top-level entries without any answer."""
+        return set(self.schema.sections) - {self.schema.section_of(key) for key in self.filled()}
+
+    def to_dict(self):
+        """A fresh template-shaped dict, safe to mutate or serialize."""
+        return self.schema.materialize(self.answers)
+
+    def prompt_view(self):
+        """Template-shaped dict of the open sections and those the last change touched."""
+        return self.schema.materialize(self.answers, self.open_sections() | self.changed)
+
+    def sections(self, names):
+        """Fresh values of the given top-level entries, by question number / field name."""
+        form = self.schema.materialize(self.answers, set(names))
+        if self.schema.is_questions:
+            return {question["question_number"]: question for question in form["questions"]}
+        return form
+
+    def to_compact(self):
+        """Answers only, as JSON-friendly [key, value] pairs (question numbers stay ints)."""
+        return sorted(([key, value] for key, value in self.answers.items()), key=lambda kv: str(kv[0]))
+
+    @classmethod
+    def from_compact(cls, schema, pairs, changed=(), revision=0):
+        return cls(schema, {key: value for key, value in pairs}, changed, revision)
@@ -0,0 +1,114 @@
+"""
+Bounded chat-history window for the slot-filling prompt.
+
+Only the last `max_turns` exchanges are sent to the model verbatim. Older user
+messages are folded into a rolling summary as they leave the window, one note
+per message, so the summary is never recomputed. A folded message whose answers
+are already recorded in the form (`json_data`) is dropped, since the form in the
+prompt carries that information. The whole context is kept under a token budget.
+
+The budget is HISTORY_TOKEN_BUDGET tokens (800 by default), and HISTORY_TURNS
+exchanges (4 by default) are kept verbatim; an app can set its own budget in
+its ChatbotSpec.
+"""
+import os
+from collections import deque
+
+TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+MAX_TURNS = int(os.getenv("HISTORY_TURNS", "4"))
+SUMMARY_PREFIX = "Summary of earlier conversation: "
+NOTE_CHARS = 120
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+class ChatHistory:
+    """Recent turns verbatim plus an incrementally updated summary of older ones."""
+
+    def __init__(self, max_turns=MAX_TURNS, token_budget=TOKEN_BUDGET, count_tokens=estimate_tokens):
+        self.max_lines = max_turns * 2
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens
+        # each entry is [line, slots answered by that line]
+        self.recent = deque()
+        # each entry is (note, slots answered by the folded message)
+        self.summary = deque()
+
+    def to_dict(self):
+        """Compact JSON-serializable form of the window, for session storage."""
+        return {
+            "max_lines": self.max_lines,
+            "token_budget": self.token_budget,
+            "recent": [[line, sorted(slots)] for line, slots in self.recent],
+            "summary": [[note, sorted(slots)] for note, slots in self.summary],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        history = cls(token_budget=data["token_budget"])
+        history.max_lines = data["max_lines"]
+        history.recent = deque([line, set(slots)] for line, slots in data["recent"])
+        history.summary = deque((note, frozenset(slots)) for note, slots in data["summary"])
+        return history
+
+    def append(self, line):
+        """Add a "You: ..." or "Bot: ..." line and fold what falls out of the window."""
+        self.recent.append([line, set()])
+        while len(self.recent) > self.max_lines:
+            self._fold_oldest()
+
+    def mark_answered(self, slots):
+        """Record which slots the latest user message filled."""
+        for entry in reversed(self.recent):
+            if entry[0].startswith("You: "):
+                entry[1].update(slots)
+                break
+
+    def _fold_oldest(self):
+        line, slots = self.recent.popleft()
+        # Bot questions are not worth keeping, the form already says what is open
+        if not line.startswith("You: "):
+            return
+        text = line[len("You: "):].strip()
+        if len(text) > NOTE_CHARS:
+            text = text[:NOTE_CHARS - 3] + "..."
+        self.summary.append((text, frozenset(slots)))
+
+    def prompt_lines(self, filled=()):
+        """
+        Return the history to send to the model, newest line last.
+
+        Args:
+            filled (set): Slots already answered in the form. Summary notes whose
+                answers are all recorded there are left out.
+        """
+        filled = set(filled)
+        lines = [entry[0] for entry in self.recent]
+
+        used = sum(self.count_tokens(line) for line in lines)
+        # Keep at least the latest line, it is the input being answered
+        while used > self.token_budget and len(self.recent) > 1:
+            used -= self.count_tokens(self.recent[0][0])
+            self._fold_oldest()
+            lines.pop(0)
+
+        # Newest notes win. Notes about filled slots or that no longer fit are
+        # dropped for good, so the summary itself stays bounded.
+        budget = self.token_budget - used - self.count_tokens(SUMMARY_PREFIX)
+        kept = deque()
+        for note, slots in reversed(self.summary):
+            if slots and slots <= filled:
+                continue
+            cost = self.count_tokens(note) + 1
+            if cost > budget:
+                break
+            kept.appendleft((note, slots))
+            budget -= cost
+        self.summary = kept
+
+        if kept:
+            return [SUMMARY_PREFIX + "; ".join(note for note, _ in kept)] + lines
+        return lines
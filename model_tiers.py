@@ -0,0 +1,132 @@
+"""
+Routing turns between a fast, cheap model tier and a strong one.
+
+Most turns are short answers or confirmations that a small model handles as
+well as a large one. Each turn is classified locally, without a model call:
+
+- the previous turn of the session needed the strong tier -> strong;
+- the user message is longer than TIER_FAST_MAX_WORDS words (it probably
+  answers several slots at once) -> strong;
+- more than TIER_FAST_MAX_OPEN slots are still open (the model has to pick
+  among many) -> strong;
+- otherwise -> fast.
+
+A fast-tier reply that can not be parsed, or whose inferences fail slot
+validation, is escalated: the turn is asked again on the strong tier, and the
+session's next turn starts there too.
+
+Set MODEL_TIERING=1 to enable it. FAST_MODEL and STRONG_MODEL pick the models
+(the ChatOpenAI default for an empty STRONG_MODEL). Calls, escalations,
+latency, tokens and an estimated cost are counted per tier, printed and
+served on /metrics.
+"""
+import os
+import threading
+
+import telemetry
+
+ENABLED = os.getenv("MODEL_TIERING", "0") == "1"
+FAST_MODEL = os.getenv("FAST_MODEL", "gpt-4o-mini")
+STRONG_MODEL = os.getenv("STRONG_MODEL", "") or None
+FAST_MAX_WORDS = int(os.getenv("TIER_FAST_MAX_WORDS", "12"))
+FAST_MAX_OPEN = int(os.getenv("TIER_FAST_MAX_OPEN", "6"))
+
+FAST = "fast"
+STRONG = "strong"
+TIERS = (FAST, STRONG)
+
+
+def _prices(name, default):
+    """USD per million (prompt, completion) tokens, from e.g. FAST_MODEL_PRICE="0.15,0.6"."""
+    prompt, completion = os.getenv(name, default).split(",")
+    return float(prompt), float(completion)
+
+
+PRICES = {
+    FAST: _prices("FAST_MODEL_PRICE", "0.15,0.6"),
+    STRONG: _prices("STRONG_MODEL_PRICE", "2.5,10"),
+}
+
+
+def model_name(tier):
+    return FAST_MODEL if tier == FAST else STRONG_MODEL
+
+
+def classify(user_input, open_fields, needed_strong):
+    """
+    Pick the tier for a turn.
+
+    Args:
+        user_input (str): The latest user message.
+        open_fields (int): Number of slots still unanswered.
+        needed_strong (bool): The session's previous turn failed on the fast tier.
+    """
+    if needed_strong:
+        return STRONG
+    if len(user_input.split()) > FAST_MAX_WORDS:
+        return STRONG
+    if open_fields > FAST_MAX_OPEN:
+        return STRONG
+    return FAST
+
+
+class TierStats:
+    """Calls, escalations, latency, tokens and estimated cost per tier."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {tier: {"calls": 0, "escalations": 0, "latency_ms": 0.0,
+                              "prompt_tokens": 0, "completion_tokens": 0} for tier in TIERS}
+
+    def add(self, tier, latency_ms, prompt_tokens, completion_tokens):
+        with self._lock:
+            counts = self.counts[tier]
+            counts["calls"] += 1
+            counts["latency_ms"] += latency_ms
+            counts["prompt_tokens"] += prompt_tokens
+            counts["completion_tokens"] += completion_tokens
+
+    def escalate(self, tier):
+        with self._lock:
+            self.counts[tier]["escalations"] += 1
+
+    def cost(self, tier):
+        counts = self.counts[tier]
+        prompt_price, completion_price = PRICES[tier]
+        return (counts["prompt_tokens"] * prompt_price + counts["completion_tokens"] * completion_price) / 1e6
+
+    def report(self):
+        """Per tier: calls, escalation rate, mean latency and estimated cost in USD."""
+        report = {}
+        with self._lock:
+            for tier, counts in self.counts.items():
+                calls = counts["calls"]
+                report[tier] = {
+                    **counts,
+                    "escalation_rate": counts["escalations"] / calls if calls else 0.0,
+                    "mean_latency_ms": counts["latency_ms"] / calls if calls else 0.0,
+                    "cost_usd": self.cost(tier),
+                }
+        return report
+
+    def render_prometheus(self):
+        lines = []
+        report = self.report()
+        for name, key, help_text in (
+            ("calls", "calls", "Turns sent to each model tier"),
+            ("escalations", "escalations", "Fast-tier turns escalated to the strong tier"),
+            ("latency_seconds", "latency_ms", "Time spent in each model tier"),
+            ("prompt_tokens", "prompt_tokens", "Prompt tokens per model tier"),
+            ("completion_tokens", "completion_tokens", "Completion tokens per model tier"),
+            ("cost_usd", "cost_usd", "Estimated cost per model tier"),
+        ):
+            lines.append(f"# HELP chatbot_tier_{name}_total {help_text}.")
+            lines.append(f"# TYPE chatbot_tier_{name}_total counter")
+            for tier, counts in report.items():
+                value = counts[key] / 1000 if key == "latency_ms" else counts[key]
+                lines.append(f'chatbot_tier_{name}_total{{tier="{tier}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+stats = TierStats()
+telemetry.default_telemetry.add_collector(stats.render_prometheus)
@@ -0,0 +1,324 @@
+"""
+Rule-based extraction that answers trivially parseable user input locally.
+
+Many answers need no model at all: "3", "01/06/2024 - 10/06/2024",
+"10000 - 15000" or an enum value such as "oneway". The pre-extractor runs
+before call_openai_api and, when it is confident, returns the inferences and
+the next question itself so the turn costs no LLM round-trip. It is only
+confident when the whole message is consumed by the rule of exactly one open
+slot; anything else falls back to the LLM. A message that is only a number
+("40") could answer several questions, so it is taken only for a question the
+bot's last message asked about (see QUESTION_TOPICS). A budget must be at
+least 100, so a range of small numbers ("2 - 3") is never taken as one.
+
+Inferences use the same shape as the model output, so they are applied to the
+form exactly like the model's.
+"""
+import functools
+import re
+import threading
+from datetime import datetime
+
+import question_scheduler
+import schema_file
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+# Common phrasings of abc.json enum values, keyed by field path
+ENUM_ALIASES = {
+    "optimizeType": {"automatic": "auto", "auto sequence": "auto", "manually": "manual"},
+    "traveller_type": {
+        "alone": "solo", "just me": "solo", "only me": "solo",
+        "with friends": "friends", "with my friends": "friends",
+        "with my partner": "couple", "with my wife": "couple", "with my husband": "couple",
+    },
+    "trip_direction": {
+        "one way": "oneway", "one-way": "oneway",
+        "round trip": "return", "return trip": "return", "both ways": "return",
+    },
+    "time_schedule.duration.unit": {
+        "day": "days", "weeks": "week", "months": "month",
+    },
+}
+
+_DATE = r"(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})"
+_DATE_RANGE_RE = re.compile(
+    rf"(?:from\s+)?{_DATE}\s*(?:-|to|till|until)\s*{_DATE}"
+)
+_TRAVELLERS_RE = re.compile(
+    r"(?:we are|we're|there are|there will be)?\s*"
+    r"(\d{1,2}|" + "|".join(NUMBER_WORDS) + r")"
+    r"(?:\s+(?:people|persons|travell?ers|adults|of us|pax|members))?"
+)
+_BARE_NUMBER_RE = re.compile(r"[\d,.]+\s*k?|" + "|".join(NUMBER_WORDS))
+_AMOUNT = r"(?:rs\.?|inr|₹|\$|usd)?\s*(\d[\d,]*(?:\.\d+)?)\s*(k)?"
+_BUDGET_RE = re.compile(
+    rf"(?:around|about|approx(?:imately)?|between|roughly)?\s*{_AMOUNT}"
+    rf"(?:\s*(?:-|to|and)\s*{_AMOUNT})?"
+    r"(?:\s*(?:rs|inr|rupees|dollars|usd))?"
+)
+
+
+def normalize(text):
+    """Lower-case the message, drop the "You: " prefix and surrounding punctuation."""
+    if text.startswith("You: "):
+        text = text[len("You: "):]
+    return " ".join(text.lower().split()).strip(" .!?")
+
+
+def parse_date_range(text):
+    """Return "dd/mm/yyyy - dd/mm/yyyy" for a valid, ordered date range."""
+    match = _DATE_RANGE_RE.fullmatch(text)
+    if not match:
+        return None
+    d1, m1, y1, d2, m2, y2 = (int(g) for g in match.groups())
+    try:
+        start = datetime(y1, m1, d1)
+        end = datetime(y2, m2, d2)
+    except ValueError:
+        return None
+    if end < start:
+        return None
+    return f"{start:%d/%m/%Y} - {end:%d/%m/%Y}"
+
+
+def parse_traveller_count(text):
+    """Return the number of travellers as a string."""
+    if text in ("just me", "only me", "alone", "solo", "myself"):
+        return "1"
+    if text in ("couple", "a couple", "two of us", "me and my wife", "me and my husband"):
+        return "2"
+    match = _TRAVELLERS_RE.fullmatch(text)
+    if not match:
+        return None
+    count = match.group(1)
+    count = NUMBER_WORDS.get(count) or int(count)
+    if not 1 <= count <= 50:
+        return None
+    return str(count)
+
+
+def _amount(number, thousands):
+    value = float(number.replace(",", ""))
+    if thousands:
+        value *= 1000
+    return int(value)
+
+
+def parse_budget(text):
+    """Return "min - max" (or a single amount) for a numeric budget."""
+    match = _BUDGET_RE.fullmatch(text)
+    if not match:
+        return None
+    low = _amount(match.group(1), match.group(2))
+    # Small numbers are more likely a traveller count than a budget
+    if low < 100:
+        return None
+    if match.group(3) is None:
+        return str(low)
+    high = _amount(match.group(3), match.group(4))
+    if high < low:
+        return None
+    return f"{low} - {high}"
+
+
+def _enum_rule(options, aliases):
+    lookup = {}
+    for option in options:
+        lookup[option.lower()] = option
+        lookup[option.lower().replace("-", " ")] = option
+    for alias, option in aliases.items():
+        lookup[alias] = option
+
+    def parse(text):
+        return lookup.get(text)
+    return parse
+
+
+def compile_schema_rules(schema, path=""):
+    """
+    Build enum rules for every field of an abc.json-style schema with string options.
+
+    Returns a dict of dotted field path -> parser. Options stored as one
+    comma-joined string (like `budget`) are split into separate values.
+    """
+    rules = {}
+    for name, spec in schema.items():
+        if not isinstance(spec, dict):
+            continue
+        field = f"{path}{name}"
+        options = spec.get("value_option")
+        if options and all(isinstance(o, str) for o in options):
+            values = schema_file.value_options(options)
+            # placeholders like "{current_year}" cannot be matched literally
+            if not any(v.startswith("{") for v in values):
+                rules[field] = _enum_rule(values, ENUM_ALIASES.get(field, {}))
+        # An enum nested as {"value": ..., "value_option": [...]} belongs to the parent field
+        for child, child_spec in spec.items():
+            if isinstance(child_spec, dict) and child != "value":
+                nested = compile_schema_rules({child: child_spec}, f"{field}.")
+                rules.update(nested)
+    return rules
+
+
+def _get_path(form, path):
+    value = form
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+class PreExtractor:
+    """
+    Local extraction stage run before the LLM.
+
+    Args:
+        question_rules (dict): question_number -> parser, for the `questions`
+            form used by web.py and web2.py.
+        field_rules (dict): dotted field name -> parser, for the field form
+            used by web3.py (see compile_schema_rules).
+        options (dict): dotted field name -> list of allowed values, used to
+            phrase the next question for field forms.
+        question_topics (dict): question_number -> words of a bot message
+            asking that question. A bare number only answers a question asked.
+        scheduler (question_scheduler.QuestionScheduler): Picks the next
+            question for field forms instead of the first empty field.
+    """
+
+    def __init__(self, question_rules=None, field_rules=None, options=None, scheduler=None,
+                 question_topics=None):
+        self.question_rules = question_rules or {}
+        self.question_topics = question_topics or {}
+        self.field_rules = field_rules or {}
+        self.options = options or {}
+        self.scheduler = scheduler
+        self.calls = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_schema(cls, schema, scheduler=None):
+        options = {}
+        for field, spec in schema.items():
+            if isinstance(spec, dict) and spec.get("value_option"):
+                options[field] = schema_file.value_options(spec["value_option"])
+        return cls(field_rules=compile_schema_rules(schema), options=options, scheduler=scheduler)
+
+    def extract(self, user_input, current_json, asked=""):
+        """
+        Return {"inferences": [...], "next_question": str} or None to fall back to the LLM.
+
+        Args:
+            asked (str): The bot message the user is answering.
+        """
+        text = normalize(user_input)
+        if "questions" in current_json:
+            result = self._extract_questions(text, current_json["questions"], asked.lower())
+        else:
+            result = self._extract_fields(text, current_json)
+        with self._lock:
+            self.calls += 1
+            if result is not None:
+                self.skipped += 1
+        return result
+
+    def _extract_questions(self, text, questions, asked):
+        open_questions = [q for q in questions if not q.get("answer")]
+        bare = _BARE_NUMBER_RE.fullmatch(text) is not None
+        matches = []
+        for question in open_questions:
+            number = question["question_number"]
+            rule = self.question_rules.get(number)
+            if bare and not any(word in asked for word in self.question_topics.get(number, ())):
+                continue
+            answer = rule(text) if rule else None
+            if answer is not None:
+                matches.append((question, answer))
+        if len(matches) != 1:
+            return None
+        question, answer = matches[0]
+        remaining = [q for q in open_questions if q is not question]
+        if remaining:
+            next_question = f"Got it, thanks! {remaining[0]['question']}"
+        else:
+            next_question = "Thank you, I have all the info I need."
+        return {
+            "inferences": [{"question_number": question["question_number"], "answer": answer}],
+            "next_question": next_question,
+        }
+
+    def _extract_fields(self, text, form):
+        open_fields = [
+            field for field in self.field_rules
+            if field.split(".")[0] in form and _get_path(form, field) in (None, {}, [], "")
+        ]
+        matches = []
+        for field in open_fields:
+            answer = self.field_rules[field](text)
+            if answer is not None:
+                matches.append((field, answer))
+        if len(matches) != 1:
+            return None
+        field, answer = matches[0]
+        if self.scheduler is not None:
+            values = question_scheduler.answered_values(form)
+            values[field] = answer
+            return {
+                "inferences": [{"field_name": field, "answer": answer}],
+                "next_question": self.scheduler.next_question(values),
+            }
+        remaining = [name for name, value in form.items() if value in ({}, [], "") and name != field]
+        if remaining:
+            name = remaining[0]
+            next_question = f"Got it, thanks! Could you tell me your {schema_file.label(name)}?"
+            if self.options.get(name):
+                next_question += f" (for example: {', '.join(str(o) for o in self.options[name])})"
+        else:
+            next_question = "Thank you, I have all the info I need."
+        return {
+            "inferences": [{"field_name": field, "answer": answer}],
+            "next_question": next_question,
+        }
+
+    def skip_rate(self):
+        """Fraction of turns answered without calling the LLM."""
+        return self.skipped / self.calls if self.calls else 0.0
+
+
+# Rules for the `questions` form shared by web.py and web2.py
+QUESTION_RULES = {
+    2: parse_date_range,
+    3: parse_traveller_count,
+    5: parse_budget,
+}
+
+
+# Words of a bot message that ask the question, for answers that are only a number
+QUESTION_TOPICS = {
+    2: ("date", "when"),
+    3: ("how many", "traveller", "traveler", "people", "who is"),
+    5: ("budget", "spend", "cost"),
+}
+
+
+# Process-wide extractors, so the skip counters survive Streamlit reruns
+question_extractor = PreExtractor(question_rules=QUESTION_RULES, question_topics=QUESTION_TOPICS)
+
+
+@functools.lru_cache(maxsize=None)
+def schema_extractor(file_path, fields=None):
+    """
+    Return the shared extractor for an abc.json-style schema file.
+
+    Args:
+        fields (tuple): Top-level fields of the app's form, see
+            question_scheduler.schema_scheduler.
+    """
+    return PreExtractor.from_schema(
+        schema_file.load_schema(file_path), scheduler=question_scheduler.schema_scheduler(file_path, fields)
+    )
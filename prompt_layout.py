@@ -0,0 +1,68 @@
+"""
+Static-prefix / variable-suffix layout of the prompts.
+
+Providers cache the longest prompt prefix they have already seen (OpenAI from
+1024 tokens on) and serve cached tokens faster and at a discount. A prefix
+only matches up to the first character that differs, so any per-turn value
+placed among the instructions makes everything after it uncacheable.
+
+Every prompt built by chain_registry goes through split_template. The
+template is cut at its first input variable:
+- everything before the cut becomes the system message, identical on every
+  call of the prompt;
+- the rest becomes the human message.
+
+A template that puts more than MAX_SUFFIX_TEXT characters of instruction text
+after its first variable is rejected. Variable sections should be at the end,
+with short labels only, ordered from the least to the most frequently
+changing.
+
+Whether the cache is hit shows up in the `cached_tokens` of the turn traces
+(see telemetry and trace_report.py).
+"""
+import string
+
+MAX_SUFFIX_TEXT = 400
+
+
+class PromptLayoutError(ValueError):
+    """A template interleaves per-turn values with its static instructions."""
+
+
+def _field(name, conversion, format_spec):
+    return "{" + name + (f"!{conversion}" if conversion else "") + (f":{format_spec}" if format_spec else "") + "}"
+
+
+def split_template(template, static_variables=(), name="prompt"):
+    """
+    Split a template into its static prefix and variable suffix.
+
+    Args:
+        template (str): f-string style prompt template.
+        static_variables: Variables whose value never changes for this prompt
+            (e.g. partial "format_instructions"); they may stay in the prefix.
+        name (str): Prompt name, for the error message.
+
+    Returns:
+        tuple: (prefix, suffix), both templates in the same syntax.
+    """
+    prefix, suffix = [], []
+    target = prefix
+    suffix_text = 0
+    first_variable = None
+    for literal, field, format_spec, conversion in string.Formatter().parse(template):
+        if target is suffix:
+            suffix_text += len(" ".join(literal.split()))
+        target.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if first_variable is None and field not in static_variables:
+            first_variable = field
+            target = suffix
+        target.append(_field(field, conversion, format_spec))
+    if suffix_text > MAX_SUFFIX_TEXT:
+        raise PromptLayoutError(
+            f"{name} has {suffix_text} characters of instructions after {{{first_variable}}}; "
+            f"move the per-turn values to the end of the template (at most {MAX_SUFFIX_TEXT} characters of labels)"
+        )
+    return "".join(prefix).strip(), "".join(suffix).strip()
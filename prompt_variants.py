@@ -0,0 +1,180 @@
+"""
+Prompt variants and the weighted A/B router that assigns them to sessions.
+
+Each app registers its built-in templates as variants named "<app>.<variant>"
+(e.g. "web.prompt4"), with a traffic weight. Every new session is assigned one
+variant for its whole life, from a hash of its session id, so a reloaded or
+resumed session keeps its prompt on any replica. The variant name is what
+telemetry reports under, so latency, prompt tokens, parse failures and
+turns-to-completion are all broken down per variant (see trace_report.py).
+
+Variants can be added or re-weighted without a redeploy by dropping files in
+PROMPT_VARIANTS_DIR (default "prompts"):
+
+    prompts/<app>/<variant>.txt     template text, same input variables as the app's prompt
+    prompts/<app>/weights.json      {"<variant>": weight, ...}, overrides built-in weights too
+
+A variant without a weight gets no traffic. The directory is checked for
+changes at most every PROMPT_VARIANTS_RELOAD seconds. A template file is only
+used if it can be split like every prompt (see prompt_layout) and filled with
+the input variables of the built-in templates; otherwise it is skipped.
+"""
+import bisect
+import hashlib
+import json
+import os
+import string
+import threading
+import time
+
+import chain_registry
+import prompt_layout
+
+VARIANTS_DIR = os.getenv("PROMPT_VARIANTS_DIR", "prompts")
+RELOAD_INTERVAL = float(os.getenv("PROMPT_VARIANTS_RELOAD", "10"))
+WEIGHTS_FILE = "weights.json"
+# Filled in by chain_registry rather than by the app's build_input
+STATIC_VARIABLES = ("format_instructions",)
+
+
+class PromptVariant:
+    """
+    One prompt template under test.
+
+    Args:
+        name (str): Full variant name, e.g. "web.prompt4".
+        template (str): The prompt template text.
+        weight (float): Share of new sessions, relative to the other variants.
+    """
+
+    def __init__(self, name, template, weight=0):
+        self.name = name
+        self.template = template
+        self.weight = weight
+
+
+def _variables(template):
+    return {field for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+
+
+def _bucket(session_id):
+    """Stable position of a session in [0, 1)."""
+    digest = hashlib.sha256(session_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class PromptRouter:
+    """
+    Assigns sessions to the prompt variants of one app by weight.
+
+    Args:
+        app (str): App name, the prefix of every variant name.
+        templates (dict): Built-in variants, short name -> (template, weight).
+        directory (str): Folder with file variants, PROMPT_VARIANTS_DIR/<app> by default.
+    """
+
+    def __init__(self, app, templates, directory=None):
+        self.app = app
+        self.builtin = {name: (template, weight) for name, (template, weight) in templates.items()}
+        # what the app's build_input supplies
+        self.input_variables = set(STATIC_VARIABLES).union(*(_variables(t) for t, _ in self.builtin.values()))
+        self.directory = directory or os.path.join(VARIANTS_DIR, app)
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked = 0.0
+        self.variants = {}
+        self._names = ()
+        self._bounds = ()
+        self.reload()
+
+    def _file_signature(self):
+        try:
+            entries = os.scandir(self.directory)
+        except OSError:
+            return ()
+        with entries:
+            return tuple(sorted((e.name, e.stat().st_mtime_ns) for e in entries if e.is_file()))
+
+    def reload(self):
+        """Re-read the variant files if any of them changed."""
+        signature = self._file_signature()
+        self._checked = time.monotonic()
+        if signature == self._signature:
+            return
+        variants = {
+            f"{self.app}.{name}": PromptVariant(f"{self.app}.{name}", template, weight)
+            for name, (template, weight) in self.builtin.items()
+        }
+        weights = {}
+        for filename, _ in signature:
+            path = os.path.join(self.directory, filename)
+            stem, extension = os.path.splitext(filename)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    if filename == WEIGHTS_FILE:
+                        weights = json.load(f)
+                    elif extension == ".txt":
+                        template = f.read()
+                        self._check(f"{self.app}.{stem}", template)
+                        variants[f"{self.app}.{stem}"] = PromptVariant(f"{self.app}.{stem}", template)
+            except (OSError, ValueError) as e:
+                print(f"skipping prompt variant file {path}: {e}")
+        for name, weight in weights.items():
+            variant = variants.get(f"{self.app}.{name}")
+            if variant is None:
+                print(f"weight for unknown prompt variant {self.app}.{name}")
+            else:
+                variant.weight = float(weight)
+
+        names, bounds, total = [], [], 0.0
+        for name, variant in variants.items():
+            if variant.weight > 0:
+                total += variant.weight
+                names.append(name)
+                bounds.append(total)
+        if not names:
+            print(f"no prompt variant of {self.app} has a weight, keeping the previous ones")
+            return
+        with self._lock:
+            for name, variant in variants.items():
+                previous = self.variants.get(name)
+                if previous is not None and previous.template != variant.template:
+                    # the registry caches prompts and chains by name
+                    chain_registry.discard(name)
+            self.variants = variants
+            self._names = tuple(names)
+            self._bounds = tuple(bound / total for bound in bounds)
+            self._signature = signature
+
+    def _check(self, name, template):
+        """Raise ValueError unless the template can be built and filled like the built-in ones."""
+        unknown = _variables(template) - self.input_variables
+        if unknown:
+            raise ValueError(f"input variables {sorted(unknown)} are not supplied by the app")
+        values = dict.fromkeys(self.input_variables, "")
+        for part in prompt_layout.split_template(template, STATIC_VARIABLES, name):
+            part.format(**values)
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked >= RELOAD_INTERVAL:
+            self.reload()
+
+    def assign(self, session_id):
+        """Name of the variant a session runs, stable for a given session id."""
+        self._maybe_reload()
+        names, bounds = self._names, self._bounds
+        return names[min(bisect.bisect_right(bounds, _bucket(session_id)), len(names) - 1)]
+
+    def get(self, name, session_id):
+        """The variant called `name`, or the one the session is assigned now if it was removed."""
+        self._maybe_reload()
+        variant = self.variants.get(name)
+        return variant if variant is not None else self.variants[self.assign(session_id)]
+
+    def weights(self):
+        """Share of new sessions per variant."""
+        shares, previous = {}, 0.0
+        for name, bound in zip(self._names, self._bounds):
+            shares[name] = bound - previous
+            previous = bound
+        return shares
@@ -0,0 +1,156 @@
+"""
+Dependency-aware choice of the next question for abc.json-style forms.
+
+Which field to ask about used to be left entirely to the model's
+next_question, so it asked about fields that did not matter
+(firstDestination with manual sequencing, the return date of a one-way trip)
+and asked one thing per turn. The scheduler reads the schema metadata once and,
+for the current answers, computes the minimal set of fields still needed:
+
+- required fields, plus the ones listed in ALSO_REQUIRED;
+- a field in DEPENDS_ON only once its condition holds;
+- a field counts as done when answered or marked with `completion_tag`.
+
+The next question covers the first needed field, preferring fields that decide
+whether others are needed, bundled with the other needed fields of its
+BUNDLES group so related answers are collected in one turn.
+
+An app whose form only has some of the schema's fields (web3 leaves out
+optimizeType and time_schedule) passes them, and only those are scheduled. A
+dependency on a field outside the form is ignored, the dependent field is
+then needed only if it is required itself.
+"""
+import functools
+
+import schema_file
+
+# field -> (field, value) it depends on; the field is only needed when they match
+DEPENDS_ON = {
+    "firstDestination": ("optimizeType", "auto"),
+    "time_schedule.return_trip": ("trip_direction", "return"),
+}
+
+# Needed although abc.json does not mark them required
+ALSO_REQUIRED = ("time_schedule.onward_trip",)
+
+# Fields asked about together in one question
+BUNDLES = (
+    ("optimizeType", "firstDestination"),
+    ("destination", "trip_theme"),
+    ("traveller_type", "Origin_city"),
+    ("budget", "food"),
+    ("trip_direction", "time_schedule.onward_trip", "time_schedule.return_trip"),
+)
+
+MAX_OPTIONS = 6
+
+
+def answered_values(form, path=""):
+    """{dotted path: value} of the answered leaves of a materialized form."""
+    values = {}
+    for name, value in form.items():
+        key = f"{path}{name}"
+        if isinstance(value, dict):
+            nested = answered_values(value, f"{key}.")
+            # {"value": x, ...} is the answer of the field itself
+            if f"{key}.value" in nested:
+                nested[key] = nested.pop(f"{key}.value")
+            values.update(nested)
+        elif value not in ("", [], None):
+            values[key] = value
+    return values
+
+
+class QuestionScheduler:
+    """
+    Computes the remaining fields of a form and the next question to ask.
+
+    Args:
+        schema (dict): abc.json-style field schema.
+        fields (iterable): Top-level fields of the app's form, all the
+            schema's by default.
+    """
+
+    def __init__(self, schema, depends_on=DEPENDS_ON, also_required=ALSO_REQUIRED, bundles=BUNDLES,
+                 fields=None):
+        self.fields = []
+        self.required = set(also_required)
+        self.completion_tagged = set()
+        self.options = {}
+        for name, node in schema.items():
+            if not isinstance(node, dict) or (fields is not None and name not in fields):
+                continue
+            if schema_file.is_field(node):
+                paths = {name: node}
+            else:
+                # groups such as time_schedule are scheduled per sub-field
+                paths = {f"{name}.{child}": child_node for child, child_node in node.items()}
+            for path, field in paths.items():
+                self.fields.append(path)
+                if isinstance(field, dict) and field.get("required") is True:
+                    self.required.add(path)
+                if isinstance(field, dict) and "completion_tag" in field:
+                    self.completion_tagged.add(path)
+                if isinstance(field, dict) and field.get("value_option"):
+                    options = schema_file.value_options(field["value_option"])
+                    if not any(str(o).startswith("{") for o in options):
+                        self.options[path] = options
+        self.depends_on = {
+            path: condition for path, condition in depends_on.items()
+            if path in self.fields and condition[0] in self.fields
+        }
+        self.bundles = {path: bundle for bundle in bundles for path in bundle}
+        # fields that decide whether others are needed are asked first
+        deciders = {parent for parent, _ in self.depends_on.values()}
+        self.order = sorted(self.fields, key=lambda path: (path not in deciders, self.fields.index(path)))
+
+    def is_done(self, path, values):
+        if values.get(f"{path}.completion_tag") is True:
+            return True
+        return path in values or any(key.startswith(path + ".") for key in values)
+
+    def is_needed(self, path, values):
+        condition = self.depends_on.get(path)
+        if condition is not None:
+            parent, expected = condition
+            return values.get(parent) == expected
+        return path in self.required
+
+    def remaining(self, values):
+        """The fields still needed to complete the form, in asking order."""
+        return [p for p in self.order if self.is_needed(p, values) and not self.is_done(p, values)]
+
+    def next_fields(self, values):
+        """The next field to ask about, bundled with its open related fields."""
+        remaining = self.remaining(values)
+        if not remaining:
+            return []
+        first = remaining[0]
+        bundle = self.bundles.get(first, (first,))
+        return [first] + [p for p in bundle if p != first and p in remaining]
+
+    def describe(self, path):
+        options = self.options.get(path)
+        if options and len(options) <= MAX_OPTIONS:
+            return f"{schema_file.label(path)} ({', '.join(str(o) for o in options)})"
+        return schema_file.label(path)
+
+    def next_question(self, values):
+        """A plain next question for locally answered turns."""
+        fields = self.next_fields(values)
+        if not fields:
+            return "Thank you, I have all the info I need."
+        parts = [self.describe(p) for p in fields]
+        asked = parts[0] if len(parts) == 1 else ", ".join(parts[:-1]) + " and " + parts[-1]
+        return f"Got it, thanks! Could you tell me your {asked}?"
+
+
+@functools.lru_cache(maxsize=None)
+def schema_scheduler(file_path, fields=None):
+    """
+    Return the shared scheduler for an abc.json-style schema file.
+
+    Args:
+        fields (tuple): Top-level fields of the app's form, all by default.
+    """
+    return QuestionScheduler(schema_file.load_schema(file_path), fields=fields)
@@ -0,0 +1,53 @@
+"""
+LangChain output parsers of the structured output modes (see structured_output).
+
+Kept apart from structured_output because LangChain's output parsers import
+its tracing stack and the OpenAI client types, which the apps only need once
+a chain is built.
+"""
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
+
+from structured_output import _json_schema, is_turn, repair_json, stats
+
+
+class RepairingJsonOutputParser(JsonOutputParser):
+    """
+    JsonOutputParser that repairs a malformed final reply before giving up.
+
+    A repair only counts if the result has the required keys of the response
+    model (any object when there is none).
+    """
+
+    def parse_result(self, result, *, partial=False):
+        try:
+            return super().parse_result(result, partial=partial)
+        except OutputParserException:
+            repaired = repair_json(result[0].text)
+            required = _json_schema(self.pydantic_object).get("required", []) if self.pydantic_object else []
+            if repaired is None or any(key not in repaired for key in required):
+                raise
+            stats.add("json", "repaired")
+            return repaired
+
+
+
+class RepairingToolsParser(JsonOutputKeyToolsParser):
+    """Reads the arguments of the TOOL_NAME call, repairing them if malformed."""
+
+    def parse_result(self, result, *, partial=False):
+        parsed = super().parse_result(result, partial=partial)
+        if parsed is not None or partial:
+            return parsed
+        message = getattr(result[0], "message", None)
+        # invalid arguments, or the JSON written as plain text instead of a call
+        raw = [c.get("args") for c in getattr(message, "invalid_tool_calls", None) or ()
+               if c.get("name") == self.key_name]
+        raw.append(getattr(message, "content", None))
+        for text in raw:
+            repaired = repair_json(text)
+            if is_turn(repaired):
+                stats.add("tool", "repaired")
+                return repaired
+        raise OutputParserException(f"no valid {self.key_name} call in the reply")
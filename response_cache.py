@@ -0,0 +1,154 @@
+"""
+Response cache in front of the LLM chain.
+
+Many users open with the same lines ("hi", "goa trip with family"). For the same
+form state and the same normalized latest message the model returns effectively
+the same inferences, so the parsed response is cached and a hit skips the
+network call entirely.
+
+Entries live in an in-memory LRU and, optionally, in an SQLite file shared by
+every process on the host. Both layers honour the TTL and the size cap.
+Configuration comes from the environment:
+
+    RESPONSE_CACHE_SIZE   max entries per layer (default 1024, 0 disables the cache)
+    RESPONSE_CACHE_TTL    seconds an entry stays valid (default 3600)
+    RESPONSE_CACHE_DB     path of the SQLite file (default: memory only)
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_input(text):
+    """Normalize a user message so trivial differences share a cache entry."""
+    if text.startswith("You: "):
+        text = text[len("You: "):]
+    text = re.sub(r"[^\w\s/-]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def make_key(name, current_json, latest_user_input):
+    """Cache key for a prompt name, form state and latest user message."""
+    form = json.dumps(current_json, sort_keys=True, separators=(",", ":"))
+    raw = "\x1f".join((name, form, normalize_input(latest_user_input)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of parsed chain responses with an optional SQLite layer.
+
+    Args:
+        max_entries (int): Size cap of each layer. 0 disables caching.
+        ttl (float): Seconds before an entry expires.
+        sqlite_path (str): Optional SQLite file for a persistent second layer.
+            `get` and `set` then block on disk I/O.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, sqlite_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sqlite_path = sqlite_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """Return a fresh copy of the cached response, or None."""
+        if self.max_entries <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            value = self._get_memory(key, now)
+            if value is None and self._db is not None:
+                value = self._get_db(key, now)
+                if value is not None:
+                    self._set_memory(key, value, now)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Stored as JSON text so callers can never mutate the cached copy
+        return json.loads(value)
+
+    def set(self, key, response):
+        if self.max_entries <= 0:
+            return
+        value = json.dumps(response)
+        now = time.time()
+        with self._lock:
+            self._set_memory(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, now),
+                )
+                self._db.execute(
+                    "DELETE FROM response_cache WHERE created < ? OR key NOT IN "
+                    "(SELECT key FROM response_cache ORDER BY created DESC LIMIT ?)",
+                    (now - self.ttl, self.max_entries),
+                )
+                self._db.commit()
+
+    def _get_memory(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, created = entry
+        if now - created > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_memory(self, key, value, now):
+        self._entries[key] = (value, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_db(self, key, now):
+        row = self._db.execute(
+            "SELECT value FROM response_cache WHERE key = ? AND created >= ?",
+            (key, now - self.ttl),
+        ).fetchone()
+        return row[0] if row else None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache")
+                self._db.commit()
+
+
+# Process-wide cache shared by every session of the app
+default_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    sqlite_path=os.getenv("RESPONSE_CACHE_DB"),
+)
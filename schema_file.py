@@ -0,0 +1,76 @@
+"""
+abc.json-style schema files, parsed and checked once per process.
+
+The prompt fragment, slot validator, question scheduler and pre-extractor are
+all compiled from the same file. They share the object returned by
+load_schema, so the file is read and parsed only once, and a malformed file
+fails at startup with the path of the bad node instead of midway through a
+conversation. The returned dict is shared: never mutate it.
+
+The helpers below read the schema's field metadata the same way for all of
+them.
+"""
+import functools
+import json
+import re
+
+# Keys describing a field rather than being sub-fields of it
+META_KEYS = {"description", "value", "value_type", "value_option", "required", "default", "completion_tag"}
+
+
+class SchemaFileError(ValueError):
+    """A schema file that is not shaped like abc.json."""
+
+
+def _check(node, path):
+    if isinstance(node, dict):
+        options = node.get("value_option")
+        if options is not None and not isinstance(options, list):
+            raise SchemaFileError(f"{path}.value_option must be a list")
+        required = node.get("required")
+        if required is not None and not isinstance(required, bool):
+            raise SchemaFileError(f"{path}.required must be true or false")
+        for key, child in node.items():
+            _check(child, f"{path}.{key}")
+    elif isinstance(node, list):
+        for i, child in enumerate(node):
+            _check(child, f"{path}[{i}]")
+
+
+def check_schema(schema):
+    """Raise SchemaFileError unless every field is an object with well-typed metadata."""
+    if not isinstance(schema, dict) or not schema:
+        raise SchemaFileError("a schema must be a non-empty object of fields")
+    for name, node in schema.items():
+        if not isinstance(node, dict):
+            raise SchemaFileError(f"field {name} must be an object")
+        _check(node, name)
+    return schema
+
+
+def is_field(node):
+    """True if the node is a field with its own value, not a group of sub-fields."""
+    return isinstance(node, dict) and ("value" in node or "value_type" in node or "value_option" in node)
+
+
+def value_options(options):
+    """The allowed values of a `value_option` list, comma-joined strings (like budget's) split."""
+    if not all(isinstance(o, str) for o in options):
+        return list(options)
+    return [value.strip() for option in options for value in option.split(",")]
+
+
+def label(path):
+    """Human-readable name of a dotted field path: "Origin_city" -> "origin city"."""
+    name = path.split(".")[-1].replace("_", " ")
+    return re.sub(r"(?<=[a-z])(?=[A-Z])", " ", name).lower()
+
+
+@functools.lru_cache(maxsize=None)
+def load_schema(file_path):
+    """Return the parsed and checked schema file, shared by every caller."""
+    with open(file_path, 'r') as f:
+        try:
+            return check_schema(json.load(f))
+        except ValueError as e:
+            raise SchemaFileError(f"{file_path}: {e}") from e
@@ -0,0 +1,148 @@
+"""
+Compact prompt fragment compiled once from an abc.json-style schema.
+
+web3.py used to send `json.dumps(abc_json, indent=4)` on every turn: about
+13 KB of pretty-printed JSON, most of it indentation, repeated descriptions
+(the twelve identical trip_theme entries) and fields the user has already
+answered. The schema is now compiled once into one short line per field, and
+each turn only the lines of the fields that are still open are sent.
+
+Line format, explained to the model in the fragment header:
+
+    name*: description; type or options (default ...)
+
+where `*` marks required fields, `a|b|c` lists the allowed values and
+`{<a|b>: {...}}` stands for one identical entry per listed key.
+"""
+import functools
+import json
+import re
+
+import schema_file
+
+HEADER = (
+    "Fields still to fill, one per line as `name*: description; type or options (default)`. "
+    "* = required, a|b = allowed values, {<a|b>: ...} = one entry per key:"
+)
+ALL_FILLED = "All fields are filled."
+
+# "<string, default:'' >", "<[string] default:[]>", "<string> default:'' ", ...
+_TYPE_RE = re.compile(r"<\s*([^>,\s]+)\s*>?\s*,?\s*(?:default\s*:\s*(.*?))?\s*>?\s*$")
+_EMPTY_DEFAULTS = {"", "''", "[]", "{}"}
+
+
+def _parse_type(text):
+    """Split a "<type default:x>" placeholder into (type, default)."""
+    match = _TYPE_RE.match(text.strip())
+    if not match:
+        return text.strip(), None
+    kind, default = match.groups()
+    if kind.startswith("enumerated"):
+        kind = "enum"
+    return kind, default
+
+
+def _options(options):
+    options = schema_file.value_options(options)
+    if len(options) == 2 and all(isinstance(o, int) for o in options):
+        return f"integer {options[0]}-{options[1]}"
+    return "|".join(str(o) for o in options)
+
+
+def _field(node):
+    """One field: its description, type or options, default and sub-fields."""
+    parts = [node["description"].strip().rstrip(".")] if node.get("description") else []
+    value = node.get("value", node.get("value_type"))
+    if isinstance(value, str) and value.lstrip().startswith("<"):
+        kind, default = _parse_type(value)
+    else:
+        kind, default = (_render(value) if value is not None else ""), None
+    if node.get("value_option"):
+        kind = _options(node["value_option"])
+    if default is not None and default.strip() not in _EMPTY_DEFAULTS:
+        kind += f" (default {default.strip()})"
+    parts.append(kind)
+    for name, child in node.items():
+        if name not in schema_file.META_KEYS:
+            parts.append(f"{name}: {_render(child)}")
+    return "; ".join(p for p in parts if p)
+
+
+def _group(node):
+    """Sub-fields inline; identical siblings are collapsed into one entry."""
+    rendered = {name: _render(child) for name, child in node.items()}
+    distinct = set(rendered.values())
+    if len(rendered) > 2 and len(distinct) == 1:
+        return "{<" + "|".join(rendered) + ">: " + distinct.pop() + "}"
+    return "{" + ", ".join(f"{name}: {text}" for name, text in rendered.items()) + "}"
+
+
+def _render(node):
+    if schema_file.is_field(node):
+        return _field(node)
+    if isinstance(node, dict):
+        return _group(node)
+    if isinstance(node, list):
+        items = list(dict.fromkeys(_render(item) for item in node))
+        return "[" + ", ".join(items) + (", ..." if items else "") + "]"
+    if isinstance(node, str) and node.lstrip().startswith("<"):
+        kind, default = _parse_type(node)
+        if default is not None and default.strip() not in _EMPTY_DEFAULTS:
+            kind += f" (default {default.strip()})"
+        return kind
+    return json.dumps(node)
+
+
+def compile_schema(schema):
+    """
+    Compile a schema into {dotted field path: prompt line}.
+
+    Top-level fields get one line each; a top-level group without a value of
+    its own (time_schedule) gets one line per sub-field, so each can be dropped
+    separately once answered.
+    """
+    lines = {}
+    for name, node in schema.items():
+        if isinstance(node, dict) and not schema_file.is_field(node):
+            for child, child_node in node.items():
+                lines[f"{name}.{child}"] = f"{name}.{child}: {_render(child_node)}"
+        else:
+            required = "*" if isinstance(node, dict) and node.get("required") is True else ""
+            lines[name] = f"{name}{required}: {_render(node)}"
+    return lines
+
+
+class SchemaPrompt:
+    """
+    The compiled lines of one schema, rendered per turn for the open fields only.
+
+    Args:
+        schema (dict): abc.json-style field schema.
+    """
+
+    def __init__(self, schema):
+        self.lines = compile_schema(schema)
+
+    def full(self):
+        """Every field, as sent before any answer is known."""
+        return self.fragment(())
+
+    def fragment(self, filled):
+        """The lines of the fields not covered by the dotted paths in `filled`."""
+        return self._fragment(frozenset(filled))
+
+    @functools.lru_cache(maxsize=256)
+    def _fragment(self, filled):
+        open_lines = [
+            line for path, line in self.lines.items()
+            if not any(path == f or f == path + ".value" or path.startswith(f + ".") for f in filled)
+        ]
+        if not open_lines:
+            return ALL_FILLED
+        return HEADER + "\n" + "\n".join(open_lines)
+
+
+@functools.lru_cache(maxsize=None)
+def schema_prompt(file_path):
+    """Return the shared SchemaPrompt for an abc.json-style schema file."""
+    return SchemaPrompt(schema_file.load_schema(file_path))
@@ -0,0 +1,193 @@
+"""
+Headless HTTP/JSON entry point for the slot-filling chatbot.
+
+A plain ASGI app, so it runs behind any ASGI server and load balancer:
+
+    POST /turn    {"session_id": "...", "message": "...", "turn_id": "..."}
+                  -> {"session_id": "...", "json_data": {...}, "next_question": "..."}
+    GET  /health  -> {"status": "ok", ...}
+    GET  /metrics -> Prometheus text format (see telemetry)
+
+Omit session_id to start a new conversation. turn_id is optional; a client
+that retries a request should send the same one, so that a turn the session
+already processed is answered with its stored reply instead of another model
+call. Turns of one session are serialized; requests that would exceed
+MAX_INFLIGHT get 503 and turns that take longer than REQUEST_TIMEOUT seconds
+get 504. The engine's semaphore separately
+bounds concurrent model calls.
+
+Run with the bundled uvicorn settings (keep-alive, concurrency limit):
+
+    CHATBOT_APP=web3 python server.py --port 8000
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import os
+
+import engine
+import telemetry
+
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "60"))
+MAX_INFLIGHT = int(os.getenv("MAX_INFLIGHT", "256"))
+
+
+class ChatServer:
+    """
+    ASGI application serving conversation turns from a ConversationEngine.
+
+    Args:
+        conversation_engine (engine.ConversationEngine): Engine running the turns.
+        request_timeout (float): Seconds before a turn is abandoned with 504.
+        max_inflight (int): Requests processed at once before answering 503.
+    """
+
+    def __init__(self, conversation_engine, request_timeout=REQUEST_TIMEOUT, max_inflight=MAX_INFLIGHT):
+        self.engine = conversation_engine
+        self.request_timeout = request_timeout
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        # session_id -> [lock, requests holding or waiting for it]
+        self._session_locks = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+        if path == "/health" and method == "GET":
+            await self._respond(send, 200, {"status": "ok", "inflight": self.inflight})
+        elif path == "/metrics" and method == "GET":
+            body = telemetry.default_telemetry.render_prometheus().encode("utf-8")
+            await self._respond(send, 200, body, content_type=b"text/plain; version=0.0.4")
+        elif path == "/turn" and method == "POST":
+            await self._turn(receive, send)
+        elif path in ("/health", "/metrics", "/turn"):
+            await self._respond(send, 405, {"error": "method not allowed"})
+        else:
+            await self._respond(send, 404, {"error": "not found"})
+
+    async def _turn(self, receive, send):
+        if self.inflight >= self.max_inflight:
+            await self._respond(send, 503, {"error": "server busy"})
+            return
+        self.inflight += 1
+        try:
+            try:
+                body = json.loads(await self._read_body(receive) or b"{}")
+                message = body["message"]
+                if not isinstance(message, str) or not message.strip():
+                    raise ValueError("message must be a non-empty string")
+                turn_id = body.get("turn_id")
+                if turn_id is not None and not isinstance(turn_id, str):
+                    raise ValueError("turn_id must be a string")
+            except (ValueError, KeyError, TypeError) as e:
+                await self._respond(send, 400, {"error": f"invalid request: {e}"})
+                return
+
+            session_id = body.get("session_id")
+            if session_id is None:
+                session_id = (await asyncio.to_thread(self.engine.new_session)).session_id
+
+            try:
+                async with self._session_lock(session_id):
+                    # Sessions live in the engine's store, so any replica can serve them
+                    state = await asyncio.to_thread(self.engine.load_session, session_id)
+                    if state is None:
+                        await self._respond(send, 404, {"error": "unknown session_id"})
+                        return
+                    next_question = await asyncio.wait_for(
+                        self.engine.handle_turn(state, message, turn_id=turn_id), self.request_timeout
+                    )
+            except asyncio.TimeoutError:
+                await self._respond(send, 504, {"error": "turn timed out"})
+                return
+            except Exception as e:
+                print("turn failed:", repr(e))
+                await self._respond(send, 502, {"error": "model call failed"})
+                return
+
+            await self._respond(send, 200, {
+                "session_id": session_id,
+                "json_data": state.json_data.to_dict(),
+                "next_question": next_question,
+            })
+        finally:
+            self.inflight -= 1
+
+    @contextlib.asynccontextmanager
+    async def _session_lock(self, session_id):
+        """Serialize the turns of a session. The lock is dropped with its last user."""
+        entry = self._session_locks.get(session_id)
+        if entry is None:
+            entry = self._session_locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._session_locks[session_id]
+
+    async def _read_body(self, receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    async def _respond(self, send, status, payload, content_type=b"application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_app(conversation_engine=None, **kwargs):
+    """
+    Build the ASGI app. Without an engine, the chatbot named by CHATBOT_APP
+    (web, web2 or web3) is served through its process-wide engine.
+    """
+    if conversation_engine is None:
+        app_module = importlib.import_module(os.getenv("CHATBOT_APP", "web3"))
+        conversation_engine = engine.get_engine(app_module.spec)
+    return ChatServer(conversation_engine, **kwargs)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the chatbot over HTTP/JSON.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--keep-alive", type=int, default=75,
+                        help="seconds to keep idle connections open (longer than the load balancer's)")
+    parser.add_argument("--limit-concurrency", type=int, default=1024,
+                        help="connections accepted before uvicorn answers 503")
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(), host=args.host, port=args.port,
+        timeout_keep_alive=args.keep_alive, limit_concurrency=args.limit_concurrency,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Pluggable storage of conversation sessions.
+
+Sessions used to live only in `st.session_state`, so they were lost on restart
+and tied to one replica. A SessionStore keeps them outside the process:
+
+    memory://                  in-process dict (default, single replica)
+    sqlite:///path/to/file.db  SQLite file shared by the processes of a host
+    redis://host:6379/0        any Redis-protocol server, shared by all replicas
+
+Each session is stored as two parts: a compact JSON "meta" record (form,
+next question, counters and the bounded prompt history window) and the
+append-only transcript. A turn rewrites the small meta record and appends only
+the new transcript lines, never the whole conversation. Sessions idle for
+longer than the TTL are evicted.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import engine
+from transcript import Transcript
+
+DEFAULT_TTL = float(os.getenv("SESSION_TTL", str(24 * 3600)))
+
+
+def _dump_meta(state):
+    return json.dumps(state.to_meta(), separators=(",", ":"))
+
+
+class SessionStore:
+    """Interface of the session store backends."""
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+
+    def load(self, session_id):
+        """Return the SessionState for `session_id`, or None if unknown or expired."""
+        raise NotImplementedError
+
+    def save(self, state):
+        """Write the meta record and the transcript lines added since the last save."""
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def evict_idle(self):
+        """Drop sessions idle for longer than the TTL and return how many were dropped."""
+        return 0
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions kept in this process, serialized like the other backends."""
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        super().__init__(ttl)
+        # session_id -> [meta, transcript.Transcript, last write time]
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_eviction = time.time()
+
+    def load(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or time.time() - entry[2] > self.ttl:
+                return None
+            meta, lines = entry[0], entry[1].copy()
+        return engine.SessionState.from_meta(session_id, json.loads(meta), lines)
+
+    def save(self, state):
+        meta = _dump_meta(state)
+        new_lines = state.chat_history[state.saved_lines:]
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.setdefault(state.session_id, [None, Transcript(), now])
+            entry[0] = meta
+            entry[1].extend(new_lines)
+            entry[2] = now
+        state.saved_lines = len(state.chat_history)
+        if now - self._last_eviction > self.ttl / 10:
+            self.evict_idle()
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, entry in self._sessions.items() if now - entry[2] > self.ttl]
+            for sid in expired:
+                del self._sessions[sid]
+            self._last_eviction = now
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in an SQLite file: one meta row per session plus one row per transcript line."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        super().__init__(ttl)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._last_eviction = time.time()
+        with self._lock:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(id TEXT PRIMARY KEY, meta TEXT NOT NULL, updated REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS transcript "
+                "(session_id TEXT NOT NULL, idx INTEGER NOT NULL, line TEXT NOT NULL, "
+                "PRIMARY KEY (session_id, idx)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);"
+            )
+            self._db.commit()
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT meta FROM sessions WHERE id = ? AND updated >= ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            lines = [r[0] for r in self._db.execute(
+                "SELECT line FROM transcript WHERE session_id = ? ORDER BY idx", (session_id,)
+            )]
+        return engine.SessionState.from_meta(session_id, json.loads(row[0]), lines)
+
+    def save(self, state):
+        meta = _dump_meta(state)
+        start = state.saved_lines
+        new_lines = [
+            (state.session_id, start + i, line)
+            for i, line in enumerate(state.chat_history[start:])
+        ]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, meta, updated) VALUES (?, ?, ?)",
+                (state.session_id, meta, now),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO transcript (session_id, idx, line) VALUES (?, ?, ?)",
+                new_lines,
+            )
+            self._db.commit()
+        state.saved_lines = len(state.chat_history)
+        if now - self._last_eviction > self.ttl / 10:
+            self.evict_idle()
+
+    def delete(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.execute("DELETE FROM transcript WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def evict_idle(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM transcript WHERE session_id IN "
+                "(SELECT id FROM sessions WHERE updated < ?)", (cutoff,)
+            )
+            count = self._db.execute("DELETE FROM sessions WHERE updated < ?", (cutoff,)).rowcount
+            self._db.commit()
+            self._last_eviction = time.time()
+        return count
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions in a Redis-protocol server: a string key for the meta record and a
+    list key for the transcript. Redis expiry does the idle eviction.
+
+    Args:
+        client: A redis-py compatible client (`redis.Redis` or a fake).
+        prefix (str): Key prefix.
+    """
+
+    def __init__(self, client, ttl=DEFAULT_TTL, prefix="chatbot:session:"):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    def _keys(self, session_id):
+        return f"{self.prefix}{session_id}:meta", f"{self.prefix}{session_id}:log"
+
+    def load(self, session_id):
+        meta_key, log_key = self._keys(session_id)
+        meta = self.client.get(meta_key)
+        if meta is None:
+            return None
+        lines = [line.decode("utf-8") if isinstance(line, bytes) else line
+                 for line in self.client.lrange(log_key, 0, -1)]
+        return engine.SessionState.from_meta(session_id, json.loads(meta), lines)
+
+    def save(self, state):
+        meta_key, log_key = self._keys(state.session_id)
+        ttl = int(self.ttl)
+        new_lines = state.chat_history[state.saved_lines:]
+        pipe = self.client.pipeline()
+        pipe.set(meta_key, _dump_meta(state), ex=ttl)
+        if new_lines:
+            pipe.rpush(log_key, *new_lines)
+        pipe.expire(log_key, ttl)
+        pipe.execute()
+        state.saved_lines = len(state.chat_history)
+
+    def delete(self, session_id):
+        self.client.delete(*self._keys(session_id))
+
+
+def open_store(url=None, ttl=DEFAULT_TTL):
+    """Open the store named by `url`, or by SESSION_STORE_URL (default memory://)."""
+    url = url or os.getenv("SESSION_STORE_URL", "memory://")
+    if url.startswith("memory://"):
+        return MemorySessionStore(ttl)
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):], ttl)
+    if url.startswith(("redis://", "rediss://")):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("the redis session store needs the `redis` package: pip install redis")
+        return RedisSessionStore(redis.Redis.from_url(url), ttl)
+    raise ValueError(f"unsupported session store url: {url}")
@@ -0,0 +1,298 @@
+"""
+Typed slot validation compiled from abc.json field metadata.
+
+Inferences used to be written into the form exactly as the model returned
+them, so an out-of-range day, a misspelt enum value or a placeholder such as
+"{current_year}" ended up in the form and cost corrective LLM turns later. The
+schema is now compiled once into one validator per dotted field path, and
+every inference is checked and coerced locally before it is applied:
+
+- enums accept case-insensitive values, the aliases of pre_extractor and
+  unambiguous partial matches ("tight budget" -> "on a tight budget");
+- integers accept digits and number words and are range-checked
+  (day_of_month 1-31, month 1-12);
+- "{current_year}"-style placeholders are resolved when the value is checked.
+
+Invalid values are dropped. Only a genuinely ambiguous value ("family" for
+traveller_type) replaces the next question with a clarification.
+"""
+import functools
+import logging
+import re
+import threading
+from datetime import date, timedelta
+
+import schema_file
+from pre_extractor import ENUM_ALIASES, NUMBER_WORDS
+
+logger = logging.getLogger(__name__)
+
+_TYPE_RE = re.compile(r"<\s*([^>,\s]+)")
+_SPLIT_RE = re.compile(r"\s*(?:,|/|\band\b|&)\s*")
+_EMPTY = ("", None, [], {}, "unknown", "none", "n/a")
+
+
+class SlotError(ValueError):
+    """The value can not be stored in the slot."""
+
+
+class AmbiguousSlot(SlotError):
+    """The value matches several allowed values of the slot."""
+
+    def __init__(self, candidates):
+        super().__init__(f"ambiguous: {', '.join(map(str, candidates))}")
+        self.candidates = candidates
+
+
+def resolve_placeholder(value, today=None):
+    """Replace "{current_year}", "{next_year}", "{current_month}" and "{tomorrow}" by numbers."""
+    if not (isinstance(value, str) and value.startswith("{") and value.endswith("}")):
+        return value
+    today = today or date.today()
+    tomorrow = today + timedelta(days=1)
+    placeholders = {
+        "current_year": today.year,
+        "next_year": today.year + 1,
+        "current_month": today.month,
+        "tomorrow": tomorrow.day,
+    }
+    return placeholders.get(value[1:-1], value)
+
+
+def _text(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if not isinstance(value, str):
+        raise SlotError(f"expected text, got {type(value).__name__}")
+    return value.strip()
+
+
+class EnumSlot:
+    """One of a fixed list of values; a list or "a and b" selects several."""
+
+    def __init__(self, options, aliases=None):
+        self.options = list(options)
+        self._exact = {str(o).lower(): o for o in self.options}
+        self._aliases = {k.lower(): v for k, v in (aliases or {}).items()}
+
+    def _lookup(self, text):
+        key = text.lower()
+        return self._exact.get(key, self._aliases.get(key))
+
+    def _match(self, text):
+        key = text.lower()
+        found = self._lookup(text)
+        if found is not None:
+            return found
+        candidates = [o for o in self.options if key in str(o).lower() or str(o).lower() in key]
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            raise AmbiguousSlot(candidates)
+        raise SlotError(f"not one of {self.options}")
+
+    def __call__(self, value):
+        if isinstance(value, list):
+            return [self._match(_text(v)) for v in value]
+        text = _text(value)
+        if self._lookup(text) is None:
+            # "vegetarian and indian" selects two values
+            parts = [p for p in _SPLIT_RE.split(text) if p]
+            if len(parts) > 1:
+                return list(dict.fromkeys(self._match(p) for p in parts))
+        return self._match(text)
+
+
+class PlaceholderEnumSlot(EnumSlot):
+    """Enum whose options are placeholders, resolved each time a value is checked."""
+
+    def __call__(self, value):
+        options = [resolve_placeholder(o) for o in self.options]
+        value = resolve_placeholder(value)
+        return EnumSlot(options)(value)
+
+
+class IntSlot:
+    """Integer, optionally within [low, high]; digits and number words are accepted."""
+
+    def __init__(self, low=None, high=None):
+        self.low = low
+        self.high = high
+
+    def __call__(self, value):
+        value = resolve_placeholder(value)
+        if isinstance(value, bool):
+            raise SlotError("expected an integer")
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, str):
+            text = value.strip().lower()
+            if text in NUMBER_WORDS:
+                value = NUMBER_WORDS[text]
+            elif re.fullmatch(r"-?\d+", text):
+                value = int(text)
+        if not isinstance(value, int):
+            raise SlotError("expected an integer")
+        if (self.low is not None and value < self.low) or (self.high is not None and value > self.high):
+            raise SlotError(f"{value} is outside {self.low}-{self.high}")
+        return value
+
+
+class BoolSlot:
+    _WORDS = {"true": True, "yes": True, "y": True, "false": False, "no": False, "n": False}
+
+    def __call__(self, value):
+        if isinstance(value, bool):
+            return value
+        text = _text(value).lower()
+        if text not in self._WORDS:
+            raise SlotError("expected yes or no")
+        return self._WORDS[text]
+
+
+class StringSlot:
+    def __call__(self, value):
+        text = _text(value)
+        if not text or text.startswith("<"):
+            raise SlotError("expected a non-empty string")
+        return text
+
+
+class StringListSlot:
+    """A list of strings; a comma-separated string is split."""
+
+    def __call__(self, value):
+        items = value if isinstance(value, list) else _SPLIT_RE.split(_text(value))
+        items = [StringSlot()(item) for item in items if item not in _EMPTY]
+        if not items:
+            raise SlotError("expected at least one value")
+        return items
+
+
+def _value_slot(path, node):
+    """Validator for the value of a field node, from its type and options."""
+    options = node.get("value_option")
+    if options:
+        options = schema_file.value_options(options)
+        if len(options) == 2 and all(isinstance(o, int) for o in options):
+            return IntSlot(*options)
+        if any(isinstance(o, str) and o.startswith("{") for o in options):
+            return PlaceholderEnumSlot(options)
+        return EnumSlot(options, ENUM_ALIASES.get(path))
+
+    value = node.get("value", node.get("value_type"))
+    if isinstance(value, dict):
+        # e.g. trip_theme: one entry per theme, the answer names the theme(s)
+        return EnumSlot(list(value))
+    if isinstance(value, list):
+        return StringListSlot()
+    match = _TYPE_RE.match(value) if isinstance(value, str) else None
+    kind = match.group(1) if match else "string"
+    if kind == "integer":
+        return IntSlot()
+    if kind == "boolean":
+        return BoolSlot()
+    if kind.startswith("["):
+        return StringListSlot()
+    return StringSlot()
+
+
+def compile_slots(schema, path=""):
+    """Compile a schema into {dotted field path: validator}."""
+    slots = {}
+    for name, node in schema.items():
+        field = f"{path}{name}"
+        if not isinstance(node, dict):
+            # plain sub-fields such as traveller_type.adults
+            if isinstance(node, str) and node.lstrip().startswith("<"):
+                slots[field] = _value_slot(field, {"value": node})
+            elif isinstance(node, str):
+                slots[field] = StringSlot()
+            continue
+        if schema_file.is_field(node):
+            slots[field] = _value_slot(field, node)
+            extras = {k: v for k, v in node.items() if k not in schema_file.META_KEYS}
+            slots.update(compile_slots(extras, f"{field}."))
+        else:
+            slots.update(compile_slots(node, f"{field}."))
+    return slots
+
+
+class SlotValidator:
+    """
+    Checks and coerces inferences against the compiled slots of a schema.
+
+    Args:
+        slots (dict): dotted field path -> validator (see compile_slots).
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.checked = 0
+        self.rejected = 0
+        self.ambiguous = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_schema(cls, schema):
+        return cls(compile_slots(schema))
+
+    def _flatten(self, path, answer):
+        # A group answered at once, e.g. time_schedule.onward_trip.date as a dict
+        if path not in self.slots and isinstance(answer, dict):
+            for key, value in answer.items():
+                yield from self._flatten(f"{path}.{key}", value)
+        else:
+            yield path, answer
+
+    def check(self, inferences):
+        """
+        Return (valid inferences, clarification question or None).
+
+        Valid inferences have their answers coerced to the slot's type. Unknown
+        fields and invalid values are dropped.
+        """
+        valid, clarification, checked, rejected, ambiguous = self._validate(inferences, log=True)
+        with self._lock:
+            self.checked += checked
+            self.rejected += rejected
+            self.ambiguous += ambiguous
+        return valid, clarification
+
+    def rejects(self, inferences):
+        """Number of values `check` would drop, without counting them in the stats."""
+        return self._validate(inferences)[3]
+
+    def _validate(self, inferences, log=False):
+        valid = []
+        clarification = None
+        checked = rejected = ambiguous = 0
+        for update in inferences or ():
+            for path, answer in self._flatten(update.get("field_name", ""), update.get("answer")):
+                if isinstance(answer, str) and answer.strip().lower() in _EMPTY or answer in ([], {}, None):
+                    continue
+                checked += 1
+                slot = self.slots.get(path)
+                try:
+                    if slot is None:
+                        raise SlotError("unknown field")
+                    valid.append({"field_name": path, "answer": slot(answer)})
+                except AmbiguousSlot as e:
+                    ambiguous += 1
+                    if clarification is None:
+                        choices = " or ".join(str(c) for c in e.candidates)
+                        clarification = f"Just to be sure about your {schema_file.label(path)}: did you mean {choices}?"
+                except SlotError as e:
+                    rejected += 1
+                    if log:
+                        logger.debug("dropped inference %s=%r: %s", path, answer, e)
+        return valid, clarification, checked, rejected, ambiguous
+
+    def stats(self):
+        return {"checked": self.checked, "rejected": self.rejected, "ambiguous": self.ambiguous}
+
+
+@functools.lru_cache(maxsize=None)
+def schema_validator(file_path):
+    """Return the shared validator for an abc.json-style schema file."""
+    return SlotValidator.from_schema(schema_file.load_schema(file_path))
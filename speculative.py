@@ -0,0 +1,123 @@
+"""
+Speculative two-call turns: extraction and next question in parallel.
+
+A normal turn is one large call that first extracts the inferences and then
+writes next_question, so the user waits for both in sequence. With
+SPECULATIVE_TURNS=1 the engine instead starts two calls at once:
+
+- a small extraction-only call (EXTRACTION_MODEL, a faster model by default);
+- a call drafting the next question, conditioned on the form as it was before
+  this turn and betting that the message answers the slot that was just asked
+  about, so it asks about the slot after that one.
+
+When the extraction leads to a different next slot (the user did not answer,
+or answered something else that changes the order), the draft is thrown away
+and the question is regenerated on the updated form. Otherwise the turn costs
+roughly the latency of the slower of the two calls. How often the draft is
+kept is served on /metrics with the other telemetry.
+"""
+import os
+import threading
+
+from langchain_core.exceptions import OutputParserException
+
+import question_scheduler
+import structured_output
+import telemetry
+
+ENABLED = os.getenv("SPECULATIVE_TURNS", "0") == "1"
+EXTRACTION_MODEL = os.getenv("EXTRACTION_MODEL", "gpt-4o-mini")
+
+EXTRACTION_TEMPLATE = """
+You read a travel planning conversation and fill in the form from it.
+Reply with JSON only, in the form {{"inferences": [{{<key field>: ..., "answer": ...}}]}}, listing only
+values the user actually gave. Use an empty list if the message answers nothing. Do not make up data.
+
+Key field: {key_field}
+{details}
+Current form: {current_json}
+
+Conversation:
+{chat_history}
+
+Latest user message: {latest_user_input}
+"""
+
+QUESTION_TEMPLATE = """
+You are a friendly, polite travel assistant collecting the details of a trip plan.
+Ask the user about the fields named at the end, naturally, in one short message, and say what kind
+of answer you expect. Do not ask about anything already answered in the form.
+Reply with JSON only, in the form {{"next_question": "..."}}.
+
+Current form: {current_json}
+
+Conversation:
+{chat_history}
+
+Ask the user about: {ask_about}
+"""
+
+
+def next_slot(form):
+    """
+    The slot to ask about next in a materialized form: the first open question
+    for the questions form, the first empty field otherwise.
+    """
+    if "questions" in form:
+        return tuple(q["question_number"] for q in form["questions"] if not q.get("answer"))[:1]
+    return tuple(name for name, value in form.items() if value in ({}, [], "", None))[:1]
+
+
+def scheduled_slot(scheduler):
+    """next_slot for abc.json forms, following a question_scheduler.QuestionScheduler."""
+    def target(form):
+        return tuple(scheduler.next_fields(question_scheduler.answered_values(form)))
+    return target
+
+
+def describe_slots(form, slots):
+    """Text for the question prompt naming the slots to ask about."""
+    if not slots:
+        return "nothing, all details are collected; thank the user and wrap up"
+    if "questions" in form:
+        by_number = {q["question_number"]: q for q in form["questions"]}
+        return "; ".join(f"{by_number[n]['question']} ({by_number[n]['instructions']})" for n in slots)
+    return ", ".join(slots)
+
+
+def check_extraction(response, key_field=None):
+    """Raise OutputParserException unless the extraction reply has a valid inferences list."""
+    if not isinstance(response, dict) or not structured_output.has_inferences(response, key_field):
+        raise OutputParserException(f"not an extraction response: {response!r:.200}")
+    return response
+
+
+class SpeculationStats:
+    """How often the drafted question could be used as is."""
+
+    def __init__(self):
+        self.turns = 0
+        self.redrafted = 0
+        self._lock = threading.Lock()
+
+    def add(self, redrafted):
+        with self._lock:
+            self.turns += 1
+            self.redrafted += int(redrafted)
+
+    def hit_rate(self):
+        return 1 - self.redrafted / self.turns if self.turns else 0.0
+
+    def render_prometheus(self):
+        return (
+            "# HELP chatbot_speculative_turns_total Turns run as speculative two-call turns.\n"
+            "# TYPE chatbot_speculative_turns_total counter\n"
+            f"chatbot_speculative_turns_total {self.turns}\n"
+            "# HELP chatbot_speculative_redrafts_total Speculative turns whose drafted question was redone.\n"
+            "# TYPE chatbot_speculative_redrafts_total counter\n"
+            f"chatbot_speculative_redrafts_total {self.redrafted}\n"
+        )
+
+
+stats = SpeculationStats()
+telemetry.default_telemetry.add_collector(stats.render_prometheus)
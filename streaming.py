@@ -0,0 +1,75 @@
+"""
+Token streaming of the chatbot reply.
+
+`chain.astream` on a `prompt | model | JsonOutputParser` chain yields the
+partial JSON object parsed so far. astream_invoke turns that into
+`next_question` text deltas, reports the inferences as soon as they are
+complete, and returns the final parsed response. The engine hands the deltas
+to the app, which draws them with `st.write_stream` (see
+ConversationEngine.run_turn).
+
+Set STREAM_RESPONSES=1 to enable streaming in the apps.
+"""
+import os
+
+ENABLED = os.getenv("STREAM_RESPONSES", "0") == "1"
+# Passed to on_delta when the reply streamed so far is dropped and asked again
+RESTART = object()
+
+
+class _PartialResponse:
+    """Tracks the partial JSON of one streamed response."""
+
+    def __init__(self, on_inferences=None):
+        self.on_inferences = on_inferences
+        self.response = {}
+        self.shown = ""
+        self.inferences_sent = False
+
+    def feed(self, partial):
+        """Take the next partial response and return the new next_question text."""
+        if not isinstance(partial, dict):
+            return ""
+        self.response = partial
+        # The model writes "inferences" before "next_question", so once the
+        # question has started the inferences list is closed
+        if "next_question" in partial:
+            self.send_inferences()
+        text = partial.get("next_question") or ""
+        if len(text) <= len(self.shown) or not text.startswith(self.shown):
+            return ""
+        delta = text[len(self.shown):]
+        self.shown = text
+        return delta
+
+    def send_inferences(self):
+        if self.on_inferences is not None and not self.inferences_sent:
+            self.inferences_sent = True
+            self.on_inferences(self.response.get("inferences") or [])
+
+    def finish(self):
+        self.send_inferences()
+        return self.response
+
+
+async def astream_invoke(chain, input_data, on_delta, on_inferences=None, config=None):
+    """
+    Invoke the chain in streaming mode.
+
+    Args:
+        chain: A runnable producing the response JSON, e.g. `prompt | model | parser`.
+        input_data (dict): Input for the chain.
+        on_delta (callable): Called with every new piece of next_question text.
+        on_inferences (callable): Called once with the inferences list when it
+            is complete.
+        config (dict): Runnable config for the call, e.g. callbacks.
+
+    Returns:
+        dict: The final parsed response.
+    """
+    partial_response = _PartialResponse(on_inferences)
+    async for partial in chain.astream(input_data, config):
+        delta = partial_response.feed(partial)
+        if delta:
+            on_delta(delta)
+    return partial_response.finish()
@@ -0,0 +1,189 @@
+"""
+Response parsing modes, bounded local JSON repair and parse statistics.
+
+Two ways of getting the turn's JSON out of the model:
+
+- "json" (default): the prompt describes the JSON and JsonOutputParser reads
+  it from the reply text;
+- "tool": the model is bound to one function whose parameter schema is
+  generated from the app's ResponseStructure (and, for web3, the abc.json
+  field names), so the provider returns structured arguments.
+
+Set OUTPUT_MODE=tool to use function calling. In both modes a reply that does
+not parse is first repaired locally (code fences, surrounding prose, trailing
+commas, Python literals, smart quotes, unclosed brackets) with a fixed number
+of passes. Only when that fails is the model asked again, at most
+PARSE_RETRIES times. A reply whose inferences are not objects with an answer
+and the form's key field counts as unparseable too, it would fail when
+applied. Failures, repairs and retries are counted per mode.
+
+The parsers themselves live in repair_parsers: LangChain's output parsers pull
+in its tracing stack, so that module is only imported when a chain is built.
+"""
+import json
+import os
+import re
+import threading
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.utils.json import parse_json_markdown
+
+OUTPUT_MODE = os.getenv("OUTPUT_MODE", "json")
+PARSE_RETRIES = int(os.getenv("PARSE_RETRIES", "1"))
+TOOL_NAME = "record_turn"
+# Replies longer than this are not worth repairing locally
+MAX_REPAIR_CHARS = 20000
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PY_LITERALS = ((r"\bTrue\b", "true"), (r"\bFalse\b", "false"), (r"\bNone\b", "null"))
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+# key field of the form -> type of its values in an inference
+KEY_TYPES = {"question_number": int, "field_name": str}
+
+
+def _outermost_object(text):
+    """Drop prose around the JSON object; keep an unclosed tail for the bracket fix."""
+    start = text.find("{")
+    if start == -1:
+        return text
+    end = text.rfind("}")
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def _repair_passes(text):
+    yield _outermost_object(text)
+    yield _TRAILING_COMMA_RE.sub(r"\1", _outermost_object(text))
+    fixed = _TRAILING_COMMA_RE.sub(r"\1", _outermost_object(text.translate(_SMART_QUOTES)))
+    for pattern, literal in _PY_LITERALS:
+        fixed = re.sub(pattern, literal, fixed)
+    yield fixed
+    # single-quoted keys and strings, as in a Python dict repr
+    if '"' not in fixed:
+        yield fixed.replace("'", '"')
+
+
+def repair_json(text):
+    """
+    Try to turn a malformed JSON reply into a dict with a bounded number of fixes.
+
+    Returns the parsed dict, or None when the reply can not be repaired locally.
+    """
+    if not isinstance(text, str) or len(text) > MAX_REPAIR_CHARS:
+        return None
+    for candidate in _repair_passes(text.strip()):
+        try:
+            # also closes brackets and strings left open by a truncated reply
+            parsed = parse_json_markdown(candidate)
+        except (ValueError, TypeError):
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+def is_inference(update, key_field):
+    """True if `update` is an object with an answer and a `key_field` of the right type."""
+    if not isinstance(update, dict) or "answer" not in update:
+        return False
+    key = update.get(key_field)
+    return isinstance(key, KEY_TYPES.get(key_field, (str, int))) and not isinstance(key, bool)
+
+
+def has_inferences(response, key_field=None):
+    """
+    True if the parsed response has a (possibly empty) list of inferences.
+
+    Args:
+        key_field (str): If given, every inference must also pass is_inference.
+    """
+    inferences = response.get("inferences") or []
+    return isinstance(inferences, list) and (
+        key_field is None or all(is_inference(update, key_field) for update in inferences)
+    )
+
+
+def is_turn(response, key_field=None):
+    """True if the parsed response has the turn's shape (see has_inferences)."""
+    return (
+        isinstance(response, dict)
+        and isinstance(response.get("next_question"), str)
+        and has_inferences(response, key_field)
+    )
+
+
+def check_response(response, key_field=None):
+    """Raise OutputParserException unless the parsed response has the turn's shape."""
+    if not is_turn(response, key_field):
+        raise OutputParserException(f"not a turn response: {response!r:.200}")
+    return response
+
+
+class ParseStats:
+    """
+    Model calls, parse failures, local repairs and retries per output mode.
+
+    `repaired` counts replies that did not parse as-is but were fixed
+    locally; `parse_failures` counts replies that were still unusable and cost
+    a retry (or the turn).
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, mode, counter):
+        with self._lock:
+            counts = self._counts.setdefault(
+                mode, {"calls": 0, "parse_failures": 0, "repaired": 0, "retries": 0}
+            )
+            counts[counter] += 1
+
+    def report(self):
+        """{mode: counts and failure/retry rates per model call}."""
+        with self._lock:
+            report = {}
+            for mode, counts in self._counts.items():
+                calls = counts["calls"] or 1
+                report[mode] = dict(
+                    counts,
+                    raw_failure_rate=(counts["parse_failures"] + counts["repaired"]) / calls,
+                    failure_rate=counts["parse_failures"] / calls,
+                    repair_rate=counts["repaired"] / calls,
+                    retry_rate=counts["retries"] / calls,
+                )
+            return report
+
+
+stats = ParseStats()
+
+
+def _json_schema(response_model):
+    schema_fn = getattr(response_model, "model_json_schema", None) or response_model.schema
+    return schema_fn()
+
+
+def tool_schema(response_model, field_names=None):
+    """
+    OpenAI function definition generated from the response model.
+
+    Args:
+        response_model: Pydantic model of the response JSON.
+        field_names (list): If given, the allowed `field_name` values of the
+            inferences (the abc.json field paths for web3).
+    """
+    parameters = json.loads(json.dumps(_json_schema(response_model)))
+    if field_names:
+        for definition in parameters.get("$defs", parameters.get("definitions", {})).values():
+            if "field_name" in definition.get("properties", {}):
+                definition["properties"]["field_name"]["enum"] = list(field_names)
+            # abc.json answers may be lists, numbers or booleans
+            if "answer" in definition.get("properties", {}):
+                definition["properties"]["answer"] = {"description": "The value given by the user"}
+    return {
+        "type": "function",
+        "function": {
+            "name": TOOL_NAME,
+            "description": "Record the answers inferred from the conversation and the next question to ask.",
+            "parameters": parameters,
+        },
+    }
@@ -0,0 +1,308 @@
+"""
+Per-turn latency and token instrumentation.
+
+Every turn run by the engine gets a TurnTrace with:
+- prompt build time;
+- model latency and time to first token;
+- parse time;
+- prompt and completion tokens, and how many prompt tokens the provider
+  served from its prompt cache;
+- cache hits, model calls, parse failures and retries;
+- calls shared with an equal call already in flight (see batching);
+- resubmitted turns that were answered without running them again;
+- the answer keys the turn changed (its form diff);
+- the number of turns the session took, on the turn its form was completed.
+
+Traces are labelled with the session's prompt variant (see prompt_variants),
+so every metric can be compared between variants.
+
+Token counts come from the provider's usage metadata when present, and are
+estimated otherwise. Model timings are taken by a callback handler attached
+to each chain call. The trace of the running turn lives in a context variable,
+so the nested coroutines of a turn add to it without passing it around.
+
+Finished traces go to:
+- Prometheus-style counters and histograms, served as text by `GET /metrics`
+  on server.py, or on METRICS_PORT for the Streamlit apps;
+- one JSON line each in TRACE_FILE, if set. trace_report.py aggregates these
+  into p50/p95/p99 per prompt variant.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from history import estimate_tokens
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class TurnTrace:
+    """Measurements of one turn."""
+
+    def __init__(self, variant, session_id):
+        self.variant = variant
+        self.session_id = session_id
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.total_ms = 0.0
+        self.prompt_build_ms = 0.0
+        self.model_ms = 0.0
+        self.ttft_ms = None
+        self.parse_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.model_calls = 0
+        # model calls answered by an equal batched call instead of their own
+        self.coalesced_calls = 0
+        self.retries = 0
+        self.parse_failures = 0
+        # set on the turn that completed the session's form
+        self.completed_turns = None
+        self.cache_hit = False
+        self.pre_extracted = False
+        # model tier that produced the reply (see model_tiers), if tiering is on
+        self.tier = None
+        # a resubmitted turn id, answered without running the turn again
+        self.duplicate = False
+        # answer keys the turn changed, its form diff
+        self.changed_slots = []
+
+    def to_dict(self):
+        return {key: value for key, value in vars(self).items() if key != "start"}
+
+
+class ModelCallTimer(BaseCallbackHandler):
+    """Times one chain call: model start to first token and to end, then parsing."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.start = None
+        self.first_token = None
+        self.end = None
+        self.prompt_text = ""
+        self.completion_text = ""
+        self.usage = None
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.start = time.perf_counter()
+        self.prompt_text = "".join(str(m.content) for batch in messages for m in batch)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.start = time.perf_counter()
+        self.prompt_text = "".join(prompts)
+
+    def on_llm_new_token(self, token, **kwargs):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def on_llm_end(self, response, **kwargs):
+        self.end = time.perf_counter()
+        for generations in response.generations:
+            for generation in generations:
+                self.completion_text += generation.text
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    self.usage = usage
+        token_usage = (response.llm_output or {}).get("token_usage")
+        if self.usage is None and token_usage:
+            cached = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+            self.usage = {"input_tokens": token_usage.get("prompt_tokens", 0),
+                          "output_tokens": token_usage.get("completion_tokens", 0),
+                          "input_token_details": {"cache_read": cached}}
+
+    def finish(self, trace):
+        """Add this call to the turn's trace once the chain has returned."""
+        done = time.perf_counter()
+        trace.model_calls += 1
+        if self.start is None:
+            return
+        end = self.end or done
+        trace.model_ms += (end - self.start) * 1000
+        first = self.first_token or end
+        if trace.ttft_ms is None:
+            trace.ttft_ms = (first - self.start) * 1000
+        trace.parse_ms += (done - end) * 1000
+        if self.usage:
+            trace.prompt_tokens += self.usage.get("input_tokens", 0)
+            trace.completion_tokens += self.usage.get("output_tokens", 0)
+            trace.cached_tokens += (self.usage.get("input_token_details") or {}).get("cache_read") or 0
+        else:
+            trace.prompt_tokens += estimate_tokens(self.prompt_text)
+            trace.completion_tokens += estimate_tokens(self.completion_text)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+
+COUNTERS = (
+    ("turns", "Turns handled"),
+    ("model_calls", "Model calls made"),
+    ("coalesced_calls", "Model calls answered by an equal call already in flight"),
+    ("retries", "Model calls repeated because the reply could not be parsed"),
+    ("parse_failures", "Model replies that could not be parsed even after repair"),
+    ("cache_hits", "Turns answered from the response cache"),
+    ("pre_extracted", "Turns answered by the pre-extractor without a model call"),
+    ("prompt_tokens", "Prompt tokens sent"),
+    ("completion_tokens", "Completion tokens received"),
+    ("cached_tokens", "Prompt tokens served from the provider's prompt cache"),
+    ("completions", "Sessions whose form was completed"),
+    ("completion_turns", "Turns taken by the completed sessions, divide by completions for the average"),
+    ("duplicate_turns", "Resubmitted turns answered without another model call"),
+    ("changed_slots", "Form answers changed by the turns"),
+)
+HISTOGRAMS = (
+    ("turn", "total_ms", "Turn latency"),
+    ("prompt_build", "prompt_build_ms", "Prompt build time"),
+    ("model", "model_ms", "Model latency"),
+    ("ttft", "ttft_ms", "Time to first token"),
+    ("parse", "parse_ms", "Response parse time"),
+)
+MODEL_TIMINGS = {"model_ms", "ttft_ms", "parse_ms"}
+
+
+class Telemetry:
+    """
+    Aggregates finished turn traces per prompt variant.
+
+    Args:
+        trace_file (str): JSONL file every trace is appended to, none if empty.
+    """
+
+    def __init__(self, trace_file=TRACE_FILE):
+        self.trace_file = trace_file
+        self._file = None
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, render):
+        """Append the text returned by `render()` to every /metrics response."""
+        self._collectors.append(render)
+
+    def record(self, trace):
+        trace.total_ms = (time.perf_counter() - trace.start) * 1000
+        values = {
+            "turns": 1,
+            "model_calls": trace.model_calls,
+            "coalesced_calls": trace.coalesced_calls,
+            "retries": trace.retries,
+            "parse_failures": trace.parse_failures,
+            "cache_hits": int(trace.cache_hit),
+            "pre_extracted": int(trace.pre_extracted),
+            "prompt_tokens": trace.prompt_tokens,
+            "completion_tokens": trace.completion_tokens,
+            "cached_tokens": trace.cached_tokens,
+            "completions": int(trace.completed_turns is not None),
+            "completion_turns": trace.completed_turns or 0,
+            "duplicate_turns": 0,
+            "changed_slots": len(trace.changed_slots),
+        }
+        if trace.duplicate:
+            # nothing ran, so the duplicate is only counted
+            values = dict.fromkeys(values, 0)
+            values["duplicate_turns"] = 1
+        with self._lock:
+            counters = self._counters.setdefault(trace.variant, dict.fromkeys(values, 0))
+            for name, value in values.items():
+                counters[name] += value
+            if trace.duplicate:
+                return
+            for name, attribute, _ in HISTOGRAMS:
+                # turns without a model call have no model timings
+                value = getattr(trace, attribute)
+                if value is None or (attribute in MODEL_TIMINGS and not trace.model_calls):
+                    continue
+                self._histograms.setdefault((trace.variant, name), _Histogram()).observe(value / 1000)
+            if self.trace_file:
+                if self._file is None:
+                    self._file = open(self.trace_file, "a", buffering=1)
+                self._file.write(json.dumps(trace.to_dict()) + "\n")
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, help_text in COUNTERS:
+                lines.append(f"# HELP chatbot_{name}_total {help_text}.")
+                lines.append(f"# TYPE chatbot_{name}_total counter")
+                for variant, counters in sorted(self._counters.items()):
+                    lines.append(f'chatbot_{name}_total{{variant="{variant}"}} {counters[name]}')
+            for name, _, help_text in HISTOGRAMS:
+                lines.append(f"# HELP chatbot_{name}_seconds {help_text}.")
+                lines.append(f"# TYPE chatbot_{name}_seconds histogram")
+                for (variant, histogram_name), histogram in sorted(self._histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    labels = f'variant="{variant}"'
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        lines.append(f'chatbot_{name}_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'chatbot_{name}_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f"chatbot_{name}_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                    lines.append(f"chatbot_{name}_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n" + "".join(render() for render in self._collectors)
+
+
+default_telemetry = Telemetry()
+
+_server_lock = threading.Lock()
+_server_started = False
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """
+    Serve `GET /metrics` on `port` from a daemon thread, once per process.
+
+    Used by the Streamlit apps, which have no HTTP endpoint of their own.
+    """
+    global _server_started
+    if not port:
+        return
+    with _server_lock:
+        if _server_started:
+            return
+        _server_started = True
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = default_telemetry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
@@ -0,0 +1,11 @@
+"""
+The tests reuse the offline checks in benchmarks/ and, like them, run from the
+repository root:
+    python -m pytest -q
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
@@ -0,0 +1,62 @@
+import asyncio
+import copy
+import json
+
+from langchain_core.runnables import RunnableLambda
+
+import batching
+import response_cache
+import session_store
+import telemetry
+import web2
+from engine import ConversationEngine
+
+RESPONSE = {"inferences": [{"question_number": 1, "answer": "India, Goa"}], "next_question": "When?"}
+
+# every session sends the same prompt, and the model answers every turn
+SPEC = copy.copy(web2.spec)
+SPEC.variants = None
+SPEC.extractor = None
+
+
+def test_coalesced_calls_are_not_counted_as_model_calls():
+    calls = []
+
+    async def model(input_data):
+        calls.append(input_data)
+        await asyncio.sleep(0.01)
+        return json.loads(json.dumps(RESPONSE))
+
+    collector = telemetry.Telemetry(trace_file="")
+    engine = ConversationEngine(
+        SPEC, chain=RunnableLambda(model), cache=response_cache.ResponseCache(max_entries=0),
+        store=session_store.MemorySessionStore(), telemetry=collector, batching=True,
+    )
+    states = [engine.new_session() for _ in range(5)]
+
+    async def run():
+        await asyncio.gather(*(engine.handle_turn(state, "goa") for state in states))
+
+    asyncio.run(run())
+    counters = collector._counters[SPEC.name]
+    assert len(calls) == 1
+    assert counters["model_calls"] == 1 and counters["coalesced_calls"] == 4
+    assert sum(state.function_count for state in states) == 1
+    # each session got its own copy of the shared reply
+    forms = [state.json_data.to_dict()["questions"][0]["answer"] for state in states]
+    assert forms == ["India, Goa"] * 5
+
+
+def test_coalesced_callers_get_their_own_copy():
+    async def model(input_data):
+        await asyncio.sleep(0.01)
+        return {"inferences": [], "next_question": "When?"}
+
+    async def run():
+        dispatcher = batching.BatchDispatcher(RunnableLambda(model))
+        return await asyncio.gather(*(dispatcher.submit({"message": "goa"}) for _ in range(3))), dispatcher
+
+    replies, dispatcher = asyncio.run(run())
+    assert dispatcher.coalesced == 2
+    assert replies[0] == replies[1] == replies[2]
+    assert len({id(reply) for reply in replies}) == 3
@@ -0,0 +1,23 @@
+import asyncio
+
+import check_duplicate_turns
+
+
+def test_duplicate_submissions_share_one_model_call():
+    asyncio.run(check_duplicate_turns.check_engine())
+
+
+def test_app_reruns_do_not_resend_a_turn():
+    check_duplicate_turns.check_app()
+
+
+def test_failed_turn_leaves_the_session_unchanged():
+    asyncio.run(check_duplicate_turns.check_failed_engine())
+
+
+def test_failed_save_leaves_the_session_unchanged():
+    asyncio.run(check_duplicate_turns.check_failed_save())
+
+
+def test_app_does_not_rerun_a_failed_turn():
+    check_duplicate_turns.check_failed_app()
@@ -0,0 +1,7 @@
+import asyncio
+
+import check_form_isolation
+
+
+def test_concurrent_sessions_keep_their_own_answers():
+    asyncio.run(check_form_isolation.check_isolation())
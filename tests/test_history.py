@@ -0,0 +1,13 @@
+from bench_history_window import window_sizes
+from history import TOKEN_BUDGET
+
+
+def test_history_window_stays_within_budget():
+    worst = max(window for _, _, window in window_sizes())
+    # list repr adds a few characters per line on top of the budgeted text
+    assert worst <= TOKEN_BUDGET * 1.1
+
+
+def test_full_history_outgrows_the_budget():
+    *_, (_, full, window) = window_sizes()
+    assert window < TOKEN_BUDGET < full
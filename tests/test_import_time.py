@@ -0,0 +1,10 @@
+import pytest
+
+import bench_import_time
+
+
+# Import times are too noisy to compare across machines; the median against
+# the baseline is only reported by benchmarks/bench_import_time.py
+@pytest.mark.parametrize("app", bench_import_time.APPS)
+def test_app_import_defers_langchain(app):
+    assert bench_import_time.deferred_imports(bench_import_time.import_profile(app)) == []
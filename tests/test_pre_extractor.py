@@ -0,0 +1,25 @@
+import pytest
+
+import pre_extractor
+
+FORM = {"questions": [{"question_number": n, "question": f"question {n}", "answer": ""} for n in range(1, 6)]}
+
+
+def answers(message, asked):
+    result = pre_extractor.question_extractor.extract(message, FORM, asked)
+    return result and result["inferences"]
+
+
+@pytest.mark.parametrize("message", ["2 - 3", "10 to 12"])
+def test_small_numbers_to_the_traveller_question_are_not_a_budget(message):
+    # left to the model, which sees the question they answer
+    assert answers(message, "How many travelers are going?") is None
+
+
+def test_budget_range_is_answered_locally():
+    assert answers("10k to 15k", "What is your budget?") == [{"question_number": 5, "answer": "10000 - 15000"}]
+
+
+def test_bare_number_answers_the_question_asked():
+    assert answers("3", "How many people are travelling?") == [{"question_number": 3, "answer": "3"}]
+    assert answers("3", "What is your budget?") is None
@@ -0,0 +1,22 @@
+import argparse
+import asyncio
+import json
+import os
+
+import pytest
+
+import replay_conversations
+
+BASELINES = os.path.dirname(os.path.abspath(replay_conversations.__file__))
+
+# run_app's defaults without the simulated latency, which only affects timing
+ARGS = argparse.Namespace(sessions=100, concurrency=32, latency=0.0, token_latency=0.0, completion_tokens=30)
+
+
+@pytest.mark.parametrize("app", list(replay_conversations.APPS))
+def test_replay_matches_baseline(app):
+    with open(os.path.join(BASELINES, "replay_baseline.json")) as f:
+        baseline = json.load(f)
+    results = {app: asyncio.run(replay_conversations.run_app(app, ARGS))}
+    assert results[app]["completed"] == ARGS.sessions
+    assert replay_conversations.compare(results, baseline, tolerance=0.05) == []
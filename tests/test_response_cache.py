@@ -0,0 +1,23 @@
+import asyncio
+
+import response_cache
+from bench_response_cache import RESPONSE, CountingChatModel, run
+
+
+def test_cache_hits_never_reach_the_model(tmp_path):
+    db = str(tmp_path / "cache.sqlite")
+    model = CountingChatModel(responses=[RESPONSE])
+    asyncio.run(run(response_cache.ResponseCache(max_entries=128, ttl=60, sqlite_path=db), model, rounds=3))
+    # the openers normalize to 3 keys
+    assert model.calls == 3
+
+    # a fresh memory layer is served from SQLite
+    model = CountingChatModel(responses=[RESPONSE])
+    asyncio.run(run(response_cache.ResponseCache(max_entries=128, ttl=60, sqlite_path=db), model, rounds=3))
+    assert model.calls == 0
+
+
+def test_without_cache_every_turn_reaches_the_model():
+    model = CountingChatModel(responses=[RESPONSE])
+    asyncio.run(run(response_cache.ResponseCache(max_entries=0), model, rounds=3))
+    assert model.calls == 3 * 6
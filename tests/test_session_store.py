@@ -0,0 +1,40 @@
+import json
+import os
+import time
+
+import pytest
+
+import session_store
+from check_session_store import TURNS, FakeRedis, play
+
+
+def make_stores(tmp_path, ttl):
+    return {
+        "memory": session_store.MemorySessionStore(ttl=ttl),
+        "sqlite": session_store.SQLiteSessionStore(os.path.join(tmp_path, "sessions.db"), ttl=ttl),
+        "redis": session_store.RedisSessionStore(FakeRedis(), ttl=ttl),
+    }
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "redis"])
+def test_reloaded_session_matches_the_live_one(tmp_path, backend):
+    # play asserts the round trip
+    play(make_stores(tmp_path, ttl=3600)[backend])
+
+
+def test_idle_sessions_are_evicted(tmp_path):
+    stores = make_stores(tmp_path, ttl=1)
+    for store in stores.values():
+        play(store)
+    time.sleep(1.1)
+    for name, store in stores.items():
+        store.evict_idle()
+        assert store.load("s1") is None, name
+
+
+def test_redis_writes_only_the_new_lines():
+    redis = FakeRedis()
+    state = play(session_store.RedisSessionStore(redis, ttl=3600))
+    full_state = len(json.dumps(state.to_meta())) + len(json.dumps(state.chat_history[:]))
+    # the small meta record is rewritten every turn, the transcript only appended
+    assert redis.bytes_written / (TURNS + 1) < full_state / 2
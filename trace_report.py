@@ -0,0 +1,75 @@
+"""
+Summarize turn traces written to TRACE_FILE, per prompt variant.
+
+    python trace_report.py traces.jsonl [more.jsonl ...]
+
+Prints p50/p95/p99 of the turn, prompt build, model, time-to-first-token and
+parse times and of the token counts, plus cache-hit, pre-extraction,
+parse-failure and retry rates, the share of prompt tokens served from the
+provider's prompt cache and the average turns to a completed form, for every
+prompt variant (web.prompt4, web2.prompt4, web3.prompt, ...).
+"""
+import argparse
+import json
+from collections import defaultdict
+
+TIMINGS = ("total_ms", "prompt_build_ms", "model_ms", "ttft_ms", "parse_ms", "prompt_tokens", "completion_tokens")
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def load(paths):
+    traces = defaultdict(list)
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    trace = json.loads(line)
+                    traces[trace["variant"]].append(trace)
+    return traces
+
+
+def report(traces):
+    lines = []
+    for variant, turns in sorted(traces.items()):
+        with_model = [t for t in turns if t["model_calls"]]
+        model_calls = sum(t["model_calls"] for t in turns)
+        parse_failures = sum(t.get("parse_failures", 0) for t in turns)
+        completed = [t["completed_turns"] for t in turns if t.get("completed_turns")]
+        prompt_tokens = sum(t["prompt_tokens"] for t in turns)
+        cached_tokens = sum(t.get("cached_tokens", 0) for t in turns)
+        lines.append(
+            f"{variant}: {len(turns)} turns, model calls {model_calls}, "
+            f"cache hits {sum(t['cache_hit'] for t in turns) / len(turns):.0%}, "
+            f"pre-extracted {sum(t['pre_extracted'] for t in turns) / len(turns):.0%}, "
+            f"parse failures {parse_failures / model_calls if model_calls else 0:.1%}, "
+            f"cached prompt tokens {cached_tokens / prompt_tokens if prompt_tokens else 0:.0%}, "
+            f"retries {sum(t['retries'] for t in turns)}"
+        )
+        if completed:
+            lines.append(f"  completed forms {len(completed)}, turns to completion {sum(completed) / len(completed):.1f}")
+        lines.append(f"  {'metric':<18} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for metric in TIMINGS:
+            # model timings only exist for turns that reached the model
+            source = turns if metric in ("total_ms", "prompt_build_ms") else with_model
+            values = [t[metric] for t in source if t.get(metric) is not None]
+            if not values:
+                continue
+            p50, p95, p99 = (percentile(values, f) for f in (0.5, 0.95, 0.99))
+            lines.append(f"  {metric:<18} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize turn traces per prompt variant.")
+    parser.add_argument("paths", nargs="+", help="JSONL trace files")
+    args = parser.parse_args()
+    print(report(load(args.paths)))
+
+
+if __name__ == "__main__":
+    main()
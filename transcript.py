@@ -0,0 +1,157 @@
+"""
+Compact, append-only transcript of a conversation.
+
+The transcript used to be a list of "You: ..." / "Bot: ..." strings, one str
+object per line (about 50 bytes of header, plus the repeated prefix). A
+Transcript keeps three flat buffers instead:
+- the Role of every line, one byte each;
+- the texts without their prefix, UTF-8 encoded, in one bytearray;
+- the end offset of every line in that bytearray.
+The prefixes exist once, in PREFIXES, and are put back only when a line is
+read. Appending is amortized O(1), and reading the last N lines touches only
+those N lines, however long the conversation.
+
+It reads like the list it replaces: len(), indexing, slicing and iteration
+return prefixed lines, and append() takes one. to_bytes/from_bytes copy the
+buffers as they are, for storing a whole transcript at once.
+"""
+import enum
+import struct
+import sys
+from array import array
+
+
+class Role(enum.IntEnum):
+    USER = 0
+    BOT = 1
+
+
+# indexed by Role
+PREFIXES = ("You: ", "Bot: ")
+_HEADER = struct.Struct("<I")
+
+
+class Transcript:
+    """
+    Lines of one conversation, oldest first.
+
+    Args:
+        lines: Prefixed lines to start with.
+    """
+
+    __slots__ = ("_roles", "_ends", "_data")
+
+    def __init__(self, lines=()):
+        self._roles = array("B")
+        self._ends = array("I")
+        self._data = bytearray()
+        self.extend(lines)
+
+    def add(self, role, text):
+        """Append `text` said by `role`."""
+        self._data += text.encode("utf-8")
+        self._roles.append(role)
+        self._ends.append(len(self._data))
+
+    def append(self, line):
+        """Append a "You: ..." or "Bot: ..." line."""
+        for role, prefix in enumerate(PREFIXES):
+            if line.startswith(prefix):
+                self.add(role, line[len(prefix):])
+                return
+        raise ValueError(f"a transcript line starts with one of {PREFIXES}, got {line[:20]!r}")
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def truncate(self, count):
+        """Drop every line after the first `count`."""
+        if count < len(self._roles):
+            del self._data[self._ends[count - 1] if count else 0:]
+            del self._roles[count:]
+            del self._ends[count:]
+
+    def role(self, index):
+        return Role(self._roles[index])
+
+    def text(self, index):
+        """The line at `index` without its prefix."""
+        if index < 0:
+            index += len(self._roles)
+        end = self._ends[index]
+        start = self._ends[index - 1] if index > 0 else 0
+        return self._data[start:end].decode("utf-8")
+
+    def __len__(self):
+        return len(self._roles)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self._roles))
+            if step == 1:
+                return self._lines(start, stop)
+            return [self[i] for i in range(start, stop, step)]
+        return PREFIXES[self._roles[index]] + self.text(index)
+
+    def _lines(self, start, stop):
+        if start >= stop:
+            return []
+        ends, roles = self._ends, self._roles
+        base = ends[start - 1] if start else 0
+        block = self._data[base:ends[stop - 1]]
+        text = block.decode("utf-8")
+        if len(text) != len(block):
+            return [PREFIXES[roles[i]] + self.text(i) for i in range(start, stop)]
+        # ASCII only, so byte offsets are character offsets: one decode for all
+        return [
+            PREFIXES[roles[i]] + text[(ends[i - 1] if i else 0) - base:ends[i] - base]
+            for i in range(start, stop)
+        ]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __eq__(self, other):
+        if isinstance(other, Transcript):
+            return self._roles == other._roles and self._ends == other._ends and self._data == other._data
+        if isinstance(other, list):
+            return self[:] == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Transcript({self[:]!r})"
+
+    def last(self, n):
+        """The last `n` lines."""
+        return self[-n:] if n > 0 else []
+
+    def copy(self):
+        copied = Transcript()
+        copied._roles = array("B", self._roles)
+        copied._ends = array("I", self._ends)
+        copied._data = bytearray(self._data)
+        return copied
+
+    def to_bytes(self):
+        """Line count, roles, little-endian end offsets and texts, in one bytes object."""
+        ends = array("I", self._ends)
+        if sys.byteorder == "big":
+            ends.byteswap()
+        return _HEADER.pack(len(self._roles)) + self._roles.tobytes() + ends.tobytes() + self._data
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        (count,) = _HEADER.unpack_from(data)
+        roles_end = _HEADER.size + count
+        ends_end = roles_end + count * 4
+        transcript = cls()
+        transcript._roles.frombytes(data[_HEADER.size:roles_end])
+        transcript._ends.frombytes(data[roles_end:ends_end])
+        if sys.byteorder == "big":
+            transcript._ends.byteswap()
+        transcript._data = bytearray(data[ends_end:])
+        return transcript
@@ -1,17 +1,17 @@
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.prompts import PromptTemplate
-from langchain_core.pydantic_v1 import BaseModel, Field
-from typing import List, Dict, Optional
+from pydantic import BaseModel
+from typing import List, Optional
 import streamlit as st
 import json
 from dotenv import load_dotenv
 import os
 
+import chat_ui
+import engine
+from engine import ChatbotSpec
+import pre_extractor
+import prompt_variants
+import streaming
+
 load_dotenv()
 
 openai_api_key = os.getenv("OPEN_API_KEY")
@@ -39,41 +39,15 @@ json_template = {
 
 
 
-def call_openai_api(chat_history, current_json):
-    if 'function_count' not in st.session_state:
-        print("Total number of times the GPT call is made is: -1")
-    else:
-        st.session_state['function_count'] +=1
-        print("Total number of times the GPT call is made is:", st.session_state['function_count'])
-    # print("chat_history  :  ",chat_history[-1])
-    # """
-    # Call OpenAI API using LangChain to update JSON data based on chat history and current JSON.
-    
-    # Args:
-    #     chat_history (str): The chat history as a single string.
-    #     current_json (dict): The current JSON data.
-    
-    # Returns:
-    #     dict: The updated JSON data.
-    # """
-    model = ChatOpenAI(api_key=openai_api_key, temperature=1)
-
-    # Define the parser
-    parser = JsonOutputParser(pydantic_object=ResponseStructure)
-
-    # Define the prompt template
-    prompt = PromptTemplate(
-        template="""
+# Prompt templates. Only PROMPT4_TEMPLATE gets traffic by default, the others
+# are registered as prompt variants that prompts/web/weights.json can turn on.
+PROMPT_TEMPLATE = """
         You are a chatbot helping my travel agency. My website shows travel recommendations to the user, but for that it needs some data from the users.
         For that I have a list of questions I want to get user data about.
 
         Your task is to interact with the user by questioning them and based on the user's answer, fill in the question's JSON.
 
-        The following is the current state of the travel plan in JSON format:
-         current_json : {current_json}
-
-        And here is the chat history between you and the user till now:
-        {chat_history}
+        The current state of the travel plan in JSON format and the chat history between you and the user till now are given at the end.
 
         So make sure you don't sound like an AI machine asking repetitively the same questions.
 
@@ -175,19 +149,6 @@ def call_openai_api(chat_history, current_json):
 
         also act as a human and interact humanly. if the user is trying to have a communication just do it. if he asks for suggestions then give proper suggestions.
 
-            
-        """,
-        input_variables=["current_json", "chat_history"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
-
-    # Define the prompt template
-    prompt1 = PromptTemplate(
-        template="""
-        You are a chatbot helping my travel agency. My website shows travel recommendations to the user, but for that it needs some data from the users.
-        For that I have a list of questions I want to get user data about.
-
-        Your task is to interact with the user by questioning them and based on the user's answer, fill in the question's JSON.
 
         The following is the current state of the travel plan in JSON format:
          current_json : {current_json}
@@ -195,6 +156,16 @@ def call_openai_api(chat_history, current_json):
         And here is the chat history between you and the user till now:
         {chat_history}
 
+        """
+
+PROMPT1_TEMPLATE = """
+        You are a chatbot helping my travel agency. My website shows travel recommendations to the user, but for that it needs some data from the users.
+        For that I have a list of questions I want to get user data about.
+
+        Your task is to interact with the user by questioning them and based on the user's answer, fill in the question's JSON.
+
+        The current state of the travel plan in JSON format and the chat history between you and the user till now are given at the end.
+
         So make sure you don't sound like an AI machine asking repetitively the same questions.
 
 
@@ -300,33 +271,30 @@ def call_openai_api(chat_history, current_json):
 
 
         YOUR TASK is to interact with the user as humanly as possible (like a real human would do and try to get answers out of him). if you think the user is trying to skip a question then leave it move on with next question till the last question is answered then we will reiterate the json to fill those fields
-        so answer to {latest_user_input} as a real human with helping nature and knowledge would answer or if you want cross question to get more details   
+        so answer to the latest user input (given at the end) as a real human with helping nature and knowledge would answer or if you want cross question to get more details   
 
 
         i've noticed you often miss the inferences even when the user have mentioned the answer clearly (dont do that). the inferences can inclue multiple question answers but ffor each user input check the entire  list of questions in the question's json that can be answered
         give the perfect answer json nothing else
-            
-        """,
-        input_variables=["current_json", "chat_history"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
 
 
+        The following is the current state of the travel plan in JSON format:
+         current_json : {current_json}
+
+        And here is the chat history between you and the user till now:
+        {chat_history}
 
-    
-    # Define the prompt template
-    prompt2 = PromptTemplate(
-        template="""
+        latest user input: {latest_user_input}
+
+        """
+
+PROMPT2_TEMPLATE = """
         You are a chatbot helping my travel agency. My website shows travel recommendations to the user, but for that it needs some data from the users.
         For that I have a list of questions I want to get user data about.
 
         Your task is to interact with the user as a normal human would do by questioning them and based on the user's answer, fill in the question's JSON.
 
-        The following is the current state of the travel plan in JSON format: (Base your next question based on this)
-         current_json : {current_json}
-
-        And here is the chat history between you and the user till now:
-        {chat_history}
+        The current state of the travel plan in JSON format (Base your next question based on this) and the chat history between you and the user till now are given at the end.
 
         always remember that under no circumstances are you allowed to give fake made up inferences by yourself. if the user answered your question only then can you give inferences (most important)
 
@@ -429,7 +397,7 @@ def call_openai_api(chat_history, current_json):
 
         
 
-        If in the latest input (ie: {latest_user_input}) you feel you need to help the user decide or if the user seems confused then kindly help him decide by maybe giving suggestions to famous places you think they might like on the basis of chat history
+        If in the latest input (given at the end) you feel you need to help the user decide or if the user seems confused then kindly help him decide by maybe giving suggestions to famous places you think they might like on the basis of chat history
 
         ALSO IF YOU ARE SUGGESTING ANY PLACE EXPLAIN WHY YOU ARE SUGGESTING IT, WHAT IS THAT PLACE FAMOUS FOR. 
 
@@ -439,25 +407,25 @@ def call_openai_api(chat_history, current_json):
         YOU EDIOT BASTARD ALWAYS REPLY AND INTERACT IN THE CONVERSATION LIKE A HUMAN. RESOLVE ANY QUERY THE USER MIGHT HAVE
 
         and remember bastard you have the chat history so never should ask the exact same question twice
-        """,
-        input_variables=["current_json", "chat_history"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
-
-    
-    # Define the prompt template
-    prompt3 = PromptTemplate(
-        template="""
-        You are a helpful assistant. You need to gather specific details from the user.
 
-        Your task is to interact with the user as a normal human would do and based on the user's answer, fill in the question's JSON.
 
-        The following is the current state of the question's JSON: (Base your next question on this)
+        The following is the current state of the travel plan in JSON format:
          current_json : {current_json}
 
         And here is the chat history between you and the user till now:
         {chat_history}
 
+        latest user input: {latest_user_input}
+
+        """
+
+PROMPT3_TEMPLATE = """
+        You are a helpful assistant. You need to gather specific details from the user.
+
+        Your task is to interact with the user as a normal human would do and based on the user's answer, fill in the question's JSON.
+
+        The current state of the question's JSON (Base your next question on this) and the chat history between you and the user till now are given at the end.
+
         always remember that under no circumstances are you allowed to give fake made up inferences by yourself. if the user answered your question only then can you give inferences (most important)
 
        Your main task is to interact with the user and and somehow get him to answer these questions
@@ -568,7 +536,7 @@ def call_openai_api(chat_history, current_json):
 
         
 
-        If in the latest input (ie: {latest_user_input}) you feel you need to help the user decide or if the user seems confused then kindly help him decide by maybe giving suggestions to famous places you think they might like on the basis of chat history
+        If in the latest input (given at the end) you feel you need to help the user decide or if the user seems confused then kindly help him decide by maybe giving suggestions to famous places you think they might like on the basis of chat history
 
         ALSO IF YOU ARE SUGGESTING ANY PLACE EXPLAIN WHY YOU ARE SUGGESTING IT, WHAT IS THAT PLACE FAMOUS FOR. 
 
@@ -582,23 +550,24 @@ def call_openai_api(chat_history, current_json):
          {{
                 "inferences": [],
                 "next_question": "thankyou , i have all the info i need"
-        }} 
+        }}
 
-        """,
-        input_variables=["current_json", "chat_history"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
 
-    # Define the prompt template
-    prompt4 = PromptTemplate(
-        template=f"""
-            You are a helpful assistant chatbot. You need to gather specific details from the user. 
+        The following is the current state of the question's JSON:
+         current_json : {current_json}
 
-            So far, you have asked the following questions and received these responses:
-            {chat_history}
+        And here is the chat history between you and the user till now:
+        {chat_history}
 
-            Now, please ask the user the following question and try to get a specific answer:
-            Question: {current_json}
+        latest user input: {latest_user_input}
+
+        """
+
+PROMPT4_TEMPLATE = """
+            You are a helpful assistant chatbot. You need to gather specific details from the user. 
+
+            The questions and the responses you received so far are given at the end. Ask the user
+            the next unanswered question of the JSON and try to get a specific answer.
 
             If the user tries to skip or does not answer, politely insist on the importance of providing this information and try rephrasing the question.
 
@@ -620,81 +589,103 @@ def call_openai_api(chat_history, current_json):
                     "next_question": "thats great. how many travellers are that with you on this trip?"
                 }}
 
-            answer in above json format only and return me the json only,  nothing else 
-
+            answer in above json format only and return me the json only,  nothing else
 
-            """,
-        input_variables=["current_json", "chat_history"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
 
+            Question: {current_json}
 
-    # Create the LLMChain
-    chain = prompt4 | model | parser
-
-    # Prepare the input for the chain
-    input_data = {
-        "current_json": json.dumps(current_json, indent=4),
-        "chat_history": chat_history,
-        "latest_user_input": chat_history[-1],
-    }
+            So far, you have asked the following questions and received these responses:
+            {chat_history}
 
-    # Invoke the chain
-    response = chain.invoke(input_data)
-    # print("response    :    ",response)
+            """
 
 
-    # Convert response to dictionary
-    updated_json = response
+def build_chain_input(chat_history, form):
+    """
+    Prepare the input for the chain from the history window and the form.
 
-    # Update the current JSON with the new answers
-    if "inferences" in updated_json and updated_json["inferences"]:
-        for update in updated_json["inferences"]:
-            for question in current_json["questions"]:
-                if question["question_number"] == update["question_number"]:
-                    question["answer"] = update["answer"]
-                    break
-    
-    
+    Only the open questions and those the previous turn answered are sent.
+    """
+    return {
+        "current_json": json.dumps(form.prompt_view(), indent=4),
+        "chat_history": "\n".join(chat_history),
+        "latest_user_input": chat_history[-1],
+    }
 
-    return current_json, updated_json.get("next_question", "")
 
+# Everything the conversation engine needs to run this chatbot
+spec = ChatbotSpec(
+    name="web.prompt4",
+    template=PROMPT4_TEMPLATE,
+    response_model=ResponseStructure,
+    api_key=openai_api_key,
+    temperature=1,
+    form_template=json_template,
+    intro="Hello! I am here to help you plan your vacations. Where are you looking to travel to? Any specific destination in mind or any preferences you have in terms of the type of place you want to visit?",
+    build_input=build_chain_input,
+    extractor=pre_extractor.question_extractor,
+    variants=prompt_variants.PromptRouter("web", {
+        "prompt": (PROMPT_TEMPLATE, 0),
+        "prompt1": (PROMPT1_TEMPLATE, 0),
+        "prompt2": (PROMPT2_TEMPLATE, 0),
+        "prompt3": (PROMPT3_TEMPLATE, 0),
+        "prompt4": (PROMPT4_TEMPLATE, 1),
+    }),
+)
 
 
 def initialize_session_state():
     """Initialize session state variables."""
-    if 'chat_history' not in st.session_state:
-        st.session_state['chat_history'] = []
-        chatbot_intro = f"""Hello! I am here to help you plan your vacations. Where are you looking to travel to? Any specific destination in mind or any preferences you have in terms of the type of place you want to visit?"""
-        st.session_state['chat_history'].append(f"Bot: {chatbot_intro}")
-    if 'json_data' not in st.session_state:
-        st.session_state['json_data'] = json_template
-    if 'next_question' not in st.session_state:
-        st.session_state['next_question'] = ""
-    if 'function_count' not in st.session_state:
-        st.session_state['function_count'] = 0
-
-
-def handle_user_input(user_input):
+    if 'session' not in st.session_state:
+        # The engine owns the conversation state, the keys below are views of it.
+        # The session id in the URL lets a reload, a restart or another replica
+        # resume the conversation from the session store.
+        chatbot = engine.get_engine(spec)
+        session_id = st.query_params.get("sid")
+        session = chatbot.load_session(session_id) if session_id else None
+        if session is None:
+            session = chatbot.new_session()
+            st.query_params["sid"] = session.session_id
+        st.session_state['session'] = session
+        st.session_state['chat_history'] = session.chat_history
+        st.session_state['json_data'] = session.json_data.to_dict()
+        st.session_state['next_question'] = session.next_question
+        st.session_state['function_count'] = session.function_count
+
+
+def handle_user_input(user_input, turn_id=None):
     """
-    Handle user input: update chat history, call OpenAI API, and update JSON data.
+    Handle user input: run the turn through the conversation engine and update the session views.
     
     Args:
         user_input (str): The user input text.
+        turn_id (str): Id of this submission; a resubmitted id is not run again.
     """
-    st.session_state['chat_history'].append(f"You: {user_input}")
-
-    # Call OpenAI API to update JSON data
-    updated_json, next_question = call_openai_api(
-        st.session_state['chat_history'],
-        st.session_state['json_data']
-    )
-    st.session_state['json_data'] = updated_json
+    session = st.session_state['session']
+
+    # In streaming mode the reply is drawn here while it is generated
+    placeholder = st.empty() if streaming.ENABLED else None
+    try:
+        next_question = engine.get_engine(spec).run_turn(
+            session, user_input,
+            # a retried reply replaces the one streamed before it
+            render_stream=(lambda deltas: placeholder.container().write_stream(deltas)) if placeholder else None,
+            turn_id=turn_id,
+        )
+    except Exception as e:
+        # Not run again by the next rerun, the user is offered a retry
+        print("turn failed:", e)
+        chat_ui.fail_turn(turn_id, e)
+        return
+    finally:
+        if placeholder is not None:
+            # The full reply is drawn again with the rest of the transcript
+            placeholder.empty()
+
+    st.session_state['json_data'] = session.json_data.to_dict()
     st.session_state['next_question'] = next_question
-
-    # Generate a chatbot response
-    chatbot_response = f"{next_question}"
-    st.session_state['chat_history'].append(f"Bot: {chatbot_response}")
+    st.session_state['function_count'] = session.function_count
+    chat_ui.finish_turn(turn_id)
 
 def render_chatbot_ui():
     """Render the chatbot user interface."""
@@ -708,21 +699,19 @@ def render_chatbot_ui():
         </style>
         """, unsafe_allow_html=True)
 
-    user_input = st.text_input("You:", "")
+    submitted = chat_ui.submitted_turn()
     
-    if user_input:
+    if submitted:
+        turn_id, user_input = submitted
         print("user input is : ", user_input)
-        handle_user_input(user_input)
+        handle_user_input(user_input, turn_id)
     
-    chat_history_container = st.container()
-    with chat_history_container:
-        for chat in st.session_state['chat_history']:
-            st.write(chat)
+    chat_ui.render_transcript(st.session_state['chat_history'])
 
 def render_json_ui():
     """Render the JSON data user interface."""
     st.header("Current JSON Data")
-    st.json(st.session_state['json_data'])
+    chat_ui.render_form(st.session_state['session'].json_data)
 
 def main():
     """Main function to run the Streamlit app."""
@@ -742,8 +731,5 @@ def main():
     with col2:
         render_json_ui()
 
-    # Update the displayed JSON data
-    st.write(json.dumps(st.session_state['json_data'], indent=4))
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,17 +1,17 @@
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.prompts import PromptTemplate
-from langchain_core.pydantic_v1 import BaseModel, Field
-from typing import List, Dict, Optional
+from pydantic import BaseModel
+from typing import List, Optional
 import streamlit as st
 import json
 from dotenv import load_dotenv
 import os
 
+import chat_ui
+import engine
+from engine import ChatbotSpec
+import pre_extractor
+import prompt_variants
+import streaming
+
 load_dotenv()
 
 openai_api_key = os.getenv("OPEN_API_KEY")
@@ -40,29 +40,8 @@ json_template = {
 
 
 
-def call_openai_api(chat_history, current_json):
-    if 'function_count' not in st.session_state:
-        st.session_state['function_count'] = 0
-    else:
-        st.session_state['function_count'] += 1
-        print("Total number of times the GPT call is made is:", st.session_state['function_count'])
-
-    model = ChatOpenAI(api_key=openai_api_key, temperature=0)
-
-    # Define the parser
-    parser = JsonOutputParser(pydantic_object=ResponseStructure)
-
-    example =[
-        {"question_number": 1, "question": "What is your destination?", "instructions":"this field will contain specific places with country, state, city", "answer": "India, Goa, Baga Beach"},
-        {"question_number": 2, "question": "What are your travel dates?", "instructions":"this field will contain specific dates range in dd/mm/yyyy format", "answer": "01/06/2024 - 10/06/2024"},
-        {"question_number": 3, "question": "How many travelers?", "instructions":"this field will contain specific integer numbers", "answer": "3"},
-        {"question_number": 4, "question": "What type of accommodation?", "instructions":"this field will contain specific user preferences", "answer": "5 star hotels"},
-        {"question_number": 5, "question": "What is your budget?", "instructions":"this field will contain specific range to money that the user is willing to spend", "answer": "10000 - 15000"}
-    ]
-
-    # Define the prompt template
-    prompt4 = PromptTemplate(
-        template="""
+# Prompt template used for every turn
+PROMPT4_TEMPLATE = """
 
             hey i am stuck in an emergency.
 
@@ -70,7 +49,7 @@ def call_openai_api(chat_history, current_json):
             
             basically my chatbot was designed to interact with the user and ask him questions to gather info about him which then will be used to give recommendations to that user for his/her vacations.
 
-            this is the questions that needs to be answered before my recommendation system can give recommendations {current_json}
+            the questions that need to be answered before my recommendation system can give recommendations are given at the end.
 
 
             but my chatbot broke and i am having a crises 
@@ -86,11 +65,7 @@ def call_openai_api(chat_history, current_json):
             So basically You need to gather specific details from the user. 
 
 
-            So far, you have asked the following questions and received these responses:
-            {chat_history}
-
-
-
+            The questions you have asked so far and the responses you received are given at the end too.
 
             If the user tries to skip or does not answer, politely insist on the importance of providing this information and try rephrasing the question.
 
@@ -112,8 +87,7 @@ def call_openai_api(chat_history, current_json):
             remember i will replace the answer of that question number with your answer and update the json
 
             
-            before answering carefully read the latest conversation between  the user and the bot (here the "bot" is you and "you" will be the user )
-            latest user input : {latest_user_input}
+            before answering carefully read the latest conversation between  the user and the bot (here the "bot" is you and "you" will be the user ), given at the end
 
 
 
@@ -128,75 +102,97 @@ def call_openai_api(chat_history, current_json):
 
             note you bastard this is just an example only. you have to  fill based on user input. tis example is just for you to learn. do not take these values as the answers. dont avoid your work
 
-            """,
-        input_variables=["chat_history", "current_json", "latest_user_input"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
 
-    # Create the LLMChain
-    chain = prompt4 | model | parser
+            questions that need to be answered: {current_json}
 
-    # Prepare the input for the chain
-    input_data = {
-        "chat_history": chat_history,
-        "current_json": json.dumps(current_json, indent=4),
-        "latest_user_input": chat_history[-1],
-    }
+            So far, you have asked the following questions and received these responses:
+            {chat_history}
 
-    # Invoke the chain
-    response = chain.invoke(input_data)
-    
-    # Convert response to dictionary
-    updated_json = response
+            latest user input : {latest_user_input}
 
-    # Update the current JSON with the new answers
-    if "inferences" in updated_json and updated_json["inferences"]:
-        for update in updated_json["inferences"]:
-            for question in current_json["questions"]:
-                if question["question_number"] == update["question_number"]:
-                    question["answer"] = update["answer"]
-                    break
+            """
 
-    print ("response : ",json.dumps(response, indent=4) )
 
-    return current_json, updated_json.get("next_question", "")
+def build_chain_input(chat_history, form):
+    """
+    Prepare the input for the chain from the history window and the form.
+
+    Only the open questions and those the previous turn answered are sent.
+    """
+    return {
+        "chat_history": "\n".join(chat_history),
+        "current_json": json.dumps(form.prompt_view(), indent=4),
+        "latest_user_input": chat_history[-1],
+    }
 
 
+# Everything the conversation engine needs to run this chatbot
+spec = ChatbotSpec(
+    name="web2.prompt4",
+    template=PROMPT4_TEMPLATE,
+    response_model=ResponseStructure,
+    api_key=openai_api_key,
+    temperature=0,
+    form_template=json_template,
+    intro="Hello! I am here to help you plan your vacations. Where are you looking to travel to? Any specific destination in mind or any preferences you have in terms of the type of place you want to visit?",
+    build_input=build_chain_input,
+    extractor=pre_extractor.question_extractor,
+    variants=prompt_variants.PromptRouter("web2", {"prompt4": (PROMPT4_TEMPLATE, 1)}),
+)
+
 
 def initialize_session_state():
     """Initialize session state variables."""
-    if 'chat_history' not in st.session_state:
-        st.session_state['chat_history'] = []
-        chatbot_intro = f"""Hello! I am here to help you plan your vacations. Where are you looking to travel to? Any specific destination in mind or any preferences you have in terms of the type of place you want to visit?"""
-        st.session_state['chat_history'].append(f"Bot: {chatbot_intro}")
-    if 'json_data' not in st.session_state:
-        st.session_state['json_data'] = json_template
-    if 'next_question' not in st.session_state:
-        st.session_state['next_question'] = ""
-    if 'function_count' not in st.session_state:
-        st.session_state['function_count'] = 0
-
-
-def handle_user_input(user_input):
+    if 'session' not in st.session_state:
+        # The engine owns the conversation state, the keys below are views of it.
+        # The session id in the URL lets a reload, a restart or another replica
+        # resume the conversation from the session store.
+        chatbot = engine.get_engine(spec)
+        session_id = st.query_params.get("sid")
+        session = chatbot.load_session(session_id) if session_id else None
+        if session is None:
+            session = chatbot.new_session()
+            st.query_params["sid"] = session.session_id
+        st.session_state['session'] = session
+        st.session_state['chat_history'] = session.chat_history
+        st.session_state['json_data'] = session.json_data.to_dict()
+        st.session_state['next_question'] = session.next_question
+        st.session_state['function_count'] = session.function_count
+
+
+def handle_user_input(user_input, turn_id=None):
     """
-    Handle user input: update chat history, call OpenAI API, and update JSON data.
+    Handle user input: run the turn through the conversation engine and update the session views.
     
     Args:
         user_input (str): The user input text.
+        turn_id (str): Id of this submission; a resubmitted id is not run again.
     """
-    st.session_state['chat_history'].append(f"You: {user_input}")
-
-    # Call OpenAI API to update JSON data
-    updated_json, next_question = call_openai_api(
-        st.session_state['chat_history'],
-        st.session_state['json_data']
-    )
-    st.session_state['json_data'] = updated_json
+    session = st.session_state['session']
+
+    # In streaming mode the reply is drawn here while it is generated
+    placeholder = st.empty() if streaming.ENABLED else None
+    try:
+        next_question = engine.get_engine(spec).run_turn(
+            session, user_input,
+            # a retried reply replaces the one streamed before it
+            render_stream=(lambda deltas: placeholder.container().write_stream(deltas)) if placeholder else None,
+            turn_id=turn_id,
+        )
+    except Exception as e:
+        # Not run again by the next rerun, the user is offered a retry
+        print("turn failed:", e)
+        chat_ui.fail_turn(turn_id, e)
+        return
+    finally:
+        if placeholder is not None:
+            # The full reply is drawn again with the rest of the transcript
+            placeholder.empty()
+
+    st.session_state['json_data'] = session.json_data.to_dict()
     st.session_state['next_question'] = next_question
-
-    # Generate a chatbot response
-    chatbot_response = f"{next_question}"
-    st.session_state['chat_history'].append(f"Bot: {chatbot_response}")
+    st.session_state['function_count'] = session.function_count
+    chat_ui.finish_turn(turn_id)
 
 def render_chatbot_ui():
     """Render the chatbot user interface."""
@@ -210,21 +206,19 @@ def render_chatbot_ui():
         </style>
         """, unsafe_allow_html=True)
 
-    user_input = st.text_input("You:", "")
+    submitted = chat_ui.submitted_turn()
     
-    if user_input:
+    if submitted:
+        turn_id, user_input = submitted
         print("user input is : ", user_input)
-        handle_user_input(user_input)
+        handle_user_input(user_input, turn_id)
     
-    chat_history_container = st.container()
-    with chat_history_container:
-        for chat in st.session_state['chat_history']:
-            st.write(chat)
+    chat_ui.render_transcript(st.session_state['chat_history'])
 
 def render_json_ui():
     """Render the JSON data user interface."""
     st.header("Current JSON Data")
-    st.json(st.session_state['json_data'])
+    chat_ui.render_form(st.session_state['session'].json_data)
 
 def main():
     """Main function to run the Streamlit app."""
@@ -244,9 +238,6 @@ def main():
     with col2:
         render_json_ui()
 
-    # Update the displayed JSON data
-    st.write(json.dumps(st.session_state['json_data'], indent=4))
-
 def clear_session_state():
     """Clear all session state variables."""
     for key in st.session_state.keys():
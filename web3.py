@@ -1,15 +1,21 @@
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import JsonOutputParser
-from typing import List, Dict, Optional
+from pydantic import BaseModel
+from typing import List, Optional
 import streamlit as st
 import json
 from dotenv import load_dotenv
 import os
 
+import chat_ui
+import engine
+from engine import ChatbotSpec
+import pre_extractor
+import prompt_variants
+import question_scheduler
+import schema_prompt
+import speculative
+import slot_schema
+import streaming
+
 load_dotenv()
 
 openai_api_key = os.getenv("OPEN_API_KEY2")
@@ -24,17 +30,6 @@ class ResponseStructure(BaseModel):
     next_question: str
 
 
-def read_abc_json(file_path):
-    with open(file_path, 'r') as f:
-        data = json.load(f)
-    print(data)
-    return data
-
-# Read the abc.json file
-abc_json = read_abc_json('abc.json')
-
-
-
 # Sample JSON template (this will be dynamically updated)
 tripplan_json = {
     # "optimizeType": {},
@@ -48,42 +43,17 @@ tripplan_json = {
     "trip_direction": {}
 }
 
-def call_openai_api(chat_history, current_json):
-    if 'function_count' not in st.session_state:
-        st.session_state['function_count'] = 0
-    else:
-        st.session_state['function_count'] += 1
-        print("Total number of times the GPT call is made is:", st.session_state['function_count'])
-
-    model = ChatOpenAI(api_key=openai_api_key, temperature=0)
-
-    # Define the parser
-    parser = JsonOutputParser(pydantic_object=ResponseStructure)
-
-    example = {
-        "optimizeType": "manual",
-        "firstDestination": "Goa",
-        "trip_theme": "beach",
-        "destination": ["Goa", "Kerala"],
-        "traveller_type": "family",
-        "Origin_city": "Mumbai",
-        "budget": "comfortable spending",
-        "food": "vegetarian",
-        "trip_direction": "return"
-    }
+# abc.json is parsed and checked once per process, see schema_file.load_schema
+# Compiled once into a compact per-field fragment for the prompt
+abc_prompt = schema_prompt.schema_prompt('abc.json')
+# Decides which of the form's fields are still needed and which to ask about next
+scheduler = question_scheduler.schema_scheduler('abc.json', tuple(tripplan_json))
 
-    # Define the prompt template
-    prompt = PromptTemplate(
-        template="""
+# Prompt template used for every turn
+PROMPT_TEMPLATE = """
             You are a helpful assistant. You will receive the current conversation history and a JSON template that needs to be filled based on the user inputs.
 
-            details of how you have to fill json and what each filed in json is for so that you can ask proper questions : {details}
-
-            chat history : 
-            {chat_history}
-
-            The current JSON template is:
-            {current_json}
+            The details of how you have to fill the json and what each field is for, the current JSON template and the chat history are given at the end.
 
             Please provide any inferences you can make from the conversation in the following format:
             {{
@@ -114,69 +84,110 @@ def call_openai_api(chat_history, current_json):
                 - communicate as a human be kind and polite and speak directly (be interactive dont be exact straight forward try to get that data out of him by politely asking and the same thing in another way to increase user retention)  (most important)
                 - remember never to ask direct question. be polite you know how to handle customers right. take the context of the chat history before answering
                 - along with each question tell the user what type of response you are excepting
-        """,
-        input_variables=["chat_history", "current_json", "latest_user_input"],
-    )
 
-    # Create the LLMChain
-    chain = prompt | model | parser
+            details of how you have to fill json and what each filed in json is for so that you can ask proper questions : {details}
 
-    # Prepare the input for the chain
-    input_data = {
-        "chat_history": chat_history,
-        "current_json": json.dumps(current_json, indent=4),
-        "latest_user_input": chat_history[-1],
-        "details": json.dumps(abc_json, indent=4),
-    }
+            The JSON fields still open or just updated:
+            {current_json}
 
-    # Invoke the chain
-    response = chain.invoke(input_data)
+            chat history : 
+            {chat_history}
+        """
 
-    # Convert response to dictionary
-    updated_json = response
 
-    # Update the current JSON with the new answers
-    if "inferences" in updated_json and updated_json["inferences"]:
-        for update in updated_json["inferences"]:
-            current_json[update["field_name"]] = update["answer"]
+def build_chain_input(chat_history, form):
+    """
+    Prepare the input for the chain from the history window and the form.
+
+    Only the schema lines of the fields that are still needed are sent, with
+    the fields the scheduler wants asked next. The history goes one message per
+    line, and the current JSON is minified and holds only the open fields and
+    those the previous turn changed.
+    """
+    values = question_scheduler.answered_values(form.to_dict())
+    details = abc_prompt.fragment(set(abc_prompt.lines) - set(scheduler.remaining(values)))
+    next_fields = scheduler.next_fields(values)
+    if next_fields:
+        details += "\nAsk about these fields next, in one question: " + ", ".join(next_fields)
+    return {
+        "chat_history": "\n".join(chat_history),
+        "current_json": json.dumps(form.prompt_view(), separators=(",", ":")),
+        "latest_user_input": chat_history[-1],
+        "details": details,
+    }
 
-    print("response:", json.dumps(response, indent=4))
 
-    return current_json, updated_json.get("next_question", "")
+# Everything the conversation engine needs to run this chatbot
+spec = ChatbotSpec(
+    name="web3.prompt",
+    template=PROMPT_TEMPLATE,
+    response_model=ResponseStructure,
+    api_key=openai_api_key,
+    temperature=0,
+    form_template=tripplan_json,
+    intro="Hello! I am here to help you plan your vacation. Let's get started! What is your destination?",
+    build_input=build_chain_input,
+    extractor=pre_extractor.schema_extractor('abc.json', tuple(tripplan_json)),
+    validator=slot_schema.schema_validator('abc.json'),
+    tool_fields=tuple(slot_schema.schema_validator('abc.json').slots),
+    next_slot=speculative.scheduled_slot(scheduler),
+    variants=prompt_variants.PromptRouter("web3", {"prompt": (PROMPT_TEMPLATE, 1)}),
+    is_complete=lambda form: not scheduler.remaining(question_scheduler.answered_values(form)),
+)
+
 
 def initialize_session_state():
     """Initialize session state variables."""
-    if 'chat_history' not in st.session_state:
-        st.session_state['chat_history'] = []
-        chatbot_intro = "Hello! I am here to help you plan your vacation. Let's get started! What is your destination?"
-        st.session_state['chat_history'].append(f"Bot: {chatbot_intro}")
-    if 'json_data' not in st.session_state:
-        st.session_state['json_data'] = tripplan_json
-    if 'next_question' not in st.session_state:
-        st.session_state['next_question'] = ""
-    if 'function_count' not in st.session_state:
-        st.session_state['function_count'] = 0
-
-def handle_user_input(user_input):
+    if 'session' not in st.session_state:
+        # The engine owns the conversation state, the keys below are views of it.
+        # The session id in the URL lets a reload, a restart or another replica
+        # resume the conversation from the session store.
+        chatbot = engine.get_engine(spec)
+        session_id = st.query_params.get("sid")
+        session = chatbot.load_session(session_id) if session_id else None
+        if session is None:
+            session = chatbot.new_session()
+            st.query_params["sid"] = session.session_id
+        st.session_state['session'] = session
+        st.session_state['chat_history'] = session.chat_history
+        st.session_state['json_data'] = session.json_data.to_dict()
+        st.session_state['next_question'] = session.next_question
+        st.session_state['function_count'] = session.function_count
+
+
+def handle_user_input(user_input, turn_id=None):
     """
-    Handle user input: update chat history, call OpenAI API, and update JSON data.
+    Handle user input: run the turn through the conversation engine and update the session views.
     
     Args:
         user_input (str): The user input text.
+        turn_id (str): Id of this submission; a resubmitted id is not run again.
     """
-    st.session_state['chat_history'].append(f"You: {user_input}")
-
-    # Call OpenAI API to update JSON data
-    updated_json, next_question = call_openai_api(
-        st.session_state['chat_history'],
-        st.session_state['json_data']
-    )
-    st.session_state['json_data'] = updated_json
+    session = st.session_state['session']
+
+    # In streaming mode the reply is drawn here while it is generated
+    placeholder = st.empty() if streaming.ENABLED else None
+    try:
+        next_question = engine.get_engine(spec).run_turn(
+            session, user_input,
+            # a retried reply replaces the one streamed before it
+            render_stream=(lambda deltas: placeholder.container().write_stream(deltas)) if placeholder else None,
+            turn_id=turn_id,
+        )
+    except Exception as e:
+        # Not run again by the next rerun, the user is offered a retry
+        print("turn failed:", e)
+        chat_ui.fail_turn(turn_id, e)
+        return
+    finally:
+        if placeholder is not None:
+            # The full reply is drawn again with the rest of the transcript
+            placeholder.empty()
+
+    st.session_state['json_data'] = session.json_data.to_dict()
     st.session_state['next_question'] = next_question
-
-    # Generate a chatbot response
-    chatbot_response = f"{next_question}"
-    st.session_state['chat_history'].append(f"Bot: {chatbot_response}")
+    st.session_state['function_count'] = session.function_count
+    chat_ui.finish_turn(turn_id)
 
 def render_chatbot_ui():
     """Render the chatbot user interface."""
@@ -190,21 +201,19 @@ def render_chatbot_ui():
         </style>
         """, unsafe_allow_html=True)
 
-    user_input = st.text_input("You:", "")
+    submitted = chat_ui.submitted_turn()
     
-    if user_input:
+    if submitted:
+        turn_id, user_input = submitted
         print("user input is:", user_input)
-        handle_user_input(user_input)
+        handle_user_input(user_input, turn_id)
     
-    chat_history_container = st.container()
-    with chat_history_container:
-        for chat in st.session_state['chat_history']:
-            st.write(chat)
+    chat_ui.render_transcript(st.session_state['chat_history'])
 
 def render_json_ui():
     """Render the JSON data user interface."""
     st.header("Current JSON Data")
-    st.json(st.session_state['json_data'])
+    chat_ui.render_form(st.session_state['session'].json_data)
 
 def main():
     """Main function to run the Streamlit app."""
@@ -224,9 +233,6 @@ def main():
     with col2:
         render_json_ui()
 
-    # Update the displayed JSON data
-    # st.write(json.dumps(st.session_state['json_data'], indent=4))
-
 def clear_session_state():
     """Clear all session state variables."""
     for key in st.session_state.keys():